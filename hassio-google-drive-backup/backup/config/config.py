@@ -131,6 +131,7 @@ class Config():
             self.config = data
         self._legacy_ignored_behavior = False
         self._subscriptions = []
+        self._version = 0
         self._clientIdentifier = None
         self.retained = self._loadRetained()
         self._gen_config_cache = self.getGenerationalConfig()
@@ -200,6 +201,7 @@ class Config():
         validated, upgraded = self.validate(new_config)
         self._config_was_upgraded = upgraded
         self.config = validated
+        self._version += 1
         self._gen_config_cache = self.getGenerationalConfig()
         for sub in self._subscriptions:
             sub()
@@ -213,6 +215,10 @@ class Config():
     def subscribe(self, func):
         self._subscriptions.append(func)
 
+    def version(self) -> int:
+        """A number that changes whenever any setting (or retained backup) does, so things derived from config can be cached"""
+        return self._version
+
     def clientIdentifier(self) -> str:
         if self._clientIdentifier is None:
             try:
@@ -260,6 +266,7 @@ class Config():
         return slug in self.retained
 
     def setRetained(self, slug, retain):
+        self._version += 1
         if retain and slug not in self.retained:
             self.retained.append(slug)
             JsonFileSaver.write(self.get(Setting.RETAINED_FILE_PATH), {'retained': self.retained})
@@ -272,6 +279,7 @@ class Config():
 
     def override(self, setting: Setting, value):
         self.overrides[setting] = value
+        self._version += 1
         return self
 
     def get(self, setting: Setting) -> Any:
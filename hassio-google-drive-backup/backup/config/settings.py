@@ -124,8 +124,16 @@ class Setting(Enum):
     NEW_BACKUP_TIMEOUT_SECONDS = "new_backup_timeout_seconds"
     DOWNLOAD_TIMEOUT_SECONDS = "download_timeout_seconds"
     DEFAULT_CHUNK_SIZE = "default_chunk_size"
+    DRIVE_DOWNLOAD_CONNECTIONS = "drive_download_connections"
+    DRIVE_DOWNLOAD_SEGMENT_BYTES = "drive_download_segment_bytes"
+    DRIVE_TOKEN_REFRESH_MARGIN_SECONDS = "drive_token_refresh_margin_seconds"
     DEBUGGER_PORT = "debugger_port"
     SERVER_PROJECT_ID = "server_project_id"
+    AUTH_REFRESH_CACHE_SECONDS = "auth_refresh_cache_seconds"
+    AUTH_REFRESH_CACHE_MAX_ENTRIES = "auth_refresh_cache_max_entries"
+    SERVER_WORKERS = "server_workers"
+    SERVER_WRITE_QUEUE_SIZE = "server_write_queue_size"
+    SERVER_WRITE_BATCH_SIZE = "server_write_batch_size"
     LOG_LEVEL = "log_level"
     CONSOLE_LOG_LEVEL = "console_log_level"
     BACKUP_STARTUP_DELAY_MINUTES = "backup_startup_delay_minutes"
@@ -136,6 +144,9 @@ class Setting(Enum):
     CACHE_WARMUP_MAX_SECONDS = "cache_warmup_max_seconds"
     CACHE_WARMUP_ERROR_TIMEOUT_SECONDS = "cache_warmup_error_timeout"
     MAX_BACKOFF_SECONDS = "max_backoff_seconds"
+    DRIVE_FULL_SYNC_INTERVAL_SECONDS = "drive_full_sync_interval_seconds"
+    SUPERVISOR_MAX_CONCURRENT_REQUESTS = "supervisor_max_concurrent_requests"
+    BACKUP_INFO_CACHE_MAX_ENTRIES = "backup_info_cache_max_entries"
 
     # Old, deprecated settings
     DEPRECTAED_MAX_BACKUPS_IN_HA = "max_snapshots_in_hassio"
@@ -288,8 +299,16 @@ _DEFAULTS = {
     Setting.DRIVE_PICKER_API_KEY: "",
     Setting.DEFAULT_CHUNK_SIZE: 1024 * 1024 * 5,
     Setting.DOWNLOAD_TIMEOUT_SECONDS: 60,
+    Setting.DRIVE_DOWNLOAD_CONNECTIONS: 4,
+    Setting.DRIVE_DOWNLOAD_SEGMENT_BYTES: 1024 * 1024 * 4,
+    Setting.DRIVE_TOKEN_REFRESH_MARGIN_SECONDS: 5 * 60,
     Setting.DEBUGGER_PORT: None,
     Setting.SERVER_PROJECT_ID: "",
+    Setting.AUTH_REFRESH_CACHE_SECONDS: 60,
+    Setting.AUTH_REFRESH_CACHE_MAX_ENTRIES: 10000,
+    Setting.SERVER_WORKERS: 1,
+    Setting.SERVER_WRITE_QUEUE_SIZE: 1000,
+    Setting.SERVER_WRITE_BATCH_SIZE: 100,
     Setting.LOG_LEVEL: 'DEBUG',
     Setting.CONSOLE_LOG_LEVEL: 'INFO',
     Setting.BACKUP_STARTUP_DELAY_MINUTES: 10,
@@ -300,6 +319,9 @@ _DEFAULTS = {
     Setting.CACHE_WARMUP_MAX_SECONDS: 15 * 60,  # 30 minutes
     Setting.CACHE_WARMUP_ERROR_TIMEOUT_SECONDS: 24 * 60 * 60,  # 1 day
     Setting.MAX_BACKOFF_SECONDS: 60 * 60 * 2,  # 2 hours
+    Setting.DRIVE_FULL_SYNC_INTERVAL_SECONDS: 60 * 60 * 24,  # 1 day
+    Setting.SUPERVISOR_MAX_CONCURRENT_REQUESTS: 8,
+    Setting.BACKUP_INFO_CACHE_MAX_ENTRIES: 500,
 
     Setting.UPLOAD_LIMIT_BYTES_PER_SECOND: 0,
 }
@@ -431,8 +453,16 @@ _CONFIG = {
     Setting.DRIVE_PICKER_API_KEY: "str?",
     Setting.DEFAULT_CHUNK_SIZE: "int(1,)?",
     Setting.DOWNLOAD_TIMEOUT_SECONDS: "float(0,)?",
+    Setting.DRIVE_DOWNLOAD_CONNECTIONS: "int(1,)?",
+    Setting.DRIVE_DOWNLOAD_SEGMENT_BYTES: "int(1,)?",
+    Setting.DRIVE_TOKEN_REFRESH_MARGIN_SECONDS: "float(0,)?",
     Setting.DEBUGGER_PORT: "int(100,)?",
     Setting.SERVER_PROJECT_ID: "str?",
+    Setting.AUTH_REFRESH_CACHE_SECONDS: "float(0,)?",
+    Setting.AUTH_REFRESH_CACHE_MAX_ENTRIES: "int(0,)?",
+    Setting.SERVER_WORKERS: "int(1,)?",
+    Setting.SERVER_WRITE_QUEUE_SIZE: "int(1,)?",
+    Setting.SERVER_WRITE_BATCH_SIZE: "int(1,500)?",
     Setting.LOG_LEVEL: "list(DEBUG|TRACE|INFO|WARN|CRITICAL|WARNING)?",
     Setting.CONSOLE_LOG_LEVEL: "list(DEBUG|TRACE|INFO|WARN|CRITICAL|WARNING)?",
     Setting.BACKUP_STARTUP_DELAY_MINUTES: "float(0,)?",
@@ -443,6 +473,9 @@ _CONFIG = {
     Setting.CACHE_WARMUP_MAX_SECONDS: "float(0,)",
     Setting.CACHE_WARMUP_ERROR_TIMEOUT_SECONDS: "float(0,)",
     Setting.MAX_BACKOFF_SECONDS: "int(3600,)?",
+    Setting.DRIVE_FULL_SYNC_INTERVAL_SECONDS: "float(0,)?",
+    Setting.SUPERVISOR_MAX_CONCURRENT_REQUESTS: "int(1,)?",
+    Setting.BACKUP_INFO_CACHE_MAX_ENTRIES: "int(0,)?",
 
     Setting.UPLOAD_LIMIT_BYTES_PER_SECOND: "float(0,)?",
 }
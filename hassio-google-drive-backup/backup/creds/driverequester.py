@@ -5,6 +5,7 @@ from backup.util import Resolver
 from backup.logger import getLogger
 from backup.config import Config, Setting
 from injector import singleton, inject
+from typing import Any, Optional
 from dns.exception import DNSException
 
 RATE_LIMIT_EXCEEDED = [403]
@@ -36,18 +37,10 @@ class DriveRequester():
             if response.status < 400:
                 return response
             await self.raiseForKnownErrors(response)
-            if response.status in PERMISSION_DENIED:
+            error = self.statusError(response.status)
+            if error is not None:
                 response.release()
-                raise GoogleCredentialsExpired()
-            elif response.status in INTERNAL_ERROR:
-                response.release()
-                raise GoogleInternalError()
-            elif response.status in RATE_LIMIT_EXCEEDED or response.status in TOO_MANY_REQUESTS:
-                response.release()
-                raise GoogleRateLimitError()
-            elif response.status in REQUEST_TIMEOUT:
-                response.release()
-                raise GoogleTimeoutError()
+                raise error
             response.raise_for_status()
             return response
         except ClientConnectorError as e:
@@ -100,20 +93,39 @@ class DriveRequester():
         except TypeError:
             # Same
             return
-        if "error" not in message:
-            return
+        error = self.knownError(message)
+        if error is not None:
+            raise error
+
+    def knownError(self, message: Any) -> Optional[Exception]:
+        """Gets the exception for an error Drive described in a response's json body, if it's one we recognize"""
+        if not isinstance(message, dict) or "error" not in message:
+            return None
         error_obj = message["error"]
         if isinstance(error_obj, str):
             if error_obj == "expired":
-                raise GoogleCredentialsExpired()
+                return GoogleCredentialsExpired()
             else:
-                raise CredRefreshGoogleError(error_obj)
+                return CredRefreshGoogleError(error_obj)
         if "errors" not in error_obj:
-            return
+            return None
         for error in error_obj["errors"]:
             if "reason" not in error:
                 continue
             if error["reason"] == "storageQuotaExceeded":
-                raise DriveQuotaExceeded()
+                return DriveQuotaExceeded()
             elif error["reason"] in ["forbidden", "insufficientFilePermissions"]:
-                raise GoogleDrivePermissionDenied()
+                return GoogleDrivePermissionDenied()
+        return None
+
+    def statusError(self, status: int) -> Optional[Exception]:
+        """Gets the exception for an HTTP error status that means something more specific than 'the request failed'"""
+        if status in PERMISSION_DENIED:
+            return GoogleCredentialsExpired()
+        elif status in INTERNAL_ERROR:
+            return GoogleInternalError()
+        elif status in RATE_LIMIT_EXCEEDED or status in TOO_MANY_REQUESTS:
+            return GoogleRateLimitError()
+        elif status in REQUEST_TIMEOUT:
+            return GoogleTimeoutError()
+        return None
@@ -103,6 +103,9 @@ class Exchanger():
             KEY_CLIENT_ID: creds.id,
             KEY_REFRESH_TOKEN: creds.refresh_token,
         }
+        if creds.access_token:
+            # Lets the token server know not to hand this one back from its cache, since it's what's being replaced
+            data[KEY_ACCESS_TOKEN] = creds.access_token
         token_paths = self.config.getTokenServers("/drive/refresh")
         last_error = None
         for url in token_paths:
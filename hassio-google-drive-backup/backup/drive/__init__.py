@@ -2,4 +2,5 @@
 from .driverequests import DriveRequests, RETRY_SESSION_ATTEMPTS, UPLOAD_SESSION_EXPIRATION_DURATION, URL_START_UPLOAD, OOB_CRED_CUTOFF
 from .drivesource import DriveSource, SOURCE_FILENIO
 from .folderfinder import FolderFinder
-from .authcodequery import AuthCodeQuery
\ No newline at end of file
+from .authcodequery import AuthCodeQuery
+from .tokenrefresher import TokenRefresher
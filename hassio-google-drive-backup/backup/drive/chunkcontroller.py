@@ -0,0 +1,108 @@
+import math
+from typing import Any, Dict, Optional
+
+from injector import inject, singleton
+
+from ..config import Config, Setting
+from ..time import Time
+from ..logger import getLogger
+
+logger = getLogger(__name__)
+
+BASE_CHUNK_SIZE = 256 * 1024  # Google's api requires uploading chunks in multiples of 256kb
+
+# During upload, chunks get sized to complete upload after 10s so we can give status updates on progress.
+CHUNK_UPLOAD_TARGET_SECONDS = 10
+
+# How much weight each new measurement gets in the bandwidth and round trip averages.  Lower values make a single
+# unusually slow (or fast) chunk matter less.
+EWMA_WEIGHT = 0.3
+
+# After an error, the chunk size is multiplied by this and then only grows by ADDITIVE_INCREASE chunks at a time
+# until it catches back up to what the bandwidth estimate says it should be.
+MULTIPLICATIVE_DECREASE = 0.5
+ADDITIVE_INCREASE = 1
+
+
+@singleton
+class ChunkSizeController:
+    """
+    Decides how big each chunk of a Google Drive upload should be.  Sizes are in multiples of BASE_CHUNK_SIZE.
+
+    Keeps a moving average of the upload bandwidth and of the round trip time to Google, and sizes chunks so each
+    takes about CHUNK_UPLOAD_TARGET_SECONDS to send.  Errors cut the size in half, after which it only grows a little
+    at a time (ie AIMD, like TCP's congestion control).  Because this lives across uploads, each new upload starts at
+    the size the last one ended at instead of ramping up from the minimum again.
+    """
+    @inject
+    def __init__(self, config: Config, time: Time):
+        self._config = config
+        self._time = time
+        self._size = 1
+        self._bandwidth: Optional[float] = None
+        self._rtt: Optional[float] = None
+        self._recovering = False
+        self._backoffs = 0
+        self._last_backoff = None
+
+    def maximum(self) -> int:
+        return max(1, math.floor(self._config.get(Setting.MAXIMUM_UPLOAD_CHUNK_BYTES) / BASE_CHUNK_SIZE))
+
+    def size(self) -> int:
+        """The size the next chunk should be"""
+        return max(1, min(self._size, self.maximum()))
+
+    def recordRoundTrip(self, seconds: float):
+        """Records how long a request with (practically) no body took, which is a measure of latency to Google"""
+        self._rtt = self._average(self._rtt, max(0, seconds))
+
+    def success(self, chunks: int, seconds: float):
+        """Records that a chunk of the given size was sent in the given number of seconds"""
+        transfer_seconds = seconds - (self._rtt or 0)
+        if transfer_seconds <= 0:
+            # Too fast to measure, so the link can handle whatever we can throw at it.
+            self._size = self.maximum()
+            self._recovering = False
+            return
+        self._bandwidth = self._average(self._bandwidth, chunks * BASE_CHUNK_SIZE / transfer_seconds)
+        target = self._targetSize()
+        if self._recovering and target > self._size:
+            self._size = min(target, self._size + ADDITIVE_INCREASE)
+            if self._size >= target:
+                self._recovering = False
+        else:
+            self._size = target
+            self._recovering = False
+
+    def failure(self):
+        """Records that sending a chunk failed in a way that suggests the connection is struggling"""
+        self._size = max(1, math.floor(self.size() * MULTIPLICATIVE_DECREASE))
+        self._recovering = True
+        self._backoffs += 1
+        self._last_backoff = self._time.now()
+        logger.debug("Backing off upload chunk size to {0} bytes".format(self._size * BASE_CHUNK_SIZE))
+
+    def info(self) -> Dict[str, Any]:
+        ret = {
+            'chunk_size': self.size() * BASE_CHUNK_SIZE,
+            'recovering': self._recovering,
+            'backoffs': self._backoffs
+        }
+        if self._bandwidth is not None:
+            ret['bandwidth'] = self._bandwidth
+        if self._rtt is not None:
+            ret['rtt'] = self._rtt
+        if self._last_backoff is not None:
+            ret['last_backoff'] = self._time.formatDelta(self._last_backoff)
+        return ret
+
+    def _targetSize(self) -> int:
+        seconds = CHUNK_UPLOAD_TARGET_SECONDS - (self._rtt or 0)
+        if seconds <= 0:
+            return 1
+        return max(1, min(self.maximum(), math.floor(self._bandwidth * seconds / BASE_CHUNK_SIZE)))
+
+    def _average(self, current: Optional[float], sample: float) -> float:
+        if current is None:
+            return sample
+        return EWMA_WEIGHT * sample + (1 - EWMA_WEIGHT) * current
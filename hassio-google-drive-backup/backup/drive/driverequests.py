@@ -1,26 +1,33 @@
+import asyncio
+import hashlib
 import io
+import json
 import math
 import re
-from typing import Any, Dict, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from urllib.parse import urlencode
 from datetime import datetime, timedelta
 
-from aiohttp import ClientSession, ClientTimeout, ClientResponse
+from aiohttp import ClientSession, ClientTimeout, ClientResponse, MultipartReader, MultipartWriter
+from aiohttp.payload import Payload
 from aiohttp.client_exceptions import ClientResponseError, ServerTimeoutError
 from injector import inject, singleton
 
-from ..util import AsyncHttpGetter
+from ..util import AsyncHttpGetter, SegmentedDownload
 from ..config import Config, Setting
 from ..exceptions import (GoogleCredentialsExpired,
                           GoogleSessionError, LogicError,
-                          ProtocolError, ensureKey, KnownTransient, GoogleTimeoutError, GoogleUnexpectedError)
-from backup.util import Backoff, TokenBucket
+                          ProtocolError, ensureKey, KnownTransient, GoogleTimeoutError, GoogleUnexpectedError,
+                          GoogleInternalError)
+from backup.util import Backoff, TokenBucket, ReadAheadStream, BufferPool, DataCache, KEY_UPLOAD_SESSION
+from backup.const import NECESSARY_PROP_KEY_SLUG
 from backup.file import JsonFileSaver
 from ..time import Time
 from ..logger import getLogger
 from backup.creds import Creds, Exchanger, DriveRequester
 from datetime import timezone
 from ..config.byteformatter import ByteFormatter
+from .chunkcontroller import ChunkSizeController, BASE_CHUNK_SIZE
 
 logger = getLogger(__name__)
 
@@ -34,18 +41,16 @@ SELECT_FIELDS = "id,name,appProperties,size,trashed,mimeType,modifiedTime,capabi
 THUMBNAIL_MIME_TYPE = "image/png"
 QUERY_FIELDS = "nextPageToken,files(" + SELECT_FIELDS + ")"
 CREATE_FIELDS = SELECT_FIELDS
+CHANGES_FIELDS = "nextPageToken,newStartPageToken,changes(fileId,removed,file(" + SELECT_FIELDS + "))"
 URL_FILES = "/drive/v3/files/"
+URL_CHANGES = "/drive/v3/changes"
 URL_ABOUT = "/drive/v3/about"
+URL_BATCH = "/batch/drive/v3"
 URL_START_UPLOAD = "/upload/drive/v3/files/?uploadType=resumable&supportsAllDrives=true"
 PAGE_SIZE = 100
 CHUNK_SIZE = 5 * 262144
 RANGE_RE = re.compile("^bytes=0-\\d+$")
 
-BASE_CHUNK_SIZE = 256 * 1024  # Google's api requires uploading chunks in multiples of 256kb
-
-# During upload, chunks get sized to complete upload after 10s so we can give status updates on progress.
-CHUNK_UPLOAD_TARGET_SECONDS = 10
-
 # don't attempt to resume a session with than this many times consistant failures, just in case something is broken on Google's
 # end so we don't retry the same broken session forever.  Because the addon eventually backs off to doing 1 attempt/hour, this will
 # cause uploads to fail and start over after about 4 days.  This gets reset every time a chunk successfully uploads.
@@ -69,20 +74,35 @@ DRIVE_RETRY_INITIAL_SECONDS: int = 2
 # How uch longer to wait for each Drive service call (Exponential backoff)
 DRIVE_EXPONENTIAL_BACKOFF: int = 2
 
+# Drive won't accept more requests than this in a single batch
+BATCH_MAX_REQUESTS = 100
+HTTP_STATUS_LINE_RE = re.compile("^HTTP/\\S+ (\\d+)")
+
+# Size of the pieces an in-memory chunk is handed to aiohttp in, which avoids copying the whole chunk into a new bytes object
+SEND_SLICE_BYTES = 64 * 1024
+
 OOB_CRED_CUTOFF = datetime(2022, 3, 16, tzinfo=timezone.utc)
 
 
 @singleton
 class DriveRequests():
     @inject
-    def __init__(self, config: Config, time: Time, drive: DriveRequester, session: ClientSession, exchanger: Exchanger, byte_formatter: ByteFormatter):
+    def __init__(self, config: Config, time: Time, drive: DriveRequester, session: ClientSession, exchanger: Exchanger, byte_formatter: ByteFormatter, buffer_pool: BufferPool, data_cache: DataCache, chunk_controller: ChunkSizeController):
         self.session = session
+        self.chunk_controller = chunk_controller
+        self.buffer_pool = buffer_pool
+        self.data_cache = data_cache
         self.config = config
         self.time = time
         self.drive = drive
         self.creds: Optional[Creds] = None
         self.exchanger: Exchanger = exchanger
 
+        # The refresh of the credentials that's currently in progress, which every caller that needs new credentials
+        # waits on instead of starting another one.
+        self._refresh: Optional[asyncio.Task] = None
+        self.refreshes = 0
+
         # Between attempts to upload, we keep track of the info needed to resume a resumable upload.
         self.last_attempt_metadata = None
         self.last_attempt_location = None
@@ -91,6 +111,55 @@ class DriveRequests():
         self.bytes_formatter = byte_formatter
         self.tryLoadCredentials()
 
+    def _uploadSlug(self, metadata) -> Optional[str]:
+        if metadata is None:
+            return None
+        return metadata.get('appProperties', {}).get(NECESSARY_PROP_KEY_SLUG)
+
+    def _uploadFingerprint(self, metadata) -> str:
+        return hashlib.sha256(json.dumps(metadata, sort_keys=True).encode()).hexdigest()
+
+    def _loadUploadSession(self, metadata):
+        """
+        Recovers the resumable upload session saved for the backup described by metadata, so an upload interrupted
+        by the addon restarting can pick up where it left off instead of starting over.
+        """
+        slug = self._uploadSlug(metadata)
+        if slug is None or slug not in self.data_cache.backups:
+            return
+        saved = self.data_cache.backup(slug).get(KEY_UPLOAD_SESSION)
+        if saved is None or saved.get('fingerprint') != self._uploadFingerprint(metadata):
+            return
+        logger.debug("Found a saved upload session for backup {0}".format(slug))
+        self.last_attempt_location = saved['location']
+        self.last_attempt_metadata = metadata
+        self.last_attempt_count = saved['count']
+        self.last_attempt_start_time = self.time.parse(saved['start'])
+
+    def _saveUploadSession(self):
+        slug = self._uploadSlug(self.last_attempt_metadata)
+        if slug is None:
+            return
+        session = {
+            'location': self.last_attempt_location,
+            'fingerprint': self._uploadFingerprint(self.last_attempt_metadata),
+            'count': self.last_attempt_count,
+            'start': self.last_attempt_start_time.isoformat()
+        }
+        if self.data_cache.backup(slug).get(KEY_UPLOAD_SESSION) != session:
+            self.data_cache.backup(slug)[KEY_UPLOAD_SESSION] = session
+            self.data_cache.makeDirty()
+            self.data_cache.saveIfDirty()
+
+    def _clearUploadSession(self):
+        slug = self._uploadSlug(self.last_attempt_metadata)
+        self.last_attempt_location = None
+        self.last_attempt_metadata = None
+        if slug is not None and KEY_UPLOAD_SESSION in self.data_cache.backup(slug):
+            del self.data_cache.backup(slug)[KEY_UPLOAD_SESSION]
+            self.data_cache.makeDirty()
+            self.data_cache.saveIfDirty()
+
     async def _getHeaders(self):
         return {
             "Authorization": "Bearer " + await self.getToken(),
@@ -148,15 +217,34 @@ class DriveRequests():
     async def getToken(self, refresh=False):
         if self.creds and not self.creds.is_expired and not refresh:
             return self.creds.access_token
-
-        # refresh the credentials
-        logger.debug("Requesting refreshed Google Drive credentials")
-        self.creds = await self.exchanger.refresh(self.creds)
-        return self.creds.access_token
+        return (await self._refreshCreds()).access_token
 
     async def refreshToken(self):
         await self.getToken(refresh=True)
 
+    def tokenExpiresWithin(self, margin: timedelta) -> bool:
+        return self.creds is not None and self.time.now() + margin >= self.creds.expiration
+
+    async def _refreshCreds(self) -> Creds:
+        """
+        Refreshes the credentials, or if a refresh is already in progress waits for that one.  Callers getting
+        cancelled doesn't cancel the refresh, since others might be waiting on it too.
+        """
+        if self._refresh is None:
+            self._refresh = asyncio.create_task(self._doRefresh(), name="Drive Credentials Refresh")
+            # Mark the error as retrieved even if every caller gave up waiting on it.
+            self._refresh.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return await asyncio.shield(self._refresh)
+
+    async def _doRefresh(self) -> Creds:
+        try:
+            logger.debug("Requesting refreshed Google Drive credentials")
+            self.creds = await self.exchanger.refresh(self.creds)
+            self.refreshes += 1
+            return self.creds
+        finally:
+            self._refresh = None
+
     async def get(self, id):
         q = {
             "fields": SELECT_FIELDS,
@@ -166,15 +254,29 @@ class DriveRequests():
             return await response.json()
 
     async def download(self, id, size):
-        ret = AsyncHttpGetter(self.config.get(Setting.DRIVE_URL) + URL_FILES + id + "/?alt=media&supportsAllDrives=true",
+        url = self.config.get(Setting.DRIVE_URL) + URL_FILES + id + "/?alt=media&supportsAllDrives=true"
+        timeout = ClientTimeout(
+            sock_connect=self.config.get(Setting.DOWNLOAD_TIMEOUT_SECONDS),
+            sock_read=self.config.get(Setting.DOWNLOAD_TIMEOUT_SECONDS))
+        if self.config.get(Setting.DRIVE_DOWNLOAD_CONNECTIONS) > 1 and size is not None:
+            # Drive throttles each connection, so big files download much faster as several ranges at once.
+            return SegmentedDownload(url,
+                                     await self._getHeaders(),
+                                     self.session,
+                                     size,
+                                     connections=self.config.get(Setting.DRIVE_DOWNLOAD_CONNECTIONS),
+                                     segment_size=self.config.get(Setting.DRIVE_DOWNLOAD_SEGMENT_BYTES),
+                                     timeoutFactory=GoogleTimeoutError.factory,
+                                     otherErrorFactory=GoogleUnexpectedError.factory,
+                                     timeout=timeout,
+                                     time=self.time)
+        ret = AsyncHttpGetter(url,
                               await self._getHeaders(),
                               self.session,
                               size=size,
                               timeoutFactory=GoogleTimeoutError.factory,
                               otherErrorFactory=GoogleUnexpectedError.factory,
-                              timeout=ClientTimeout(
-                                  sock_connect=self.config.get(Setting.DOWNLOAD_TIMEOUT_SECONDS),
-                                  sock_read=self.config.get(Setting.DOWNLOAD_TIMEOUT_SECONDS)),
+                              timeout=timeout,
                               time=self.time)
         return ret
 
@@ -201,14 +303,126 @@ class DriveRequests():
                 else:
                     continuation = data['nextPageToken']
 
+    async def getChangesStartToken(self) -> str:
+        async with await self.retryRequest("GET", URL_CHANGES + "/startPageToken?supportsAllDrives=true") as response:
+            return ensureKey('startPageToken', await response.json(), "Google Drive's changes token response")
+
+    async def changes(self, page_token: str) -> Tuple[List[Dict[str, Any]], str]:
+        """
+        Gets every change made in Drive since page_token was issued, and the token to use to get changes after these.
+        See https://developers.google.com/drive/api/guides/manage-changes
+        """
+        ret = []
+        while True:
+            q = {
+                "pageToken": page_token,
+                "fields": CHANGES_FIELDS,
+                "pageSize": self.config.get(Setting.FILENIO_PAGE_SIZE),
+                "supportsAllDrives": "true",
+                "includeItemsFromAllDrives": "true",
+                "spaces": "drive"
+            }
+            async with await self.retryRequest("GET", URL_CHANGES + "?" + urlencode(q)) as response:
+                data = await response.json()
+                ret.extend(data.get('changes', []))
+                if data.get('newStartPageToken'):
+                    return ret, data['newStartPageToken']
+                page_token = ensureKey('nextPageToken', data, "Google Drive's changes response")
+
+    def updateRequest(self, id, update_metadata) -> Tuple[str, str, Optional[Dict[str, Any]]]:
+        return ("PATCH", URL_FILES + id + "/?supportsAllDrives=true", update_metadata)
+
+    def deleteRequest(self, id) -> Tuple[str, str, Optional[Dict[str, Any]]]:
+        return ("DELETE", URL_FILES + id + "/?supportsAllDrives=true", None)
+
     async def update(self, id, update_metadata):
-        async with await self.retryRequest("PATCH", URL_FILES + id + "/?supportsAllDrives=true", json=update_metadata):
+        method, url, body = self.updateRequest(id, update_metadata)
+        async with await self.retryRequest(method, url, json=body):
             pass
 
     async def delete(self, id):
-        async with await self.retryRequest("DELETE", URL_FILES + id + "/?supportsAllDrives=true"):
+        method, url, _ = self.deleteRequest(id)
+        async with await self.retryRequest(method, url):
             pass
 
+    async def batch(self, requests: List[Tuple[str, str, Optional[Dict[str, Any]]]]) -> List[Any]:
+        """
+        Makes many requests to Drive with as few round trips as possible, using Drive's batch endpoint.  See
+        https://developers.google.com/drive/api/guides/performance#batch-requests
+
+        Each request is a (method, url, json body) tuple, with the url relative to Drive's root like the ones given to
+        retryRequest.  Returns a list with the result of each request in the same order, which is either its json
+        response (None if it had none) or the exception it failed with, mapped to the same types a single request
+        would raise.  Requests that fail for transient reasons are retried the same way retryRequest would.
+        """
+        results: List[Any] = [None] * len(requests)
+        pending = list(range(len(requests)))
+        backoff = Backoff(base=DRIVE_RETRY_INITIAL_SECONDS, attempts=DRIVE_MAX_RETRIES)
+        while len(pending) > 0:
+            for start in range(0, len(pending), BATCH_MAX_REQUESTS):
+                group = pending[start:start + BATCH_MAX_REQUESTS]
+                for index, result in zip(group, await self._sendBatch([requests[i] for i in group])):
+                    results[index] = result
+            retry = [i for i in pending if isinstance(results[i], (KnownTransient, GoogleCredentialsExpired))]
+            if len(retry) == 0:
+                break
+            if any(isinstance(results[i], GoogleCredentialsExpired) for i in retry):
+                logger.debug("Google Drive credentials have expired.  We'll retry with new ones.")
+                await self.refreshToken()
+            transient = [results[i] for i in retry if isinstance(results[i], KnownTransient)]
+            if len(transient) > 0:
+                try:
+                    backoff.backoff(transient[0])
+                except KnownTransient:
+                    # Out of retries, so leave the errors as the results
+                    break
+                logger.error("{0}: we'll retry {1} request(s) in {2} seconds".format(transient[0].message(), len(retry), backoff.peek()))
+                await self.time.sleepAsync(backoff.peek())
+            pending = retry
+        return results
+
+    async def _sendBatch(self, requests: List[Tuple[str, str, Optional[Dict[str, Any]]]]) -> List[Any]:
+        writer = MultipartWriter("mixed")
+        for index, (method, url, body) in enumerate(requests):
+            part = "{0} {1} HTTP/1.1\r\n".format(method, url)
+            if body is not None:
+                part += "Content-Type: application/json; charset=UTF-8\r\n\r\n" + json.dumps(body)
+            else:
+                part += "\r\n"
+            writer.append(part, {"Content-Type": "application/http", "Content-ID": "<{0}>".format(index)})
+        # Drive should answer every request, but any it doesn't count as failed.
+        results: List[Any] = [GoogleUnexpectedError() for _ in requests]
+        async with await self.retryRequest("POST", URL_BATCH, data=writer) as response:
+            reader = MultipartReader(response.headers, response.content)
+            while True:
+                part = await reader.next()
+                if part is None:
+                    break
+                content_id = part.headers.get("Content-ID", "")
+                index = content_id[content_id.rfind("-") + 1:].strip("<>")
+                data = (await part.read()).decode()
+                if index.isdigit() and int(index) < len(requests):
+                    results[int(index)] = self._parseBatchResponse(data)
+        return results
+
+    def _parseBatchResponse(self, data: str) -> Any:
+        """Parses the HTTP response for one part of a batch into its json body, or the exception it represents"""
+        head, _, body = data.replace("\r\n", "\n").partition("\n\n")
+        match = HTTP_STATUS_LINE_RE.match(head)
+        if not match:
+            return ProtocolError("HTTP status line", "Google Drive's batch response", head)
+        status = int(match.group(1))
+        try:
+            message = json.loads(body) if len(body.strip()) > 0 else None
+        except ValueError:
+            message = None
+        if status < 400:
+            return message
+        error = self.drive.knownError(message) or self.drive.statusError(status)
+        if error is not None:
+            return error
+        return ClientResponseError(None, (), status=status, message=head.split("\n")[0])
+
     async def getAboutInfo(self):
         q = {"fields": 'storageQuota,user'}
         async with await self.retryRequest("GET", URL_ABOUT + "?" + urlencode(q)) as resp:
@@ -225,17 +439,24 @@ class DriveRequests():
             speed_as_tokens = self.config.get(Setting.UPLOAD_LIMIT_BYTES_PER_SECOND) / BASE_CHUNK_SIZE
             capacity = max(speed_as_tokens, 1)
             limiter = TokenBucket(self.time, capacity, speed_as_tokens, 0)
+        if metadata != self.last_attempt_metadata:
+            self._loadUploadSession(metadata)
         if metadata == self.last_attempt_metadata and self.last_attempt_location is not None and self.last_attempt_count < RETRY_SESSION_ATTEMPTS and self.time.now() < self.last_attempt_start_time + UPLOAD_SESSION_EXPIRATION_DURATION:
             logger.debug(
                 "Attempting to resume a previously failed upload where we left off")
             self.last_attempt_count += 1
+            self._saveUploadSession()
             # Attempt to resume from a partially completed upload.
             headers = {
                 "Content-Length": "0",
                 "Content-Range": "bytes */{0}".format(total_size)
             }
             try:
-                async with await self.retryRequest("PUT", self.last_attempt_location, headers=headers, patch_url=False) as initial:
+                probe_start = self.time.now()
+                retries = []
+                async with await self.retryRequest("PUT", self.last_attempt_location, headers=headers, patch_url=False, on_transient=lambda e: retries.append(True)) as initial:
+                    if len(retries) == 0:
+                        self.chunk_controller.recordRoundTrip((self.time.now() - probe_start).total_seconds())
                     if initial.status == 308:
                         # We can resume the upload, check where it left off
                         if 'Range' in initial.headers:
@@ -255,14 +476,12 @@ class DriveRequests():
                     # Drive doesn't recognize the resume token, so we'll just have to start over.
                     logger.debug("Drive upload session wasn't recognized, restarting upload from the beginning.")
                     location = None
-                    self.last_attempt_location = None
-                    self.last_attempt_metadata = None
+                    self._clearUploadSession()
                     raise GoogleUnexpectedError()
                 if e.status == 404:
                     logger.error("Drive upload session wasn't recognized (http 404), restarting upload from the beginning.")
                     location = None
-                    self.last_attempt_location = None
-                    self.last_attempt_metadata = None
+                    self._clearUploadSession()
                     raise GoogleUnexpectedError()
                 else:
                     raise
@@ -288,87 +507,108 @@ class DriveRequests():
         self.last_attempt_location = location
         self.last_attempt_metadata = metadata
         self.last_attempt_start_time = self.time.now()
+        self._saveUploadSession()
 
-        # Always start with the minimum chunk size and work up from there in case the last attempt
-        # failed due to connectivity errors or ... whatever.
-        current_chunk_size = 1
-        while True:
-            start = stream.position()
-
-            # See if we need to limit the chunk size to reduce bandwidth.
-            if limiter is not None:
-                request = int(await limiter.consumeWithWait(1, current_chunk_size))
-                if request != current_chunk_size:
-                    # This can go over the speed cap slightly, not a big deal though
-                    current_chunk_size = request
-            data = await stream.read(current_chunk_size * BASE_CHUNK_SIZE)
-            chunk_size = len(data.getbuffer())
-            if chunk_size == 0:
-                raise LogicError(
-                    "Backup file stream ended prematurely while uploading to Google Drive")
-            headers = {
-                "Content-Length": str(chunk_size),
-                "Content-Range": "bytes {0}-{1}/{2}".format(start, start + chunk_size - 1, total_size)
-            }
-            startTime = self.time.now()
-            logger.debug("Sending {0} to Google Drive".format(self.bytes_formatter.format(chunk_size)))
-            try:
-                async with await self.retryRequest("PUT", location, headers=headers, data=data, patch_url=False) as partial:
-                    # Base the next chunk size on how long it took to send the last chunk.
-                    current_chunk_size = self._getNextChunkSize(
-                        current_chunk_size, (self.time.now() - startTime).total_seconds())
-
-                    # any time a chunk gets uploaded, reset the retry counter.  This lets very flaky connections
-                    # complete eventually after enough retrying.
-                    self.last_attempt_count = 1
-                    yield float(start + chunk_size) / float(total_size)
-                    if partial.status == 200 or partial.status == 201:
-                        # Upload completed, return the object json
-                        self.last_attempt_location = None
-                        self.last_attempt_metadata = None
-                        yield await self.get((await partial.json())['id'])
-                        break
-                    elif partial.status == 308:
-                        # Upload partially complete, seek to the new requested position
-                        range_bytes = ensureKey(
-                            "Range", partial.headers, "Google Drive's upload response headers")
-                        if not RANGE_RE.match(range_bytes):
-                            raise ProtocolError(
+        # Start where the last upload left off, the controller already backed off if it failed due to connectivity
+        # errors or ... whatever.
+        current_chunk_size = self.chunk_controller.size()
+        reader = ReadAheadStream(stream, self.buffer_pool, max(BASE_CHUNK_SIZE, self.config.get(Setting.MAXIMUM_UPLOAD_CHUNK_BYTES)))
+        try:
+            while True:
+                start = reader.position()
+
+                # See if we need to limit the chunk size to reduce bandwidth.
+                if limiter is not None:
+                    request = int(await limiter.consumeWithWait(1, current_chunk_size))
+                    if request != current_chunk_size:
+                        # This can go over the speed cap slightly, not a big deal though
+                        current_chunk_size = request
+                data = await reader.read(current_chunk_size * BASE_CHUNK_SIZE)
+                chunk_size = len(data)
+                if chunk_size == 0:
+                    raise LogicError(
+                        "Backup file stream ended prematurely while uploading to Google Drive")
+
+                # Start reading the next chunk from the source while this one is sent to Google, assuming it'll be
+                # about the same size.  This overlaps the download and upload halves of each chunk.
+                reader.prefetch(current_chunk_size * BASE_CHUNK_SIZE)
+                headers = {
+                    "Content-Length": str(chunk_size),
+                    "Content-Range": "bytes {0}-{1}/{2}".format(start, start + chunk_size - 1, total_size)
+                }
+                startTime = self.time.now()
+                logger.debug("Sending {0} to Google Drive".format(self.bytes_formatter.format(chunk_size)))
+                retries = []
+
+                def onTransient(e: Exception):
+                    retries.append(True)
+                    self._chunkFailure(e)
+                try:
+                    async with await self.retryRequest("PUT", location, headers=headers, data=data, patch_url=False, on_transient=onTransient) as partial:
+                        # Base the next chunk size on how long it took to send the last chunk, unless retrying made
+                        # that meaningless.
+                        if len(retries) == 0:
+                            self.chunk_controller.success(chunk_size / BASE_CHUNK_SIZE, (self.time.now() - startTime).total_seconds())
+                        current_chunk_size = self.chunk_controller.size()
+
+                        # any time a chunk gets uploaded, reset the retry counter.  This lets very flaky connections
+                        # complete eventually after enough retrying.
+                        self.last_attempt_count = 1
+                        self._saveUploadSession()
+                        yield float(start + chunk_size) / float(total_size)
+                        if partial.status == 200 or partial.status == 201:
+                            # Upload completed, return the object json
+                            self._clearUploadSession()
+
+                            # Callers usually stop iterating once they get the item, so release the source now
+                            # instead of whenever this generator gets cleaned up.
+                            await reader.close()
+                            yield await self.get((await partial.json())['id'])
+                            break
+                        elif partial.status == 308:
+                            # Upload partially complete, seek to the new requested position
+                            range_bytes = ensureKey(
                                 "Range", partial.headers, "Google Drive's upload response headers")
-                        position = int(partial.headers["Range"][len("bytes=0-"):])
-                        stream.position(position + 1)
+                            if not RANGE_RE.match(range_bytes):
+                                raise ProtocolError(
+                                    "Range", partial.headers, "Google Drive's upload response headers")
+                            position = int(partial.headers["Range"][len("bytes=0-"):])
+                            reader.position(position + 1)
+                        else:
+                            partial.raise_for_status()
+                except (GoogleTimeoutError, GoogleInternalError) as e:
+                    # Only the error that ended the retries gets here, the ones before it went through onTransient.
+                    self._chunkFailure(e)
+                    raise
+                except ClientResponseError as e:
+                    self._chunkFailure(e)
+                    if math.floor(e.status / 100) == 4:
+                        # clear the cached session location URI, since a 4XX error
+                        # always means the upload session is no good anymore (AFAIK)
+                        self._clearUploadSession()
+
+                    if e.status == 404:
+                        raise GoogleSessionError()
                     else:
-                        partial.raise_for_status()
-            except ClientResponseError as e:
-                if math.floor(e.status / 100) == 4:
-                    # clear the cached session location URI, since a 4XX error
-                    # always means the upload session is no good anymore (AFAIK)
-                    self.last_attempt_location = None
-                    self.last_attempt_metadata = None
-
-                if e.status == 404:
-                    raise GoogleSessionError()
-                else:
-                    raise e
-
-    def _getNextChunkSize(self, last_chunk_size, last_chunk_seconds):
-        max = math.floor(self.config.get(Setting.MAXIMUM_UPLOAD_CHUNK_BYTES) / BASE_CHUNK_SIZE)
-        if max < 1:
-            max = 1
-        if last_chunk_seconds <= 0:
-            return max
-        next_chunk = math.floor(CHUNK_UPLOAD_TARGET_SECONDS * last_chunk_size / last_chunk_seconds)
-        if next_chunk >= max:
-            return max
-        if next_chunk < 1:
-            return 1
-        return next_chunk
+                        raise e
+        finally:
+            await reader.close()
+
+    def _chunkFailure(self, e: Exception):
+        # Server errors and timeouts can mean the connection is struggling with the chunk size, but rate limits and
+        # other client errors say nothing about it.
+        if isinstance(e, (GoogleTimeoutError, GoogleInternalError)):
+            self.chunk_controller.failure()
+        elif isinstance(e, ClientResponseError) and math.floor(e.status / 100) == 5:
+            self.chunk_controller.failure()
 
     async def createFolder(self, metadata):
         async with await self.retryRequest("POST", URL_FILES + "?supportsAllDrives=true", json=metadata) as resp:
             return await resp.json()
 
-    async def retryRequest(self, method, url, auth_headers: Optional[Dict[str, str]] = None, headers: Optional[Dict[str, str]] = None, json: Optional[Dict[str, Any]] = None, data: Any = None, cred_retry: bool = True, patch_url: bool = True) -> ClientResponse:
+    async def retryRequest(self, method, url, auth_headers: Optional[Dict[str, str]] = None, headers: Optional[Dict[str, str]] = None,
+                           json: Optional[Dict[str, Any]] = None, data: Any = None, cred_retry: bool = True, patch_url: bool = True,
+                           on_transient: Optional[Callable[[Exception], None]] = None) -> ClientResponse:
         backoff = Backoff(base=DRIVE_RETRY_INITIAL_SECONDS, attempts=DRIVE_MAX_RETRIES)
         if patch_url:
             url = self.config.get(Setting.DRIVE_URL) + url
@@ -385,14 +625,38 @@ class DriveRequests():
                     # aiohttp complains if you pass it a large byte object
                     data_to_use = io.BytesIO(data_to_use.getbuffer())
                     data_to_use.seek(0)
+                elif isinstance(data_to_use, memoryview):
+                    # Send the view in slices so a retry can send the same buffer again without copying it.
+                    data_to_use = ViewPayload(data_to_use)
                 return await self.drive.request(method, url, headers=headers_to_use, json=json, data=data_to_use)
             except GoogleCredentialsExpired:
                 # Get fresh credentials, then retry right away.
                 logger.debug("Google Drive credentials have expired.  We'll retry with new ones.")
                 await self.refreshToken()
             except KnownTransient as e:
+                # Raises once we're out of retries, so on_transient only hears about errors that get retried.
                 backoff.backoff(e)
+                if on_transient is not None:
+                    on_transient(e)
                 logger.error("{0}: we'll retry in {1} seconds".format(e.message(), backoff.peek()))
                 await self.time.sleepAsync(backoff.peek())
             except ServerTimeoutError:
                 raise GoogleTimeoutError()
+
+
+class ViewPayload(Payload):
+    """
+    Sends a memoryview as a request body a slice at a time.  Unlike a bytes body this doesn't copy the view or
+    make aiohttp warn about large bodies, and unlike a generator it can be sent again for retries and redirects.
+    """
+
+    def __init__(self, view: memoryview):
+        super().__init__(view, content_type="application/octet-stream")
+        self._size = len(view)
+
+    def decode(self, encoding: str = "utf-8", errors: str = "strict") -> str:
+        return bytes(self._value).decode(encoding, errors)
+
+    async def write(self, writer):
+        for offset in range(0, len(self._value), SEND_SLICE_BYTES):
+            await writer.write(self._value[offset:offset + SEND_SLICE_BYTES])
@@ -1,7 +1,7 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from io import IOBase
 from asyncio import Event
-from typing import Dict
+from typing import Any, Dict, List, Optional
 
 from aiohttp import ClientSession
 from aiohttp.client_exceptions import ClientResponseError
@@ -52,6 +52,12 @@ class DriveSource(BackupDestination):
         self._drive_info = None
         self._cred_trigger = Event()
 
+        # Raw Drive items in the backup folder by id, kept up to date between full listings using Drive's changes API.
+        self._items: Dict[str, Dict[str, Any]] = {}
+        self._items_folder: Optional[str] = None
+        self._changes_token: Optional[str] = None
+        self._last_full_sync = None
+
     def saveCreds(self, creds: Creds) -> None:
         logger.info("Saving new Google Drive credentials")
         self.drivebackend.saveCredentials(creds)
@@ -120,18 +126,10 @@ class DriveSource(BackupDestination):
     async def get(self, allow_retry=True) -> Dict[str, DriveBackup]:
         parent = await self.getFolderId()
         try:
-            self._drive_info = await self.drivebackend.getAboutInfo()
-        except Exception as e:
-            # This is just used to get the remaining space in Drive, which is a
-            # nice to have.  Just log the error to debug if we can't get it
-            logger.debug("Unable to retrieve Google Drive storage info: " + str(e))
-        backups: Dict[str, DriveBackup] = {}
-        try:
-            async for child in self.drivebackend.query("'{}' in parents".format(parent)):
-                properties = child.get('appProperties')
-                if properties and NECESSARY_PROP_KEY_DATE in properties and NECESSARY_PROP_KEY_SLUG in properties and not child['trashed']:
-                    backup = DriveBackup(child)
-                    backups[backup.slug()] = backup
+            if self._needsFullSync(parent):
+                await self._fullSync(parent)
+            else:
+                await self._incrementalSync(parent)
         except ClientResponseError as e:
             if e.status == 404:
                 # IIUC, 404 on create can only mean that the parent id isn't valid anymore.
@@ -148,8 +146,74 @@ class DriveSource(BackupDestination):
                 await self.folder_finder.create()
                 return await self.get(False)
             raise BackupFolderInaccessible(parent)
+        backups: Dict[str, DriveBackup] = {}
+        for child in self._items.values():
+            properties = child.get('appProperties')
+            if properties and NECESSARY_PROP_KEY_DATE in properties and NECESSARY_PROP_KEY_SLUG in properties and not child['trashed']:
+                backup = DriveBackup(child)
+                backups[backup.slug()] = backup
         return backups
 
+    def _needsFullSync(self, parent) -> bool:
+        interval = self.config.get(Setting.DRIVE_FULL_SYNC_INTERVAL_SECONDS)
+        if interval <= 0 or self._changes_token is None or self._items_folder != parent:
+            return True
+        return self.time.now() >= self._last_full_sync + timedelta(seconds=interval)
+
+    async def _fullSync(self, parent):
+        # Forget the old listing first, so a failure partway through doesn't leave it looking valid.
+        self._changes_token = None
+        self._items_folder = None
+        await self._refreshDriveInfo()
+
+        # Get the token before listing, so changes made while listing show up in the next sync instead of being lost.
+        token = None
+        if self.config.get(Setting.DRIVE_FULL_SYNC_INTERVAL_SECONDS) > 0:
+            token = await self.drivebackend.getChangesStartToken()
+        items: Dict[str, Dict[str, Any]] = {}
+        async for child in self.drivebackend.query("'{}' in parents".format(parent)):
+            items[child['id']] = child
+        self._items = items
+        self._items_folder = parent
+        self._changes_token = token
+        self._last_full_sync = self.time.now()
+
+    async def _incrementalSync(self, parent):
+        try:
+            changes, token = await self.drivebackend.changes(self._changes_token)
+        except ClientResponseError as e:
+            if e.status in [400, 404, 410]:
+                logger.info("Google Drive didn't accept the saved changes token, so the backup folder will be listed again")
+                await self._fullSync(parent)
+                return
+            raise
+        for change in changes:
+            id = change.get('fileId')
+            child = change.get('file')
+            if id == parent:
+                if change.get('removed') or child is None or child.get('trashed'):
+                    # Something happened to the backup folder itself, which a full listing knows how to handle.
+                    await self._fullSync(parent)
+                    return
+                continue
+            if change.get('removed') or child is None or parent not in child.get('parents', []):
+                # Deleted, access was lost, or moved somewhere else
+                self._items.pop(id, None)
+            else:
+                self._items[id] = child
+        self._changes_token = token
+        if len(changes) > 0:
+            # Free space can only change when something in Drive does
+            await self._refreshDriveInfo()
+
+    async def _refreshDriveInfo(self):
+        try:
+            self._drive_info = await self.drivebackend.getAboutInfo()
+        except Exception as e:
+            # This is just used to get the remaining space in Drive, which is a
+            # nice to have.  Just log the error to debug if we can't get it
+            logger.debug("Unable to retrieve Google Drive storage info: " + str(e))
+
     async def delete(self, backup: Backup):
         item = self._validateBackup(backup)
         if item.canDeleteDirectly():
@@ -160,6 +224,26 @@ class DriveSource(BackupDestination):
             await self.drivebackend.update(item.id(), {"trashed": True})
         backup.removeSource(self.name())
 
+    async def deleteMany(self, backups: List[Backup]):
+        requests = []
+        for backup in backups:
+            item = self._validateBackup(backup)
+            if item.canDeleteDirectly():
+                logger.info("Deleting '{}' From Google Drive".format(item.name()))
+                requests.append(self.drivebackend.deleteRequest(item.id()))
+            else:
+                logger.info("Trashing '{}' in Google Drive".format(item.name()))
+                requests.append(self.drivebackend.updateRequest(item.id(), {"trashed": True}))
+        error = None
+        for backup, result in zip(backups, await self.drivebackend.batch(requests)):
+            if isinstance(result, Exception):
+                logger.error("Unable to delete '{0}' from Google Drive".format(backup.name()))
+                error = error or result
+            else:
+                backup.removeSource(self.name())
+        if error is not None:
+            raise error
+
     async def save(self, backup: Backup, source: AsyncHttpGetter) -> DriveBackup:
         retain = backup.getOptions() and backup.getOptions().retain_sources.get(self.name(), False)
         parent_id = await self.getFolderId()
@@ -201,7 +285,7 @@ class DriveSource(BackupDestination):
                 size = source.size()
                 self._info.upload(size)
                 backup.overrideStatus("Uploading {0}%", source)
-                backup.setUploadSource(self.title(), source)
+                backup.setUploadSource(self.title(), source, self.drivebackend.chunk_controller)
                 async for progress in self.drivebackend.create(source, file_metadata, MIME_TYPE):
                     self._uploadedAtLeastOneChunk = True
                     if isinstance(progress, float):
@@ -0,0 +1,65 @@
+from datetime import timedelta
+
+from injector import inject, singleton
+
+from backup.config import Config, Setting
+from backup.worker import Worker
+from backup.time import Time
+from backup.util import Backoff
+from backup.logger import getLogger
+from .driverequests import DriveRequests
+
+logger = getLogger(__name__)
+
+# Bounds on how long to wait between checks.  The upper bound makes sure credentials that were replaced (eg by the
+# user authorizing again) get noticed reasonably soon.
+MIN_CHECK_SECONDS = 1
+MAX_CHECK_SECONDS = 5 * 60
+
+# How long to wait after a refresh fails before trying again, doubling with each failure
+FAILURE_BACKOFF_SECONDS = 30
+FAILURE_BACKOFF_MAX_SECONDS = 30 * 60
+
+
+@singleton
+class TokenRefresher(Worker):
+    """
+    Refreshes Google Drive credentials in the background drive_token_refresh_margin_seconds before they expire, so
+    requests to Drive don't have to wait on the token server first.  A margin of 0 turns this off and credentials only
+    get refreshed once a request finds them expired.
+    """
+    @inject
+    def __init__(self, config: Config, drive_requests: DriveRequests, time: Time):
+        super().__init__("Token Refresher", self.check, time, self.secondsUntilNextCheck)
+        self._config = config
+        self._drive_requests = drive_requests
+        self._time = time
+        self._backoff = Backoff(base=FAILURE_BACKOFF_SECONDS, max=FAILURE_BACKOFF_MAX_SECONDS)
+        self._failure_wait = None
+
+    def margin(self) -> timedelta:
+        return timedelta(seconds=self._config.get(Setting.DRIVE_TOKEN_REFRESH_MARGIN_SECONDS))
+
+    async def check(self):
+        if self.margin().total_seconds() <= 0 or not self._drive_requests.enabled():
+            return
+        if not self._drive_requests.tokenExpiresWithin(self.margin()):
+            return
+        try:
+            await self._drive_requests.refreshToken()
+            self._backoff.reset()
+            self._failure_wait = None
+        except Exception as e:
+            # Requests will try again themselves once the credentials actually expire, and report the error then.
+            self._failure_wait = self._backoff.backoff(e)
+            logger.debug("Unable to refresh Google Drive credentials ahead of time, will try again in {0} seconds: {1}".format(
+                self._failure_wait, str(e)))
+
+    def secondsUntilNextCheck(self) -> float:
+        if self._failure_wait is not None:
+            return self._failure_wait
+        creds = self._drive_requests.creds
+        if creds is None or self.margin().total_seconds() <= 0:
+            return MAX_CHECK_SECONDS
+        seconds = (creds.expiration - self.margin() - self._time.now()).total_seconds()
+        return max(MIN_CHECK_SECONDS, min(MAX_CHECK_SECONDS, seconds))
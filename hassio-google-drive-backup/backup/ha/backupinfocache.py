@@ -0,0 +1,117 @@
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+from injector import inject, singleton
+
+from ..config import Config, Setting
+from ..file import JsonFileSaver
+from ..logger import getLogger
+
+logger = getLogger(__name__)
+
+BACKUP_INFO_CACHE_FILE_NAME = "backup_info_cache.json"
+
+# Fields from the supervisor's backup list that must match what an entry was cached with for it to still be used
+KEY_FIELDS = ["date", "size"]
+
+
+@singleton
+class BackupInfoCache:
+    """
+    Remembers what the supervisor returned from /backups/<slug>/info for each backup, so it only has to be requested
+    again when a backup changes.  Entries are kept in least-recently-used order and limited to
+    BACKUP_INFO_CACHE_MAX_ENTRIES, and get saved to a file next to the data cache so a restart doesn't mean
+    requesting info for every backup all over again.
+
+    An entry is only used if the date and size the supervisor's backup list reports for it are the same as when it
+    was cached, so a backup that was replaced under the same slug gets requested again.
+    """
+    @inject
+    def __init__(self, config: Config):
+        self._config = config
+        self._entries: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load()
+
+    def path(self) -> str:
+        return os.path.join(os.path.dirname(self._config.get(Setting.DATA_CACHE_FILE_PATH)), BACKUP_INFO_CACHE_FILE_NAME)
+
+    def get(self, slug: str, listed: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Gets the cached info for a backup, or None if it needs to be requested.  'listed' is the backup's entry from the
+        supervisor's backup list, if there is one, and is used to check that the cached info is still current.
+        """
+        entry = self._entries.get(slug)
+        if entry is not None and listed is not None and entry['key'] != self._key(listed):
+            logger.debug("Backup {0} changed since its info was cached".format(slug))
+            self.remove(slug)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(slug)
+        return entry['info']
+
+    def put(self, slug: str, info: Dict[str, Any], listed: Optional[Dict[str, Any]] = None):
+        self._entries[slug] = {
+            'key': self._key(listed if listed is not None else info),
+            'info': info
+        }
+        self._entries.move_to_end(slug)
+        while len(self._entries) > max(0, self._config.get(Setting.BACKUP_INFO_CACHE_MAX_ENTRIES)):
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        self._dirty = True
+
+    def remove(self, slug: str):
+        if slug in self._entries:
+            del self._entries[slug]
+            self._dirty = True
+
+    def retainOnly(self, slugs: Iterable[str]):
+        """Evicts the info for any backup the supervisor doesn't list anymore"""
+        keep = set(slugs)
+        for slug in list(self._entries.keys()):
+            if slug not in keep:
+                self.remove(slug)
+                self.evictions += 1
+
+    def saveIfDirty(self):
+        if not self._dirty:
+            return
+        try:
+            JsonFileSaver.write(self.path(), {'backups': [[slug, entry] for slug, entry in self._entries.items()]})
+        except OSError as e:
+            # The cache just saves some requests, so failing to write it shouldn't stop anything else from working.
+            logger.warning("Unable to save the backup info cache: " + str(e))
+        self._dirty = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+    def _key(self, source: Dict[str, Any]) -> Dict[str, Any]:
+        return {field: source.get(field) for field in KEY_FIELDS}
+
+    def _load(self):
+        path = self.path()
+        if not JsonFileSaver.exists(path):
+            return
+        try:
+            for slug, entry in JsonFileSaver.read(path).get('backups', []):
+                self._entries[slug] = entry
+        except Exception as e:
+            logger.warning("Unable to load the backup info cache, so it will start empty: " + str(e))
+            self._entries.clear()
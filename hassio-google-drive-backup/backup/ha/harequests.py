@@ -1,5 +1,5 @@
 import os
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from aiohttp import ClientSession, ClientTimeout
 from aiohttp.client_exceptions import ClientResponseError, ClientConnectorError
@@ -12,6 +12,7 @@ from ..exceptions import HomeAssistantDeleteError, SupervisorConnectionError, Su
 from ..model import HABackup
 from ..logger import getLogger
 from ..util import DataCache
+from .backupinfocache import BackupInfoCache
 from backup.time import Time
 from backup.const import NECESSARY_OLD_BACKUP_PLURAL_NAME, NECESSARY_OLD_SUPERVISOR_URL
 from yarl import URL
@@ -48,9 +49,9 @@ class HaRequests():
     Stores logic for interacting with the supervisor add-on API
     """
     @inject
-    def __init__(self, config: Config, session: ClientSession, time: Time, data_cache: DataCache):
+    def __init__(self, config: Config, session: ClientSession, time: Time, data_cache: DataCache, cache: BackupInfoCache):
         self.config: Config = config
-        self.cache = {}
+        self.cache = cache
         self.session = session
         self._time = time
         self._data_cache = data_cache
@@ -97,8 +98,7 @@ class HaRequests():
 
     @supervisor_call
     async def delete(self, slug) -> None:
-        if slug in self.cache:
-            del self.cache[slug]
+        self.cache.remove(slug)
         try:
             if self.supportsBackupPaths():
                 delete_url = self.getSupervisorURL().with_path("{1}/{0}".format(slug, self._getBackupPath()))
@@ -122,12 +122,11 @@ class HaRequests():
         await self._postHassioData(url, {})
 
     @supervisor_call
-    async def backup(self, slug):
-        if slug in self.cache:
-            info = self.cache[slug]
-        else:
+    async def backup(self, slug, listed: Optional[Dict[str, Any]] = None):
+        info = self.cache.get(slug, listed)
+        if info is None:
             info = await self._getHassioData(self.getSupervisorURL().with_path("{1}/{0}/info".format(slug, self._getBackupPath())))
-            self.cache[slug] = info
+            self.cache.put(slug, info, listed)
         return HABackup(info, self._data_cache, self.config, self.config.isRetained(slug))
 
     @supervisor_call
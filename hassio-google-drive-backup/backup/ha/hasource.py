@@ -1,6 +1,9 @@
 import asyncio
+import json
+import os
+import tarfile
 import aiohttp
-from datetime import timedelta
+from datetime import datetime, timedelta
 from io import IOBase
 from threading import Lock, Thread
 from typing import Dict, List, Optional, Any, Union
@@ -8,7 +11,7 @@ from typing import Dict, List, Optional, Any, Union
 from aiohttp.client_exceptions import ClientResponseError
 from injector import inject, singleton
 
-from backup.util import AsyncHttpGetter, GlobalInfo, Estimator, DataCache, KEY_NOTE, KEY_LAST_SEEN, KEY_PENDING, KEY_NAME, KEY_CREATED, KEY_I_MADE_THIS, KEY_IGNORE
+from backup.util import AsyncHttpGetter, AsyncFileGetter, GlobalInfo, Estimator, DataCache, KEY_NOTE, KEY_LAST_SEEN, KEY_PENDING, KEY_NAME, KEY_CREATED, KEY_I_MADE_THIS, KEY_IGNORE
 from ..config import Config, Setting, CreateOptions, Startable, Version
 from ..const import SOURCE_HA
 from ..model import BackupSource, AbstractBackup, HABackup, Backup
@@ -24,6 +27,10 @@ from .addon_stopper import LOGGER, AddonStopper
 
 logger: StandardLogger = getLogger(__name__)
 
+# What the supervisor reports as a backup's location when it's stored in the local backup directory
+LOCAL_BACKUP_LOCATIONS = [None, ".local"]
+
+
 class PendingBackup(AbstractBackup):
     def __init__(self, backupType, protected, options: CreateOptions, request_info, config, time):
         super().__init__(
@@ -112,7 +119,16 @@ class PendingBackup(AbstractBackup):
             Setting.FAILED_BACKUP_TIMEOUT_SECONDS))
         staleTime = self.getFailureTime() + delta
         return self._time.now() >= staleTime
-    
+
+    def staleTime(self) -> Optional[datetime]:
+        """The earliest time isStale() could start returning True, or None if it depends on something that hasn't happened yet"""
+        times = []
+        if self._pending_subverted:
+            times.append(self.startTime() + timedelta(seconds=self._config.get(Setting.BACKUP_STALE_SECONDS)))
+        if self.isFailed():
+            times.append(self.getFailureTime() + timedelta(seconds=self._config.get(Setting.FAILED_BACKUP_TIMEOUT_SECONDS)))
+        return min(times) if len(times) > 0 else None
+
     def attach_logs(self, logs):
         self._logs = logs
 
@@ -157,6 +173,10 @@ class HaSource(BackupSource[HABackup], Startable):
         self._addons = {}
         self._changes_from_last_query = False
 
+        # The slug of the backup in each tar file seen in the backup directory, keyed by the file's path, size and
+        # modification time so a file replaced with a different backup gets read again.
+        self._local_files: Dict[tuple, Optional[str]] = {}
+
         # This lock should be used for _ANYTHING_ that interacts with self._pending_backup
         self._pending_backup_lock = asyncio.Lock()
         self.pending_backup: Optional[PendingBackup] = None
@@ -172,6 +192,12 @@ class HaSource(BackupSource[HABackup], Startable):
             self.trigger()
         return await super().check()
 
+    def nextCheck(self) -> Optional[datetime]:
+        pending = self.pending_backup
+        if pending:
+            return pending.staleTime()
+        return None
+
     def icon(self) -> str:
         return "home-assistant"
 
@@ -234,6 +260,7 @@ class HaSource(BackupSource[HABackup], Startable):
                     ret.setNote(options.note)
                 self.setDataCacheInfo(ret)
                 self._data_cache.backup(ret.slug())[KEY_I_MADE_THIS] = True
+                ret.refresh()
                 return ret
             else:
                 return self.pending_backup
@@ -286,10 +313,9 @@ class HaSource(BackupSource[HABackup], Startable):
         if 'backups' in query:
             backup_list = query['backups']
 
-        for backup in backup_list:
-            slug = backup['slug']
+        list_slugs = [backup['slug'] for backup in backup_list]
+        for slug, item in zip(list_slugs, await self._getBackupDetails(backup_list)):
             slugs.add(slug)
-            item = await self.harequests.backup(slug)
             if slug in self.pending_options:
                 item.setOptions(self.pending_options[slug])
             backups[slug] = item
@@ -348,6 +374,7 @@ class HaSource(BackupSource[HABackup], Startable):
         # bump the last seen time
         self._data_cache.backup(backup.slug())[KEY_LAST_SEEN] = self.time.now().isoformat()
         self._data_cache.makeDirty()
+        backup.refresh()
 
     async def delete(self, backup: Backup):
         slug = self._validateBackup(backup).slug()
@@ -356,10 +383,12 @@ class HaSource(BackupSource[HABackup], Startable):
         backup.removeSource(self.name())
 
     async def ignore(self, backup: Backup, ignore: bool):
-        slug = self._validateBackup(backup).slug()
+        item = self._validateBackup(backup)
         logger.info("Updating ignore settings for '{0}'".format(backup.name()))
-        self._data_cache.backup(slug)[KEY_IGNORE] = ignore
+        self._data_cache.backup(item.slug())[KEY_IGNORE] = ignore
         self._data_cache.makeDirty()
+        if isinstance(item, HABackup):
+            item.refresh()
 
     async def note(self, backup, note: Union[str, None]) -> None:
         if isinstance(backup, HABackup):
@@ -374,6 +403,7 @@ class HaSource(BackupSource[HABackup], Startable):
             self._data_cache.backup(validated.slug())[KEY_NOTE] = note
             self._data_cache.makeDirty()
             validated.setNote(note)
+            validated.refresh()
         return await super().note(backup, note)
 
     async def save(self, backup: Backup, source: AsyncHttpGetter) -> HABackup:
@@ -401,8 +431,57 @@ class HaSource(BackupSource[HABackup], Startable):
 
     async def read(self, backup: Backup) -> IOBase:
         item = self._validateBackup(backup)
+        local_path = await self._localBackupPath(item)
+        if local_path is not None:
+            logger.debug("Reading {0} directly from {1}".format(item.slug(), local_path))
+            return AsyncFileGetter(local_path, self.time)
+        logger.debug("Couldn't find {0} in the backup directory, so downloading it from the supervisor".format(item.slug()))
         return await self.harequests.download(item.slug())
 
+    async def _localBackupPath(self, backup: HABackup) -> Optional[str]:
+        """
+        Returns the path of the backup's tar file if it can be read straight off of disk, which saves the supervisor
+        from having to serve it to us over HTTP.  Backups on network storage always go through the supervisor.
+        """
+        if backup.details().get('location') not in LOCAL_BACKUP_LOCATIONS:
+            return None
+        # Newer supervisors name the tar file after the backup rather than its slug, so finding it means looking inside
+        # the files.  Only files that weren't there last time get opened.
+        self._local_files = await asyncio.get_event_loop().run_in_executor(None, self._scanBackupDirectory, dict(self._local_files))
+        for (path, _, _), slug in self._local_files.items():
+            if slug == backup.slug():
+                return path
+        return None
+
+    def _scanBackupDirectory(self, known: Dict[tuple, Optional[str]]) -> Dict[tuple, Optional[str]]:
+        found = {}
+        try:
+            entries = list(os.scandir(self.config.get(Setting.BACKUP_DIRECTORY_PATH)))
+        except OSError:
+            return found
+        for entry in entries:
+            try:
+                if not entry.name.endswith(".tar") or not entry.is_file():
+                    continue
+                stat = entry.stat()
+            except OSError:
+                continue
+            key = (entry.path, stat.st_size, stat.st_mtime_ns)
+            found[key] = known[key] if key in known else self._readSlug(entry.path)
+        return found
+
+    def _readSlug(self, path: str) -> Optional[str]:
+        try:
+            # Only reads the tar's headers and backup.json, the rest of the file gets skipped over
+            with tarfile.open(path, "r:") as tar:
+                for member in tar:
+                    if os.path.basename(member.name) == "backup.json":
+                        with tar.extractfile(member) as f:
+                            return json.load(f).get('slug')
+        except (OSError, tarfile.TarError, ValueError, AttributeError) as e:
+            logger.debug("Couldn't read the backup in {0}: {1}".format(path, e))
+        return None
+
     async def retain(self, backup: Backup, retain: bool) -> None:
         item: HABackup = self._validateBackup(backup)
         item._retained = retain
@@ -417,13 +496,22 @@ class HaSource(BackupSource[HABackup], Startable):
 
     async def _refreshInfo(self) -> None:
         try:
-            self.self_info = await self.harequests.selfInfo()
-            self.host_info = await self.harequests.info()
-            self.ha_info = await self.harequests.haInfo()
-            self.super_info = await self.harequests.supervisorInfo()
-            self.mount_info = await self.harequests.mountInfo()
-
-            addon_info = ensureKey("addons", await self.harequests.getAddons(), "Supervisor Metadata")
+            async def supervisorAndMountInfo():
+                # Whether mount info can be requested depends on the supervisor's version
+                return await self.harequests.supervisorInfo(), await self.harequests.mountInfo()
+
+            config_version = self.config.version()
+            self.self_info, self.host_info, self.ha_info, (self.super_info, self.mount_info), addons = await self._gather([
+                self.harequests.selfInfo(),
+                self.harequests.info(),
+                self.harequests.haInfo(),
+                supervisorAndMountInfo(),
+                self.harequests.getAddons()])
+            if self.config.version() != config_version:
+                # Settings got saved while these were on their way, so the addon options may be from before then
+                self.self_info = await self.harequests.selfInfo()
+
+            addon_info = ensureKey("addons", addons, "Supervisor Metadata")
             self.config.update(
                 ensureKey("options", self.self_info, "addon metdata"))
             if self.config.mustSaveUpgradeChanges():
@@ -456,6 +544,34 @@ class HaSource(BackupSource[HABackup], Startable):
             logger.debug(logger.formatException(e))
             raise e
 
+    async def _getBackupDetails(self, backup_list: List[Dict[str, Any]]) -> List[HABackup]:
+        """
+        Gets the details of each backup from the supervisor (or the cache) in the same order as the supervisor listed
+        them, with at most SUPERVISOR_MAX_CONCURRENT_REQUESTS requests in flight at once so a long list of backups
+        doesn't overwhelm it.
+        """
+        self.harequests.cache.retainOnly(backup['slug'] for backup in backup_list)
+        limit = asyncio.Semaphore(self.config.get(Setting.SUPERVISOR_MAX_CONCURRENT_REQUESTS))
+
+        async def getDetails(listed):
+            async with limit:
+                return await self.harequests.backup(listed['slug'], listed)
+        try:
+            return await self._gather([getDetails(listed) for listed in backup_list])
+        finally:
+            self.harequests.cache.saveIfDirty()
+            self._info.addDebugInfo("backup_info_cache", self.harequests.cache.stats())
+
+    async def _gather(self, coroutines) -> List[Any]:
+        """Like asyncio.gather(), but cancels everything still running if one of them fails"""
+        tasks = [asyncio.create_task(coroutine) for coroutine in coroutines]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
     def addonHasLogo(self, slug):
         return self._addons.get(slug, {}).get('logo', False)
 
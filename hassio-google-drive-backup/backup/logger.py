@@ -3,6 +3,7 @@ from logging import LogRecord, Formatter, ERROR
 from traceback import TracebackException
 from colorlog import ColoredFormatter
 from os.path import join, abspath
+from typing import Callable, List
 
 HISTORY_SIZE = 1000
 PATH_BASE = abspath(join(__file__, "..", ".."))
@@ -16,6 +17,7 @@ class HistoryHandler(logging.Handler):
         super(HistoryHandler, self).__init__()
         self.history = [None] * HISTORY_SIZE
         self.history_index = 0
+        self._listeners: List[Callable[[], None]] = []
 
     def reset(self):
         self.history = [None] * HISTORY_SIZE
@@ -24,6 +26,21 @@ class HistoryHandler(logging.Handler):
     def emit(self, record: LogRecord):
         self.history[self.history_index % HISTORY_SIZE] = record
         self.history_index += 1
+        for listener in list(self._listeners):
+            # Records can be emitted from any thread, so listeners must be safe to call from any thread too.
+            try:
+                listener()
+            except Exception:
+                # Usually a listener waking an event loop that has since closed, eg an event stream left open at
+                # shutdown.  It would fail the same way for every record, and logging here would only recurse.
+                self.removeListener(listener)
+
+    def addListener(self, listener: Callable[[], None]):
+        self._listeners.append(listener)
+
+    def removeListener(self, listener: Callable[[], None]):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
 
     def getHistory(self, start=0, html=False):
         end = self.history_index
@@ -195,6 +212,14 @@ def getLast() -> LogRecord:
     return HISTORY.getLast()
 
 
+def addHistoryListener(listener: Callable[[], None]) -> None:
+    HISTORY.addListener(listener)
+
+
+def removeHistoryListener(listener: Callable[[], None]) -> None:
+    HISTORY.removeListener(listener)
+
+
 def reset() -> None:
     return HISTORY.reset()
 
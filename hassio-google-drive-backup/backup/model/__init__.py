@@ -11,3 +11,4 @@ from .habackup import HABackup
 from .simulatedsource import SimulatedSource
 from .precache import Precache
 from .destinationprecache import DestinationPrecache
+from .simulation import RetentionSimulator, DEFAULT_SIMULATION_MONTHS, MAX_SIMULATION_MONTHS
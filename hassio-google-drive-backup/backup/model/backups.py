@@ -21,6 +21,10 @@ HA_KEY_TEXT = "Home Assistant's backup metadata"
 
 
 class AbstractBackup():
+    # There can be thousands of these around, so they skip having a __dict__
+    __slots__ = ('_options', '_name', '_slug', '_source', '_date', '_size', '_retained', '_uploadable', '_details', '_version',
+                 '_backupType', '_protected', '_ignore', '_note', '_pending')
+
     def __init__(self, name: str, slug: str, source: str, date: str, size: int, version: str, backupType: str, protected: bool, note=None, retained: bool = False, uploadable: bool = False, details={}, pending=False):
         self._options = None
         self._name = name
@@ -119,9 +123,15 @@ class Backup(object):
     Represents a Home Assistant backup stored on Google Drive, locally in
     Home Assistant, or a pending backup we expect to see show up later
     """
+    __slots__ = ('sources', '_purgeNext', '_options', '_status_override', '_status_override_args', '_state_detail', '_upload_source',
+                 '_upload_source_name', '_upload_fail_info', '_upload_controller', '_primary', '_version', '_details', '_pending')
 
     def __init__(self, backup: Optional[AbstractBackup] = None):
         self.sources: Dict[str, AbstractBackup] = {}
+        self._primary: Optional[AbstractBackup] = None
+        self._version = None
+        self._details = {}
+        self._pending = False
         self._purgeNext: Dict[str, bool] = {}
         self._options = None
         self._status_override = None
@@ -130,6 +140,7 @@ class Backup(object):
         self._upload_source = None
         self._upload_source_name = None
         self._upload_fail_info = None
+        self._upload_controller = None
         if backup is not None:
             self.addSource(backup)
 
@@ -146,6 +157,7 @@ class Backup(object):
         self.sources[backup.source()] = backup
         if backup.getOptions() and not self.getOptions():
             self.setOptions(backup.getOptions())
+        self._updateCachedFields()
 
     def getStatusDetail(self):
         return self._state_detail
@@ -158,6 +170,14 @@ class Backup(object):
             del self.sources[source]
         if source in self._purgeNext:
             del self._purgeNext[source]
+        self._updateCachedFields()
+
+    def _updateCachedFields(self):
+        # These get asked for over and over while sorting and purging, but only change when a source comes or goes
+        self._primary = next(iter(self.sources.values()), None)
+        self._version = next((backup.version() for backup in self.sources.values() if backup.version() is not None), None)
+        self._details = next((backup.details() for backup in self.sources.values() if backup.details() is not None), {})
+        self._pending = any(backup.isPending() for backup in self.sources.values())
 
     def getPurges(self):
         return self._purgeNext
@@ -176,9 +196,9 @@ class Backup(object):
         return self.sources.get(source, None)
 
     def name(self):
-        for backup in self.sources.values():
-            return backup.name()
-        return "error"
+        if self._primary is None:
+            return "error"
+        return self._primary.name()
 
     def note(self):
         longest = None
@@ -188,36 +208,30 @@ class Backup(object):
         return longest
 
     def slug(self) -> str:
-        for backup in self.sources.values():
-            return backup.slug()
-        return "error"
+        if self._primary is None:
+            return "error"
+        return self._primary.slug()
 
     def size(self) -> int:
-        for backup in self.sources.values():
-            return backup.size()
-        return 0
+        if self._primary is None:
+            return 0
+        return self._primary.size()
 
     def sizeInt(self) -> int:
-        for backup in self.sources.values():
-            return backup.sizeInt()
-        return 0
+        if self._primary is None:
+            return 0
+        return self._primary.sizeInt()
 
     def backupType(self) -> str:
-        for backup in self.sources.values():
-            return backup.backupType()
-        return "error"
+        if self._primary is None:
+            return "error"
+        return self._primary.backupType()
 
     def version(self) -> Union[str, None]:
-        for backup in self.sources.values():
-            if backup.version() is not None:
-                return backup.version()
-        return None
+        return self._version
 
     def details(self):
-        for backup in self.sources.values():
-            if backup.details() is not None:
-                return backup.details()
-        return {}
+        return self._details
 
     def getUploadInfo(self, time):
         if self._upload_source_name is None:
@@ -232,12 +246,16 @@ class Backup(object):
             ret['speed'] = self._upload_source.speed(timedelta(seconds=20))
             ret['total'] = self._upload_source.position()
             ret['started'] = time.formatDelta(self._upload_source.startTime())
+            if self._upload_controller is not None:
+                ret['chunking'] = self._upload_controller.info()
+            if self._upload_source.reconnects > 0:
+                ret['reconnects'] = self._upload_source.reconnectInfo()
         return ret
 
     def protected(self) -> bool:
-        for backup in self.sources.values():
-            return backup.protected()
-        return False
+        if self._primary is None:
+            return False
+        return self._primary.protected()
 
     def ignore(self) -> bool:
         for backup in self.sources.values():
@@ -246,9 +264,9 @@ class Backup(object):
         return True
 
     def date(self) -> datetime:
-        for backup in self.sources.values():
-            return backup.date()
-        return datetime.now(tzutc())
+        if self._primary is None:
+            return datetime.now(tzutc())
+        return self._primary.date()
 
     def sizeString(self) -> str:
         size_string = self.size()
@@ -284,15 +302,17 @@ class Backup(object):
         self._status_override = format
         self._status_override_args = args
 
-    def setUploadSource(self, source_name: str, source):
+    def setUploadSource(self, source_name: str, source, controller=None):
         self._upload_source = source
         self._upload_source_name = source_name
         self._upload_fail_info = None
+        self._upload_controller = controller
 
     def clearUploadSource(self):
         self._upload_source = None
         self._upload_source_name = None
         self._upload_fail_info = None
+        self._upload_controller = None
 
     def uploadFailure(self, info):
         self._upload_source = None
@@ -303,10 +323,7 @@ class Backup(object):
         self._status_override_args = None
 
     def isPending(self):
-        for backup in self.sources.values():
-            if backup.isPending():
-                return True
-        return False
+        return self._pending
 
     def __str__(self) -> str:
         return "<Slug: {0} {1} {2}>".format(self.slug(), " ".join(self.sources), self.date().isoformat())
@@ -1,15 +1,22 @@
 from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right, insort_right
 from calendar import monthrange
+from copy import copy
 from datetime import datetime, timedelta, date
-from typing import List, Optional, Sequence, Set, Tuple, Any, Union
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Any, Union
+
+from pytz import utc
 
 from .backups import Backup
-from backup.util import RangeLookup
 from ..time import Time
 from ..config import GenConfig
 from ..logger import getLogger
 logger = getLogger(__name__)
 
+# How many partition layouts LocalDays remembers, enough for the weeks, months and years around the newest backup and
+# the days around it
+LAYOUTS_KEPT = 16
+
 
 class BackupScheme(ABC):
     def __init__(self):
@@ -19,17 +26,66 @@ class BackupScheme(ABC):
     def getOldest(self, backups: Sequence[Backup]) -> Tuple[str, Optional[Backup]]:
         pass
 
+    def planner(self, backups: Sequence[Backup]) -> 'PurgePlanner':
+        return PurgePlanner(self, backups)
+
+    def getPurgeOrder(self, backups: Sequence[Backup]) -> List[Tuple[Any, Backup]]:
+        """
+        Returns every backup getOldest() would pick, in order, if each one were deleted before asking again, along with
+        the reason it was picked.
+        """
+        planner = self.planner(backups)
+        order = []
+        while True:
+            reason, oldest = planner.next()
+            if oldest is None:
+                return order
+            order.append((reason, oldest))
+            planner.remove(oldest)
+
     def handleNaming(self, backups: Sequence[Backup]) -> None:
         for backup in backups:
             backup.setStatusDetail(None)
 
 
+class PurgePlanner(object):
+    """
+    Keeps track of what a scheme would purge next from a set of backups as they get added and removed.  This one just
+    asks the scheme each time, schemes that can keep some state between questions return something faster from
+    planner().
+    """
+
+    def __init__(self, scheme: BackupScheme, backups: Sequence[Backup]):
+        self.scheme = scheme
+        self.backups = list(backups)
+
+    def add(self, backup: Backup) -> None:
+        self.backups.append(backup)
+
+    def remove(self, backup: Backup) -> None:
+        self.backups.remove(backup)
+
+    def next(self, scheme: Optional[BackupScheme] = None) -> Tuple[Any, Optional[Backup]]:
+        """
+        Returns what getOldest() on 'scheme' would give for the current backups.  'scheme' defaults to the one the
+        planner was made for, and otherwise must only differ from it in how many backups it keeps.
+        """
+        return (scheme or self.scheme).getOldest(self.backups)
+
+
 class DeleteAfterUploadScheme(BackupScheme):
     def __init__(self, source: str, destinations: List[str]):
         self.source = source
         self.destinations = destinations
 
     def getOldest(self, backups: List[Backup]):
+        # Delete the oldest first
+        return OldestScheme().getOldest(self._uploaded(backups))
+
+    def getPurgeOrder(self, backups: Sequence[Backup]) -> List[Tuple[Any, Backup]]:
+        return OldestScheme().getPurgeOrder(self._uploaded(backups))
+
+    def _uploaded(self, backups: Sequence[Backup]) -> List[Backup]:
         consider = []
         for backup in backups:
             uploaded = True
@@ -42,9 +98,7 @@ class DeleteAfterUploadScheme(BackupScheme):
                     uploaded = False
             if uploaded:
                 consider.append(backup)
-
-        # Delete the oldest first
-        return OldestScheme().getOldest(consider)
+        return consider
 
 
 class OldestScheme(BackupScheme):
@@ -56,11 +110,162 @@ class OldestScheme(BackupScheme):
             return None, None
         return "default", min(backups, default=None, key=lambda s: s.date())
 
+    def planner(self, backups: Sequence[Backup]) -> PurgePlanner:
+        return OldestPlanner(self, backups)
+
     def handleNaming(self, backups: Sequence[Backup]) -> None:
         for backup in backups:
             backup.setStatusDetail(None)
 
 
+class OldestPlanner(PurgePlanner):
+    """Keeps the backups in date order, so the oldest is always the first one"""
+
+    def __init__(self, scheme: OldestScheme, backups: Sequence[Backup]):
+        # sort is stable, so backups with the same date stay in the order min() would pick them
+        super().__init__(scheme, sorted(backups, key=lambda s: s.date()))
+
+    def add(self, backup: Backup) -> None:
+        insort_right(self.backups, backup, key=lambda s: s.date())
+
+    def remove(self, backup: Backup) -> None:
+        position = bisect_left(self.backups, backup.date(), key=lambda s: s.date())
+        while self.backups[position] is not backup:
+            position += 1
+        del self.backups[position]
+
+    def next(self, scheme: Optional[OldestScheme] = None) -> Tuple[Any, Optional[Backup]]:
+        if len(self.backups) <= (scheme or self.scheme).count:
+            return None, None
+        return "default", self.backups[0] if len(self.backups) > 0 else None
+
+
+class LocalDays(object):
+    """
+    Remembers which local day each backup date falls on, so the same dates don't get converted to local time every
+    time a scheme looks at them.
+    """
+
+    def __init__(self, time: Time):
+        self.time = time
+        self._tz = time.local_tz
+        self._ordinals: Dict[datetime, int] = {}
+        self._midnights: Dict[int, datetime] = {}
+        self._layouts: Dict[Tuple[Tuple[Any, ...], Any], List[Any]] = {}
+
+    def ordinal(self, utc_datetime: datetime) -> int:
+        self._checkZone()
+        ordinal = self._ordinals.get(utc_datetime)
+        if ordinal is None:
+            ordinal = self.time.toLocal(utc_datetime).toordinal()
+            self._ordinals[utc_datetime] = ordinal
+        return ordinal
+
+    def midnight(self, ordinal: int) -> datetime:
+        """The start of the local day with the given ordinal"""
+        self._checkZone()
+        midnight = self._midnights.get(ordinal)
+        if midnight is None:
+            day = date.fromordinal(ordinal)
+            midnight = self.time.localize(datetime(day.year, day.month, day.day, 0, 0))
+            self._midnights[ordinal] = midnight
+        return midnight
+
+    def layout(self, settings: Tuple[Any, ...], key: Any, build: Callable[[], List[Any]]) -> List[Any]:
+        """
+        The partition layout (or part of one) for a GenConfig's 'settings' identified by 'key', eg a local day's
+        ordinal, which 'build' makes the first time it's needed.
+        """
+        self._checkZone()
+        key = (settings, key)
+        layout = self._layouts.pop(key, None)
+        if layout is None:
+            layout = build()
+            if len(self._layouts) >= LAYOUTS_KEPT:
+                # Only the periods around the newest backup get asked about again, so forget the one used longest ago
+                del self._layouts[next(iter(self._layouts))]
+        self._layouts[key] = layout
+        return layout
+
+    def retain(self, dates: Iterable[datetime]) -> None:
+        """Forgets every date not in 'dates'"""
+        keep = set(dates)
+        self._ordinals = {key: value for key, value in self._ordinals.items() if key in keep}
+        self._midnights = {}
+        self._layouts = {}
+
+    def _checkZone(self):
+        if self.time.local_tz is not self._tz:
+            # The time zone changed, so every local day could be different
+            self._tz = self.time.local_tz
+            self._ordinals = {}
+            self._midnights = {}
+            self._layouts = {}
+
+
+class DayIndex(object):
+    """
+    Backups in date order alongside their dates and local day ordinals, so a partition can find the backups it covers
+    and the ones on its preferred day with a bisect.
+    """
+
+    def __init__(self, sorted: List[Backup], days: LocalDays):
+        self.days = days
+        self.backups = sorted
+        self.dates = [backup.date() for backup in sorted]
+        self.ordinals = [days.ordinal(date) for date in self.dates]
+
+        # Local days only go backward when a clock change crosses midnight, where a bisect over them won't work
+        self._in_order = all(a <= b for a, b in zip(self.ordinals, self.ordinals[1:]))
+
+    def __len__(self):
+        return len(self.backups)
+
+    def insert(self, backup: Backup) -> int:
+        """Adds 'backup' after any others with the same date, returning where it went"""
+        date = backup.date()
+        ordinal = self.days.ordinal(date)
+        position = bisect_right(self.dates, date)
+        if position > 0 and self.ordinals[position - 1] > ordinal:
+            self._in_order = False
+        if position < len(self.ordinals) and self.ordinals[position] < ordinal:
+            self._in_order = False
+        self.backups.insert(position, backup)
+        self.dates.insert(position, date)
+        self.ordinals.insert(position, ordinal)
+        return position
+
+    def position(self, backup: Backup) -> int:
+        position = bisect_left(self.dates, backup.date())
+        while self.backups[position] is not backup:
+            position += 1
+        return position
+
+    def remove(self, index: int) -> None:
+        del self.backups[index]
+        del self.dates[index]
+        del self.ordinals[index]
+
+    def range(self, start: datetime, end: datetime) -> Tuple[int, int]:
+        """The indexes of the first backup at or after 'start' and of the one after the last backup at or before 'end'"""
+        return bisect_left(self.dates, start), bisect_right(self.dates, end)
+
+    def latestOnDay(self, ordinal: int, first: int, last: int) -> Optional[Backup]:
+        """The latest backup between indexes 'first' and 'last' on the given local day, or the first of several with that date"""
+        if self._in_order:
+            first = bisect_left(self.ordinals, ordinal, first, last)
+            last = bisect_right(self.ordinals, ordinal, first, last)
+            if first == last:
+                return None
+            return self.backups[bisect_left(self.dates, self.dates[last - 1], first, last)]
+
+        matches = [x for x in range(first, last) if self.ordinals[x] == ordinal]
+        if len(matches) == 0:
+            return None
+        latest = self.dates[matches[-1]]
+        return self.backups[next(x for x in matches if self.dates[x] == latest)]
+
+
 class Partition(object):
     def __init__(self, start: datetime, end: datetime, prefer: datetime, time: Time, details=None, delete_only: bool = False):
         self.start: datetime = start
@@ -71,28 +276,29 @@ class Partition(object):
         self.selected = None
         self._delete_only_partitions = delete_only
 
-    def select(self, backups: List[Backup]) -> Optional[Backup]:
-        options = list(RangeLookup(backups, lambda s: s.date()).matches(self.start, self.end - timedelta(milliseconds=1)))
+        # Backup dates are in UTC, and comparing datetimes in the same time zone is much quicker than across them
+        self._first = start.astimezone(utc)
+        self._last = (end - timedelta(milliseconds=1)).astimezone(utc)
+        self._prefer_day: Optional[int] = None
 
-        searcher = lambda s: self.day(s.date()) == self.day(self.prefer)
+    def covers(self, date: datetime) -> bool:
+        return self._first <= date <= self._last
 
-        preferred = list(filter(searcher, options))
-        if len(preferred) > 0:
-            # If there is a backup on the "preferred" day, then use the latest backup on that day
-            self.selected = max(preferred, default=None, key=Backup.date)
-        else:
+    def select(self, index: DayIndex) -> Optional[Backup]:
+        first, last = index.range(self._first, self._last)
+
+        # If there is a backup on the "preferred" day, then use the latest backup on that day
+        if self._prefer_day is None:
+            self._prefer_day = index.days.ordinal(self.prefer)
+        self.selected = index.latestOnDay(self._prefer_day, first, last)
+        if self.selected is None and first < last:
             #  Otherwise, use the earliest backup over the valid period.
-            self.selected = min(options, default=None, key=Backup.date)
+            self.selected = index.backups[first]
         return self.selected
 
     def delta(self) -> timedelta:
         return self.end - self.start
 
-    def day(self, date: datetime):
-        # TODO: this conversion isn't time-zone safe, but is ok because we only use it to compare local day to local day.
-        local = self.time.toLocal(date)
-        return datetime(day=local.day, month=local.month, year=local.year)
-
     # True if the partition exists only to determine why a snapshot is getting deleted.
     @property
     def is_delete_only(self):
@@ -104,15 +310,65 @@ class Partition(object):
 
 
 class GenerationalScheme(BackupScheme):
-    def __init__(self, time: Time, config: GenConfig, count=0):
+    def __init__(self, time: Time, config: GenConfig, count=0, days: Optional[LocalDays] = None):
         self.count = count
         self.time: Time = time
         self.config = config
+        self.days = days if days is not None else LocalDays(time)
 
-    def _buildPartitions(self, backups_input):
-        backups: List[Backup] = list(backups_input)
+        # Schemes get made with a new config for every purge, so layouts are remembered by the settings in it, which
+        # are much quicker to compare than the config
+        self._settings = tuple(sorted(vars(config).items()))
 
+    def _index(self, backups: Sequence[Backup]) -> DayIndex:
+        sorted = list(backups)
+        sorted.sort(key=lambda s: s.date())
+        return DayIndex(sorted, self.days)
+
+    def _buildPartitions(self, index: DayIndex):
         # build the list of dates we should partition by
+        lookups = [Partition(start, end, prefer, self.time, details, delete_only=delete_only)
+                   for start, end, prefer, details, delete_only in self._layout(index.dates[len(index) - 1])]
+
+        # Keep track of which backups are being saved for which time period.
+        for lookup in lookups:
+            lookup.select(index)
+        return lookups
+
+    def _layout(self, newest: datetime) -> List[Tuple[datetime, datetime, datetime, str, bool]]:
+        """
+        The start, end, preferred day, details and whether it's delete only for each partition of backups up to 'newest',
+        which only depend on the local day it falls on.
+        """
+        return [entry for group in self._layoutGroups(newest) for entry in group]
+
+    def _layoutGroups(self, newest: datetime) -> List[List[Tuple[datetime, datetime, datetime, str, bool]]]:
+        """
+        The same layout as _layout() split into days, weeks, months and years.  Only the days change from one day to the
+        next, so the rest gets built once a week, month or year and is the same list until then.
+        """
+        return self.days.layout(self._settings, self.days.ordinal(newest), lambda: self._buildLayout(newest))
+
+    def _buildLayout(self, newest: datetime) -> List[List[Tuple[datetime, datetime, datetime, str, bool]]]:
+        last = self.time.toLocal(newest)
+        monday = last.toordinal() - last.weekday()
+        return [self._buildDays(last),
+                self.days.layout(self._settings, ("weeks", monday), lambda: self._buildWeeks(monday)),
+                self.days.layout(self._settings, ("months", last.year, last.month), lambda: self._buildMonths(last)),
+                self.days.layout(self._settings, ("years", last.year), lambda: self._buildYears(last))]
+
+    def _buildDays(self, last: datetime) -> List[Tuple[datetime, datetime, datetime, str, bool]]:
+        lookups: List[Tuple[datetime, datetime, datetime, str, bool]] = []
+        if self.config.days > 0:
+            today = last.toordinal()
+            nextDay = self.days.midnight(today + 1)
+            for x in range(0, self.config.days + 1):
+                currentDay = self.days.midnight(today - x)
+                lookups.append((currentDay, nextDay, currentDay, "Day {0} of {1}".format(x + 1, self.config.days), x >= self.config.days))
+                nextDay = currentDay
+        return lookups
+
+    def _buildWeeks(self, monday: int) -> List[Tuple[datetime, datetime, datetime, str, bool]]:
         day_of_week = 3
         weekday_lookup = {
             'mon': 0,
@@ -126,31 +382,21 @@ class GenerationalScheme(BackupScheme):
         if self.config.day_of_week in weekday_lookup:
             day_of_week = weekday_lookup[self.config.day_of_week]
 
-        last = self.time.toLocal(backups[len(backups) - 1].date())
-        lookups: List[Partition] = []
-        currentDay = self.day(last)
-        if self.config.days > 0:
-            for x in range(0, self.config.days + 1):
-                nextDay = self.day(currentDay, add_days=1)
-                lookups.append(
-                    Partition(currentDay, nextDay, currentDay, self.time, "Day {0} of {1}".format(x + 1, self.config.days), delete_only=(x >= self.config.days)))
-                currentDay = self.day(currentDay, add_days=-1)
-
+        lookups: List[Tuple[datetime, datetime, datetime, str, bool]] = []
         if self.config.weeks > 0:
             for x in range(0, self.config.weeks + 1):
-                # Start at the first monday preceeding the last backup
-                start = self.time.local(last.year, last.month, last.day)
-                start = self.day(start, add_days=-1 * start.weekday())
-
-                # Move back x weeks
-                start = self.day(start, add_days=-7 * x)
+                # Start at the first monday preceeding the last backup, then move back x weeks
+                start = self.days.midnight(monday - 7 * x)
                 end = self.day(start, add_days=7)
 
                 # Only consider backups from that week after the start day
                 # TODO: should this actually "prefer" the day of week but start on monday?
                 start = self.day(start, add_days=day_of_week)
-                lookups.append(Partition(start, end, start, self.time, "Week {0} of {1}".format(x + 1, self.config.weeks), delete_only=(x >= self.config.weeks)))
+                lookups.append((start, end, start, "Week {0} of {1}".format(x + 1, self.config.weeks), x >= self.config.weeks))
+        return lookups
 
+    def _buildMonths(self, last: datetime) -> List[Tuple[datetime, datetime, datetime, str, bool]]:
+        lookups: List[Tuple[datetime, datetime, datetime, str, bool]] = []
         if self.config.months > 0:
             for x in range(0, self.config.months + 1):
                 year_offset = int(x / 12)
@@ -158,55 +404,54 @@ class GenerationalScheme(BackupScheme):
                 if last.month - month_offset < 1:
                     year_offset = year_offset + 1
                     month_offset = month_offset - 12
-                start = self.time.local(
-                    last.year - year_offset, last.month - month_offset, 1)
+                start = self.days.midnight(date(last.year - year_offset, last.month - month_offset, 1).toordinal())
                 weekday, days = monthrange(start.year, start.month)
                 end = start + timedelta(days=days)
-                lookups.append(Partition(
-                    start, end, start + timedelta(days=self.config.day_of_month - 1), self.time,
-                    "{0} ({1} of {2} months)".format(start.strftime("%B"), x + 1, self.config.months), delete_only=(x >= self.config.months)))
+                lookups.append((
+                    start, end, start + timedelta(days=self.config.day_of_month - 1),
+                    "{0} ({1} of {2} months)".format(start.strftime("%B"), x + 1, self.config.months), x >= self.config.months))
+        return lookups
 
+    def _buildYears(self, last: datetime) -> List[Tuple[datetime, datetime, datetime, str, bool]]:
+        lookups: List[Tuple[datetime, datetime, datetime, str, bool]] = []
         if self.config.years > 0:
             for x in range(0, self.config.years + 1):
-                start = self.time.local(last.year - x, 1, 1)
-                end = self.time.local(last.year - x + 1, 1, 1)
-                lookups.append(Partition(
-                    start, end, start + timedelta(days=self.config.day_of_year - 1), self.time,
-                    "{0} ({1} of {2} years)".format(start.strftime("%Y"), x + 1, self.config.years), delete_only=(x >= self.config.years)))
-
-        # Keep track of which backups are being saved for which time period.
-        for lookup in lookups:
-            lookup.select(backups)
+                start = self.days.midnight(date(last.year - x, 1, 1).toordinal())
+                end = self.days.midnight(date(last.year - x + 1, 1, 1).toordinal())
+                lookups.append((
+                    start, end, start + timedelta(days=self.config.day_of_year - 1),
+                    "{0} ({1} of {2} years)".format(start.strftime("%Y"), x + 1, self.config.years), x >= self.config.years))
         return lookups
 
     def getOldest(self, backups: Sequence[Backup]):
         if len(backups) == 0:
             return None, None
 
-        sorted = list(backups)
-        sorted.sort(key=lambda s: s.date())
+        index = self._index(backups)
+        return self._choose(index.backups, self._buildPartitions(index))
+
+    def planner(self, backups: Sequence[Backup]) -> PurgePlanner:
+        return GenerationalPlanner(self, backups)
 
-        partitions = self._buildPartitions(sorted)
+    def _choose(self, sorted: List[Backup], partitions: List[Partition]):
         keepers: Set[Backup] = set()
         for part in partitions:
             if part.selected is not None and not part.is_delete_only:
                 keepers.add(part.selected)
 
-        extras = []
-        for backup in sorted:
-            if backup not in keepers:
-                extras.append(backup)
+        # sorted is in date order, so the first backup that isn't kept is also the oldest
+        extra = next((backup for backup in sorted if backup not in keepers), None)
 
-        if self.config.aggressive and len(extras) > 0:
-            match = min(filter(lambda p: p.selected == extras[0], partitions), key=Partition.delta, default=None)
+        if self.config.aggressive and extra is not None:
+            match = min(filter(lambda p: p.selected == extra, partitions), key=Partition.delta, default=None)
             if match is not None:
-                return match, extras[0]
-            return "default", extras[0]
+                return match, extra
+            return "default", extra
 
         if len(sorted) <= self.count and not self.config.aggressive:
             return "default", None
-        elif (self.config.aggressive or len(sorted) > self.count) and len(extras) > 0:
-            return "default", min(extras, default=None, key=lambda s: s.date())
+        elif (self.config.aggressive or len(sorted) > self.count) and extra is not None:
+            return "default", extra
         elif len(sorted) > self.count:
             # no non-keep is invalid, so delete the oldest keeper
             return "default", min(keepers, default=None, key=lambda s: s.date())
@@ -223,14 +468,119 @@ class GenerationalScheme(BackupScheme):
 
         if len(unignored) == 0:
             return
-        for part in self._buildPartitions(unignored):
+        for part in self._buildPartitions(DayIndex(unignored, self.days)):
             if part.selected is not None:
                 if part.selected.getStatusDetail() is None:
                     part.selected.setStatusDetail([])
                 part.selected.getStatusDetail().append(part.details)
 
     def day(self, utc_datetime: datetime, add_days=0):
-        local = self.time.toLocal(utc_datetime)
+        return self.days.midnight(self.days.ordinal(utc_datetime) + add_days)
+
+
+class GenerationalPlanner(PurgePlanner):
+    """
+    Keeps the partitions a GenerationalScheme would build for the current backups, and when a backup is added or
+    removed only selects again in the partitions it falls in.  Partitions are laid out from the local day of the newest
+    backup, and when that day changes most of them cover the same dates as before, so those keep what they selected.
+    """
+
+    def __init__(self, scheme: GenerationalScheme, backups: Sequence[Backup]):
+        self.scheme = scheme
+        self.index = scheme._index(backups)
+        self.partitions: List[Partition] = []
+        self._day: Optional[int] = None
 
-        local_date = date.fromordinal(date(local.year, local.month, local.day).toordinal() + add_days)
-        return self.time.localize(datetime(local_date.year, local_date.month, local_date.day, 0, 0))
+        # Each group of the layout the partitions were made from, with the partitions made from it
+        self._groups: List[Tuple[List[Any], List[Partition]]] = []
+
+        # What next() last chose and for which scheme, until a backup comes or goes
+        self._chosen: Optional[Tuple[GenerationalScheme, Any, Optional[Backup]]] = None
+        if len(self.index) > 0:
+            self._relayout(None)
+
+    @property
+    def backups(self) -> List[Backup]:
+        return self.index.backups
+
+    def add(self, backup: Backup) -> None:
+        self._chosen = None
+        position = self.index.insert(backup)
+        if position == len(self.index) - 1 and self.index.ordinals[position] != self._day:
+            self._relayout(backup.date())
+        else:
+            self._reselect(backup.date())
+
+    def remove(self, backup: Backup) -> None:
+        self._chosen = None
+        position = self.index.position(backup)
+        self.index.remove(position)
+        if len(self.index) == 0:
+            self.partitions = []
+            self._groups = []
+            self._day = None
+        elif position == len(self.index) and self.index.ordinals[position - 1] != self._day:
+            self._relayout(backup.date())
+        else:
+            self._reselect(backup.date())
+
+    def next(self, scheme: Optional[GenerationalScheme] = None) -> Tuple[Any, Optional[Backup]]:
+        if len(self.index) == 0:
+            return None, None
+        scheme = scheme or self.scheme
+        if self._chosen is None or self._chosen[0] is not scheme:
+            self._chosen = (scheme, *scheme._choose(self.index.backups, self.partitions))
+        _, reason, oldest = self._chosen
+        # The same partition may explain several purges, but each should get its own reason like getOldest() gives
+        return copy(reason) if isinstance(reason, Partition) else reason, oldest
+
+    def _relayout(self, changed: Optional[datetime]) -> None:
+        """Lays out partitions for the newest backup's day, after a backup at 'changed' came or went"""
+        self._day = self.index.ordinals[len(self.index) - 1]
+        groups = self.scheme._layoutGroups(self.index.dates[len(self.index) - 1])
+
+        # Weeks, months and years are the same layout as before until they change, so their partitions carry over as is
+        kept: Dict[int, List[Partition]] = {}
+        previous: Dict[Tuple[datetime, datetime, datetime], List[Partition]] = {}
+        for x, (group, parts) in enumerate(self._groups):
+            if x < len(groups) and groups[x] is group:
+                kept[x] = parts
+            else:
+                for part in parts:
+                    previous.setdefault((part.start, part.end, part.prefer), []).append(part)
+
+        self._groups = []
+        for x, group in enumerate(groups):
+            parts = kept.get(x)
+            if parts is not None:
+                # Only a backup at 'changed' could make them select something different
+                if changed is not None:
+                    for part in parts:
+                        if part.covers(changed):
+                            part.select(self.index)
+            else:
+                parts = [self._partition(entry, previous, changed) for entry in group]
+            self._groups.append((group, parts))
+        self.partitions = [part for group, parts in self._groups for part in parts]
+
+    def _partition(self, entry: Tuple[datetime, datetime, datetime, str, bool], previous: Dict[Tuple[datetime, datetime, datetime], List[Partition]],
+                   changed: Optional[datetime]) -> Partition:
+        """A partition for a layout entry, reusing one from 'previous' that covers the same dates if there is one"""
+        start, end, prefer, details, delete_only = entry
+        reuse = previous.get((start, end, prefer))
+        if reuse:
+            part = reuse.pop()
+            part.details = details
+            part._delete_only_partitions = delete_only
+            if changed is not None and part.covers(changed):
+                part.select(self.index)
+        else:
+            part = Partition(start, end, prefer, self.scheme.time, details, delete_only=delete_only)
+            part.select(self.index)
+        return part
+
+    def _reselect(self, date: datetime) -> None:
+        # Only the partitions a date falls in could select something different when a backup at that date comes or goes
+        for part in self.partitions:
+            if part.covers(date):
+                part.select(self.index)
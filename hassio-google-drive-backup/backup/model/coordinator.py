@@ -1,7 +1,7 @@
 from asyncio import CancelledError, Task, create_task, wait, Event
-from datetime import timedelta
+from datetime import datetime, timedelta
 from threading import Lock
-from typing import Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
 from injector import inject, singleton
 
@@ -46,6 +46,13 @@ class Coordinator(Trigger):
         self._random = Random()
         self._random.seed()
         self._next_sync_offset = self._random.random()
+
+        # Incremented whenever the backups in the model (or anything about them) might have changed, so the backup list
+        # and metrics only get rebuilt when they could be different.
+        self._version = 0
+        self._backups_cache: Optional[Tuple[Any, List[Backup]]] = None
+        self._metrics_cache: Optional[Tuple[Any, Dict[str, Any]]] = None
+        self._next_check_cache: Optional[Tuple[Any, datetime]] = None
         self._global_info.triggerBackupCooldown(timedelta(minutes=self._config.get(Setting.BACKUP_STARTUP_DELAY_MINUTES)))
         self.trigger()
 
@@ -57,6 +64,7 @@ class Coordinator(Trigger):
 
         self._model.dest.saveCreds(creds)
         self._global_info.credsSaved()
+        self._version += 1
 
     def setPrecache(self, precache: Precache):
         self._precache = precache
@@ -72,6 +80,11 @@ class Coordinator(Trigger):
 
     def ignoreStartupDelay(self):
         self._model.ignore_startup_delay = True
+        self._next_check_cache = None
+
+    def trigger(self):
+        self._next_check_cache = None
+        super().trigger()
 
     async def check(self) -> bool:
         if self._time.now() >= self.nextSyncAttempt():
@@ -80,6 +93,14 @@ class Coordinator(Trigger):
         else:
             return await super().check()
 
+    def nextCheck(self):
+        # Working out the next backup means building the model, so only do it again once a sync, a trigger or a change
+        # to the backups or settings could have moved it rather than every time the sync worker wakes up.
+        version = self.version()
+        if self._next_check_cache is None or self._next_check_cache[0] != version:
+            self._next_check_cache = (version, self.nextSyncAttempt())
+        return self._next_check_cache[1]
+
     async def sync(self):
         await self._withSoftLock(lambda: self._sync_wrapper())
 
@@ -119,7 +140,7 @@ class Coordinator(Trigger):
             if next_backup is None:
                 return scheduled
             else:
-                return min(self.nextBackupTime(), scheduled)
+                return min(next_backup, scheduled)
 
     def nextSyncCheckOffset(self):
         """Determines how long we shoudl wait from the last check the refresh the cache of backups from Google Drive and Home Assistant"""
@@ -136,7 +157,22 @@ class Coordinator(Trigger):
     def nextBackupTime(self, include_pending=True):
         return self._buildModel().nextBackup(self._time.now(), include_pending)
 
+    def version(self):
+        """
+        Identifies the current state of the backups and config.  If it hasn't changed then neither has backups() or
+        buildBackupMetrics(), except during a sync when backups get added, deleted and uploaded as it goes.
+        """
+        return (self._version, self._config.version())
+
     def buildBackupMetrics(self):
+        version = self.version()
+        if not self.isSyncing() and self._metrics_cache is not None and self._metrics_cache[0] == version:
+            return self._metrics_cache[1]
+        info = self._buildBackupMetrics()
+        self._metrics_cache = (version, info)
+        return info
+
+    def _buildBackupMetrics(self):
         info = {}
         for source in self._sources:
             source_class = self._sources[source]
@@ -203,11 +239,12 @@ class Coordinator(Trigger):
         except BaseException as e:
             self.handleError(e)
         finally:
-            if self._precache:
-                # Any sync should invalidate the precache regardless of the outcome
-                # so the next sync uses fresh data
-                self.clearCaches()
+            # Any sync should invalidate the precache regardless of the outcome
+            # so the next sync uses fresh data
+            self.clearCaches()
             self._updateFreshness()
+            # Finishing a sync (or failing one) moves when the next should happen.
+            self.reschedule()
 
     def handleError(self, e):
         if isinstance(e, CancelledError):
@@ -228,9 +265,12 @@ class Coordinator(Trigger):
         logger.info("I'll try again in {0}".format(text))
 
     def backups(self) -> List[Backup]:
-        ret = list(self._model.backups.values())
-        ret.sort(key=lambda s: s.date())
-        return ret
+        version = self.version()
+        if self.isSyncing() or self._backups_cache is None or self._backups_cache[0] != version:
+            ret = list(self._model.backups.values())
+            ret.sort(key=lambda s: s.date())
+            self._backups_cache = (version, ret)
+        return list(self._backups_cache[1])
 
     async def uploadBackups(self, slug):
         await self._withSoftLock(lambda: self._uploadBackup(slug))
@@ -290,6 +330,7 @@ class Coordinator(Trigger):
         backup = self._ensureBackup(None, slug)
         for source in backup.sources.keys():
             await self._ensureSource(source).note(backup, note)
+        self._version += 1
 
     async def delete(self, sources, slug):
         await self._withSoftLock(lambda: self._delete(sources, slug))
@@ -310,6 +351,7 @@ class Coordinator(Trigger):
         self.clearCaches()
         backup = self._ensureBackup(SOURCE_HA, slug)
         await self._ensureSource(SOURCE_HA).ignore(backup, ignore)
+        self._version += 1
 
     def _ensureBackup(self, source: str = None, slug=None) -> Backup:
         backup = self._buildModel().backups.get(slug)
@@ -330,7 +372,7 @@ class Coordinator(Trigger):
         raise LogicError()
 
     def _buildModel(self) -> Model:
-        self._model.reinitialize(self._precache)
+        self._model.reinitializeIfChanged(self._precache)
         return self._model
 
     def _updateFreshness(self):
@@ -339,8 +381,10 @@ class Coordinator(Trigger):
             for source in purges:
                 if backup.getSource(source):
                     backup.updatePurge(source, backup == purges[source])
+        self._version += 1
 
     def clearCaches(self):
+        self._version += 1
         if self._precache:
             self._precache.clear()
 
@@ -21,6 +21,7 @@ class DriveBackup(AbstractBackup):
     """
     Represents a Home Assistant backup stored on Google Drive
     """
+    __slots__ = ('_drive_data', '_id')
 
     def __init__(self, data: Dict[Any, Any]):
         props = ensureKey('appProperties', data, DRIVE_KEY_TEXT)
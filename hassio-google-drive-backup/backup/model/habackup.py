@@ -17,6 +17,7 @@ class HABackup(AbstractBackup):
     """
     Represents a Home Assistant backup stored locally in Home Assistant
     """
+    __slots__ = ('_data_cache', '_config', '_made_by_the_addon', '_stored_note', '_ignore_override')
 
     def __init__(self, data: Dict[str, Any], data_cache: DataCache, config: Config, retained=False):
         super().__init__(
@@ -34,22 +35,23 @@ class HABackup(AbstractBackup):
             pending=False)
         self._data_cache = data_cache
         self._config = config
+        self.refresh()
 
-    def madeByTheAddon(self):
-        return self._data_cache.backup(self.slug()).get(KEY_I_MADE_THIS, False)
+    def refresh(self):
+        """
+        Looks up what the data cache and config say about this backup.  HaSource does this once each time it lists
+        backups and again whenever it changes the data cache, so the lookups don't happen on every call.
+        """
+        # Don't use DataCache.backup(), it would make a record for a backup HaSource hasn't seen yet
+        stored = self._data_cache.backups.get(self.slug(), {})
+        self._made_by_the_addon = stored.get(KEY_I_MADE_THIS, False)
+        self._stored_note = stored.get(KEY_NOTE, None)
+        self._ignore_override = self._resolveIgnore(stored.get(KEY_IGNORE, None))
 
-    def note(self):
-        parent = super().note()
-        if parent is None:
-            return self._data_cache.backup(self.slug()).get(KEY_NOTE, None)
-        else:
-            return parent
-
-    def ignore(self):
-        override = self._data_cache.backup(self.slug()).get(KEY_IGNORE, None)
+    def _resolveIgnore(self, override):
         if override is not None:
             return override
-        if self.madeByTheAddon():
+        if self._made_by_the_addon:
             return False
         if self._config.get(Setting.IGNORE_OTHER_BACKUPS):
             return True
@@ -60,6 +62,21 @@ class HABackup(AbstractBackup):
             archive_count += 1
         if archive_count == 1 and self._config.get(Setting.IGNORE_UPGRADE_BACKUPS):
             return True
+        return None
+
+    def madeByTheAddon(self):
+        return self._made_by_the_addon
+
+    def note(self):
+        parent = super().note()
+        if parent is None:
+            return self._stored_note
+        else:
+            return parent
+
+    def ignore(self):
+        if self._ignore_override is not None:
+            return self._ignore_override
         return super().ignore()
 
     def __str__(self) -> str:
@@ -1,10 +1,11 @@
+import asyncio
 from datetime import datetime, timedelta, date
 from io import IOBase
 from typing import Dict, Generic, List, Optional, Tuple, TypeVar, Union
 
 from injector import inject, singleton
 
-from .backupscheme import GenerationalScheme, OldestScheme, DeleteAfterUploadScheme
+from .backupscheme import BackupScheme, GenerationalScheme, OldestScheme, DeleteAfterUploadScheme, LocalDays
 from backup.config import Config, Setting, CreateOptions
 from backup.exceptions import DeleteMutlipleBackupsError, SimulatedError
 from backup.util import GlobalInfo, Estimator, DataCache
@@ -59,6 +60,11 @@ class BackupSource(Trigger, Generic[T]):
     async def delete(self, backup: T):
         pass
 
+    async def deleteMany(self, backups: List[T]):
+        """Deletes several backups, which sources that can do so in fewer requests than one per backup should override"""
+        for backup in backups:
+            await self.delete(backup)
+
     async def ignore(self, backup: T, ignore: bool):
         pass
 
@@ -113,6 +119,7 @@ class Model():
         self.precache: Precache | None = None
         self.source: BackupSource = source
         self.dest: BackupDestination = dest
+        self._config_version = None
         self.reinitialize()
         self.backups: Dict[str, Backup] = {}
         self.firstSync = True
@@ -122,6 +129,7 @@ class Model():
         self.waiting_for_startup = False
         self.ignore_startup_delay = False
         self._data_cache = data_cache
+        self._local_days = LocalDays(time)
 
     def enabled(self):
         if self.source.needsConfiguration():
@@ -135,11 +143,17 @@ class Model():
 
     def reinitialize(self, precache: Precache | None = None):
         self.precache = precache
+        self._config_version = self.config.version()
         self._time_of_day: Optional[Tuple[int, int]] = self._parseTimeOfDay(self.config.get(Setting.BACKUP_TIME_OF_DAY))
-
-        # SOMEDAY: this should be cached in config and regenerated on config updates, not here
         self.generational_config = self.config.getGenerationalConfig()
 
+    def reinitializeIfChanged(self, precache: Precache | None = None):
+        """Same as reinitialize(), but doesn't parse the config again if no setting has changed since the last time"""
+        if self._config_version == self.config.version():
+            self.precache = precache
+        else:
+            self.reinitialize(precache)
+
     def getTimeOfDay(self):
         return self._time_of_day
 
@@ -218,8 +232,7 @@ class Model():
             for backup in self.backups.values():
                 if backup.ignore() and backup.date() < cutoff:
                     delete.append(backup)
-            for backup in delete:
-                await self.deleteBackup(backup, self.source)
+            await self.deleteBackups(delete, self.source)
 
         self._handleBackupDetails()
         next_backup = self.nextBackup(now)
@@ -274,13 +287,25 @@ class Model():
         self.backups[backup.slug()] = backup
 
     async def deleteBackup(self, backup, source):
-        if not backup.getSource(source.name()):
+        await self.deleteBackups([backup], source)
+
+    async def deleteBackups(self, backups: List[Backup], source: BackupSource):
+        backups = [backup for backup in backups if backup.getSource(source.name())]
+        if len(backups) == 0:
             return
-        slug = backup.slug()
-        await source.delete(backup)
-        backup.removeSource(source.name())
-        if backup.isDeleted():
-            del self.backups[slug]
+        slugs = [backup.slug() for backup in backups]
+        try:
+            if len(backups) == 1:
+                await source.delete(backups[0])
+            else:
+                await source.deleteMany(backups)
+            for backup in backups:
+                backup.removeSource(source.name())
+        finally:
+            # Some backups may have been deleted even if others failed
+            for slug, backup in zip(slugs, backups):
+                if backup.isDeleted() and self.backups.get(slug) is backup:
+                    del self.backups[slug]
 
     def getNextPurges(self):
         purges = {}
@@ -306,29 +331,63 @@ class Model():
             return None
 
     async def _syncBackups(self, sources: List[BackupSource], now: datetime):
-        for source in sources:
-            if source.enabled():
-                # check if we have the results from this source precached
-                from_source: Dict[str, AbstractBackup] = None
-                if self.precache is not None:
-                    from_source = self.precache.cached(source.name(), now)
-                if not from_source:
-                    from_source = await source.get()
-            else:
-                from_source: Dict[str, AbstractBackup] = {}
-            for backup in from_source.values():
-                if backup.slug() not in self.backups:
-                    self.backups[backup.slug()] = Backup(backup)
-                else:
-                    self.backups[backup.slug()].addSource(backup)
-            for backup in list(self.backups.values()):
-                if backup.slug() not in from_source:
-                    slug = backup.slug()
-                    backup.removeSource(source.name())
-                    if backup.isDeleted():
-                        del self.backups[slug]
+        # Sources don't depend on each other until they're merged, so list them all at once
+        tasks = [asyncio.create_task(self._listSource(source, now)) for source in sources]
+        try:
+            # The first failure cancels the rest rather than waiting for them to finish
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Wait for them to actually stop so nothing they do happens after the sync is over
+            await asyncio.wait(tasks)
+        for task in tasks:
+            # Report the failure of the first source listed, not whichever happened to fail first
+            if not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+        listings = [task.result() for task in tasks]
+
+        timings = {}
+        for source, (from_source, seconds) in zip(sources, listings):
+            if seconds is not None:
+                timings[source.name()] = round(seconds, 3)
+            self._mergeSource(source, from_source)
+        if len(timings) > 0:
+            logger.debug("Listed backups from " + ", ".join("{0} in {1:.2f}s".format(name, seconds) for name, seconds in timings.items()))
+        self.info.addDebugInfo("source_list_seconds", timings)
+
+        # Only remember local days for backups that still exist
+        self._local_days.retain(backup.date() for backup in self.backups.values())
         self.firstSync = False
 
+    async def _listSource(self, source: BackupSource, now: datetime) -> Tuple[Dict[str, AbstractBackup], Optional[float]]:
+        """
+        Returns the source's backups and how many seconds it took to list them, or None if they didn't need listing.
+        """
+        if not source.enabled():
+            return {}, None
+        # check if we have the results from this source precached
+        if self.precache is not None:
+            from_source = self.precache.cached(source.name(), now)
+            if from_source:
+                return from_source, None
+        start = self.time.monotonic()
+        from_source = await source.get()
+        return from_source, self.time.monotonic() - start
+
+    def _mergeSource(self, source: BackupSource, from_source: Dict[str, AbstractBackup]):
+        for backup in from_source.values():
+            if backup.slug() not in self.backups:
+                self.backups[backup.slug()] = Backup(backup)
+            else:
+                self.backups[backup.slug()].addSource(backup)
+        for backup in list(self.backups.values()):
+            if backup.slug() not in from_source:
+                slug = backup.slug()
+                backup.removeSource(source.name())
+                if backup.isDeleted():
+                    del self.backups[slug]
+
     def _buildDeleteScheme(self, source, findNext=False):
         count = source.maxCount()
         if findNext:
@@ -337,7 +396,7 @@ class Model():
             return DeleteAfterUploadScheme(source.name(), [self.dest.name()])
         elif self.generational_config:
             return GenerationalScheme(
-                self.time, self.generational_config, count=count)
+                self.time, self.generational_config, count=count, days=self._local_days)
         else:
             return OldestScheme(count=count)
 
@@ -352,23 +411,38 @@ class Model():
         """
         Given a list of backups, decides if one should be purged.
         """
-        if not source.enabled() or len(backups) == 0:
+        scheme, consider_purging = self._purgeCandidates(source, backups, findNext=findNext)
+        if len(consider_purging) == 0:
             return None, None
+        return scheme.getOldest(consider_purging)
+
+    def _purgeCandidates(self, source: BackupSource, backups, findNext=False) -> Tuple[Optional[BackupScheme], List[Backup]]:
+        """
+        Returns the scheme that decides what gets purged from the source and the backups it should consider.
+        """
+        if len(backups) == 0:
+            return None, []
+        scheme = self._purgeScheme(source, findNext=findNext)
+        if scheme is None:
+            return None, []
+        return scheme, [backup for backup in backups if self._considerForPurge(source, backup)]
+
+    def _purgeScheme(self, source: BackupSource, findNext=False) -> Optional[BackupScheme]:
+        """
+        Returns the scheme that decides what gets purged from the source, or None if nothing should be.
+        """
+        if not source.enabled():
+            return None
         if source.maxCount() == 0 and source.isDestination():
             # When maxCount is zero for a destination, we should never delete from it.
-            return None, None
+            return None
         if source.maxCount() == 0 and not self.config.get(Setting.DELETE_AFTER_UPLOAD):
-            return None, None
+            return None
+        return self._buildDeleteScheme(source, findNext=findNext)
 
-        scheme = self._buildDeleteScheme(source, findNext=findNext)
-        consider_purging = []
-        for backup in backups:
-            source_backup = backup.getSource(source.name())
-            if source_backup is not None and source_backup.considerForPurge() and not backup.ignore():
-                consider_purging.append(backup)
-        if len(consider_purging) == 0:
-            return None, None
-        return scheme.getOldest(consider_purging)
+    def _considerForPurge(self, source: BackupSource, backup: Backup) -> bool:
+        source_backup = backup.getSource(source.name())
+        return source_backup is not None and source_backup.considerForPurge() and not backup.ignore()
 
     async def _purge(self, source: BackupSource, pre_purge=False):
         while True:
@@ -379,7 +453,7 @@ class Model():
                 return
             if len(purge) != len(reasons) and (self.config.get(Setting.CONFIRM_MULTIPLE_DELETES) and not self.info.isPermitMultipleDeletes()):
                 raise DeleteMutlipleBackupsError(self._getPurgeStats())
-            await self.deleteBackup(purge[0][0], source)
+            await self.deleteBackups([p[0] for p in purge], source)
 
     def _getPurgeStats(self):
         ret = {}
@@ -390,14 +464,7 @@ class Model():
         return ret
 
     def _getPurgeList(self, source: BackupSource, pre_purge=False) -> List[Tuple[Backup, Union[str, None]]]:
-        if not source.enabled():
+        scheme, consider_purging = self._purgeCandidates(source, list(self.backups.values()), findNext=pre_purge)
+        if len(consider_purging) == 0:
             return []
-        candidates = list(self.backups.values())
-        purges = []
-        while True:
-            reason, next_purge = self._nextPurge(source, candidates, findNext=pre_purge)
-            if next_purge is None:
-                return purges
-            else:
-                purges.append((next_purge, reason))
-                candidates.remove(next_purge)
+        return [(backup, reason) for reason, backup in scheme.getPurgeOrder(consider_purging)]
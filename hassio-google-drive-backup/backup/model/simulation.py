@@ -0,0 +1,326 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from dateutil.relativedelta import relativedelta
+from injector import inject, singleton
+
+from backup.config import Config, Setting
+from backup.ha import BackupName
+from backup.time import Time
+from backup.util import GlobalInfo, Estimator, DataCache
+from .backups import Backup
+from .backupscheme import BackupScheme, Partition, PurgePlanner
+from .dummybackupsource import DummyBackupSource
+from .model import BackupSource, Model
+from .simulatedsource import SimulatedSource
+
+DEFAULT_SIMULATION_MONTHS = 6
+MAX_SIMULATION_MONTHS = 120
+
+# A simulation stops after creating this many backups, which keeps even a generational preview under a second or so on
+# a slow machine (see RetentionSimulator)
+MAX_STEPS = 2000
+
+REASON_IGNORED = "Ignored backup expired"
+
+
+@singleton
+class RetentionSimulator():
+    """
+    Previews what the backup schedule and retention settings in a config would do over the coming months, starting from
+    the backups that exist now, without touching any of them.  This gets through about 3-5 thousand simulated backups
+    a second with generational backups on and about 10 thousand with them off (see dev/benchmark/retention.py), so a
+    preview stops at MAX_STEPS backups, about 5 years of daily backups, and says it was truncated.
+    """
+
+    @inject
+    def __init__(self, model: Model, time: Time, info: GlobalInfo, estimator: Estimator, data_cache: DataCache):
+        self._model = model
+        self._time = time
+        self._info = info
+        self._estimator = estimator
+        self._data_cache = data_cache
+
+    async def simulate(self, config: Config, months: int = DEFAULT_SIMULATION_MONTHS) -> Dict[str, Any]:
+        months = max(0, min(months, MAX_SIMULATION_MONTHS))
+        source = self._standIn(self._model.source, config.get(Setting.MAX_BACKUPS_IN_HA))
+        dest = self._standIn(self._model.dest, config.get(Setting.MAX_BACKUPS_IN_FILENIO))
+
+        # A model of its own makes the same scheduling and purge decisions the real one would with this config
+        model = Model(config, self._time, source, dest, self._info, self._estimator, self._data_cache)
+        model.ignore_startup_delay = True
+
+        # Backups get copied into plain tuples here on the event loop, so a sync can't change them partway through.
+        # Running the simulation itself on another thread keeps the UI responsive while it works.
+        start = self._time.now()
+        backups = [snapshot(backup) for backup in self._model.backups.values()]
+        run = await asyncio.get_running_loop().run_in_executor(None, self._run, model, backups, start, start + relativedelta(months=months))
+        return run.results(months)
+
+    def _run(self, model: Model, backups: List['BackupSnapshot'], start: datetime, end: datetime) -> 'RetentionRun':
+        run = RetentionRun(model, backups, start)
+        run.run(end)
+        return run
+
+    def _standIn(self, real: BackupSource, max_count: int) -> SimulatedSource:
+        source = SimulatedSource(real.name(), is_destination=real.isDestination())
+        source.setMax(max_count)
+        source.setEnabled(real.enabled())
+        source.setUpload(real.upload())
+        source.setNeedsConfiguration(real.needsConfiguration())
+        return source
+
+
+# The name, slug, date, retained, uploadable and ignored flags of a backup in each source it's in, keyed by source name
+BackupSnapshot = Dict[str, Tuple[str, str, datetime, bool, bool, bool]]
+
+
+def snapshot(backup: Backup) -> BackupSnapshot:
+    return {name: (source.name(), source.slug(), source.date(), source.retained(), source.uploadable(), source.ignore())
+            for name, source in backup.sources.items()}
+
+
+class SourcePlan():
+    """What gets purged from one source, kept up to date as backups come and go"""
+
+    def __init__(self, scheme: BackupScheme, pre_purge: BackupScheme, backups: List[Backup]):
+        self.planner: PurgePlanner = scheme.planner(backups)
+        self.pre_purge = pre_purge
+
+
+class RetentionRun():
+    """
+    One pass of the simulation.  It follows the same steps Model.sync() does, on copies of the backups and with the
+    clock moved forward to each scheduled backup, but keeps a PurgePlanner for each source rather than working out
+    purges from scratch every time.
+    """
+
+    def __init__(self, model: Model, backups: Iterable[BackupSnapshot], start: datetime):
+        self.model = model
+        self.config = model.config
+        self.delete_before_new = self.config.get(Setting.DELETE_BEFORE_NEW_BACKUP)
+        self.delete_after_upload = self.config.get(Setting.DELETE_AFTER_UPLOAD)
+        self.ignored_days: Optional[timedelta] = None
+        if self.config.get(Setting.IGNORE_OTHER_BACKUPS) or self.config.get(Setting.IGNORE_UPGRADE_BACKUPS):
+            if self.config.get(Setting.DELETE_IGNORED_AFTER_DAYS) > 0:
+                self.ignored_days = timedelta(days=self.config.get(Setting.DELETE_IGNORED_AFTER_DAYS))
+        self.time = model.time
+        self.source = model.source
+        self.dest = model.dest
+        self.start = start
+        self.now = start
+        self.end = start
+        self.created = 0
+        self.stalled = False
+        self.truncated = False
+        self._latest: Optional[Backup] = None
+        # A backup _wouldPurgeUpload() left in the destination's planner, ready for _upload()
+        self._planned: Optional[Backup] = None
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._deleted = {self.source.name(): 0, self.dest.name(): 0}
+
+        # Copies, so backups can be added to and removed from sources without changing the real ones
+        self.backups: List[Backup] = []
+        for sources in backups:
+            copy = Backup()
+            for source, (name, slug, date, retained, uploadable, ignore) in sources.items():
+                source_backup = DummyBackupSource(name, date, source, slug, retain=retained)
+                source_backup.setUploadable(uploadable)
+                source_backup.setIgnore(ignore)
+                copy.addSource(source_backup)
+            self.backups.append(copy)
+            self._record(copy, simulated=False)
+        self._waiting = [backup for backup in self.backups if self._uploadable(backup)]
+        self._ignored = sorted((backup for backup in self.backups if backup.ignore() and backup.getSource(self.source.name())), key=Backup.date)
+        self._plans = {source.name(): self._plan(source) for source in [self.source, self.dest]}
+
+    def run(self, end: datetime) -> None:
+        self.end = end
+        self._sync()
+        while True:
+            next = self._nextBackup()
+            if next is None or next > end:
+                return
+            if next <= self.now:
+                # The last sync didn't leave a backup that pushes the schedule forward
+                self.stalled = True
+                return
+            if self.created >= MAX_STEPS:
+                self.truncated = True
+                return
+            self.now = next
+            self._sync()
+
+    def results(self, months: int) -> Dict[str, Any]:
+        sources = {}
+        for source in [self.source, self.dest]:
+            sources[source.name()] = {
+                'max': source.maxCount(),
+                # Ignored backups don't count against the max, so they aren't counted here either
+                'kept': len([backup for backup in self.backups if backup.getSource(source.name()) and not backup.ignore()]),
+                'deleted': self._deleted[source.name()],
+            }
+
+        # Simulated backups that came and went would swamp the ones that matter, so they're only counted
+        backups = []
+        for record in sorted(self._records.values(), key=lambda record: (record['date'], record['slug'])):
+            if record['simulated'] and all(fate['deleted'] is not None for fate in record['sources'].values()):
+                continue
+            backups.append(self._describe(record))
+        return {
+            'start': self.start.isoformat(),
+            'end': self.end.isoformat(),
+            'months': months,
+            'created': self.created,
+            'stalled': self.stalled,
+            'truncated': self.truncated,
+            'sources': sources,
+            'backups': backups,
+        }
+
+    def _sync(self):
+        if not self.dest.needsConfiguration():
+            self._purge(self.source)
+            self._purge(self.dest)
+        self._expireIgnored()
+
+        next = self._nextBackup()
+        if next is not None and self.now >= next and self.source.enabled() and not self.dest.needsConfiguration():
+            if self.delete_before_new:
+                self._purge(self.source, pre_purge=True)
+            self._create()
+            self._purge(self.source)
+
+        if self.dest.enabled() and self.dest.upload():
+            uploads = sorted(self._waiting, key=Backup.date)
+            uploads.reverse()
+            for upload in uploads:
+                # only upload if doing so won't result in it being deleted next
+                if self._wouldPurgeUpload(upload):
+                    break
+                if self.delete_before_new:
+                    self._purge(self.dest, pre_purge=True)
+                self._upload(upload)
+                self._purge(self.dest)
+            if self.delete_after_upload:
+                self._purge(self.source)
+
+    def _plan(self, source: BackupSource) -> Optional[SourcePlan]:
+        scheme = self.model._purgeScheme(source)
+        if scheme is None:
+            return None
+        candidates = [backup for backup in self.backups if self.model._considerForPurge(source, backup)]
+        return SourcePlan(scheme, self.model._purgeScheme(source, findNext=True), candidates)
+
+    def _nextBackup(self) -> Optional[datetime]:
+        if self._latest is None or self._latest.isDeleted():
+            self._latest = max(filter(lambda s: not s.ignore() and not s.isDeleted(), self.backups), default=None, key=Backup.date)
+        return self.model._nextBackup(self.now, self._latest.date() if self._latest else None)
+
+    def _create(self):
+        self.created += 1
+        # Names are only worked out for the backups that end up in the results
+        backup = Backup(DummyBackupSource(None, self.now, self.source.name(), "simulated{0}".format(self.created)))
+        self.backups.append(backup)
+        self._record(backup, simulated=True)
+        self._added(backup, self.source)
+        self._latest = backup
+        if self._uploadable(backup):
+            self._waiting.append(backup)
+
+    def _upload(self, backup: Backup):
+        backup.addSource(DummyBackupSource(backup.name(), backup.date(), self.dest.name(), backup.slug()))
+        self._waiting.remove(backup)
+        self._added(backup, self.dest, planned=self._planned is backup)
+        self._planned = None
+
+    def _wouldPurgeUpload(self, backup: Backup) -> bool:
+        """
+        Asks the destination's planner about the backup itself instead of a stand-in like Model.sync() does, since
+        they'd be in the same place.  If it wouldn't get purged it's left in the planner for _upload(), which saves
+        laying out the partitions twice more for each upload, unless something gets purged before the upload.
+        """
+        plan = self._plans[self.dest.name()]
+        if plan is None:
+            return False
+        plan.planner.add(backup)
+        purged = plan.planner.next()[1] is backup
+        if purged or self.delete_before_new:
+            # A pre-purge has to see the destination without it
+            plan.planner.remove(backup)
+        else:
+            self._planned = backup
+        return purged
+
+    def _purge(self, source: BackupSource, pre_purge=False):
+        plan = self._plans[source.name()]
+        if plan is None:
+            return
+        scheme = plan.pre_purge if pre_purge else None
+        while True:
+            reason, backup = plan.planner.next(scheme)
+            if backup is None:
+                return
+            plan.planner.remove(backup)
+            self._delete(backup, source, reason.details if isinstance(reason, Partition) else None)
+
+    def _expireIgnored(self):
+        if self.ignored_days is None:
+            return
+        cutoff = self.now - self.ignored_days
+        while len(self._ignored) > 0 and self._ignored[0].date() < cutoff:
+            backup = self._ignored.pop(0)
+            if backup.getSource(self.source.name()):
+                self._delete(backup, self.source, REASON_IGNORED)
+
+    def _added(self, backup: Backup, source: BackupSource, planned=False):
+        self._records[backup.slug()]['sources'][source.name()] = {'added': self.now, 'deleted': None, 'reason': None}
+        plan = self._plans[source.name()]
+        if plan is None:
+            return
+        if not self.model._considerForPurge(source, backup):
+            if planned:
+                plan.planner.remove(backup)
+        elif not planned:
+            plan.planner.add(backup)
+
+    def _delete(self, backup: Backup, source: BackupSource, reason: Optional[str]):
+        record = self._records[backup.slug()]['sources'][source.name()]
+        backup.removeSource(source.name())
+        if source is self.source and backup in self._waiting:
+            self._waiting.remove(backup)
+        record['deleted'] = self.now
+        record['reason'] = reason
+        self._deleted[source.name()] += 1
+
+    def _uploadable(self, backup: Backup) -> bool:
+        source_backup = backup.getSource(self.source.name())
+        return source_backup is not None and source_backup.uploadable() and backup.getSource(self.dest.name()) is None and not backup.ignore()
+
+    def _record(self, backup: Backup, simulated: bool):
+        self._records[backup.slug()] = {
+            'slug': backup.slug(),
+            'name': backup.name(),
+            'date': backup.date(),
+            'simulated': simulated,
+            'sources': {name: {'added': None, 'deleted': None, 'reason': None} for name in backup.sources.keys()},
+        }
+
+    def _describe(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        name = record['name']
+        if record['simulated']:
+            name = BackupName().resolve("Full", self.config.get(Setting.BACKUP_NAME), self.time.toLocal(record['date']), {})
+        return {
+            'slug': record['slug'],
+            'name': name,
+            'date': record['date'].isoformat(),
+            'simulated': record['simulated'],
+            'sources': {
+                source: {
+                    'added': fate['added'].isoformat() if fate['added'] else None,
+                    'deleted': fate['deleted'].isoformat() if fate['deleted'] else None,
+                    'reason': fate['reason'],
+                } for source, fate in record['sources'].items()
+            },
+        }
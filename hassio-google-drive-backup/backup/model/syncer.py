@@ -10,18 +10,44 @@ from backup.exceptions import PleaseWait
 
 logger = getLogger(__name__)
 
+# Bounds on how long the sync worker sleeps between checking triggers.  The lower bound keeps a deadline that passed
+# while the triggers were being checked from turning into a busy loop, and the upper bound makes sure deadlines still
+# get noticed if the system clock jumps (eg when a Raspberry Pi without a real-time clock syncs with NTP).
+MIN_WAIT_SECONDS = 0.5
+MAX_WAIT_SECONDS = 60
+
 
 @singleton
 class Scyncer(Worker):
+    """
+    Syncs whenever a trigger asks for it.  Rather than polling, this sleeps until the earliest deadline any trigger
+    reports from nextCheck(), and triggers wake it up immediately when trigger() gets called.  A deadline that had
+    already passed the last time the triggers were checked got its chance then, so it doesn't keep the worker awake.
+    """
     @inject
     def __init__(self, time: Time, coord: Coordinator, triggers: List[Trigger]):
-        super().__init__("Sync Worker", self.checkforSync, time, 0.5)
+        super().__init__("Sync Worker", self.checkforSync, time, self.secondsUntilNextCheck)
         self.coord = coord
         self.triggers: List[Trigger] = triggers
         self._time = time
+        self._checked_at = None
+        for trigger in self.triggers:
+            trigger.addListener(self._wait_event)
+
+    def secondsUntilNextCheck(self) -> float:
+        checked_at = self._checked_at
+        deadlines = [deadline for deadline in (trigger.nextCheck() for trigger in self.triggers)
+                     if deadline is not None and (checked_at is None or deadline > checked_at)]
+        if len(deadlines) == 0:
+            # Nothing is due that hasn't been checked already (eg the addon isn't configured, so syncing doesn't move
+            # the next sync attempt out of the past), so wait for a trigger.
+            return MAX_WAIT_SECONDS
+        seconds = (min(deadlines) - self._time.now()).total_seconds()
+        return max(MIN_WAIT_SECONDS, min(MAX_WAIT_SECONDS, seconds))
 
     async def checkforSync(self):
         try:
+            self._checked_at = self._time.now()
             doSync = False
             for trigger in self.triggers:
                 if await trigger.check():
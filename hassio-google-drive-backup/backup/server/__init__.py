@@ -1,4 +1,6 @@
 # flake8: noqa
 from .server import Server
 from .errorstore import ErrorStore
-from .cloudlogger import CloudLogger
\ No newline at end of file
+from .cloudlogger import CloudLogger
+from .refreshcache import RefreshCache
+from .workerpool import WorkerPool
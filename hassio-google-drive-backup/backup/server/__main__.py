@@ -1,6 +1,8 @@
+import asyncio
 import aiorun
 from .server import Server
-from backup.config import Config
+from .workerpool import WorkerPool
+from backup.config import Config, Setting
 from backup.module import BaseModule
 from injector import Injector
 from injector import provider, singleton
@@ -16,12 +18,26 @@ class ServerModule(BaseModule):
         return Config.fromEnvironment()
 
 
-async def main():
+async def main(worker: int = None):
     module = ServerModule()
     injector = Injector(module)
-    await injector.get(Server).start()
+    server = injector.get(Server)
+    await server.start(worker)
+    try:
+        # Serve until aiorun cancels this on SIGTERM/SIGINT, then let in-progress requests finish
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def runWorker(index: int):
+    aiorun.run(main(index))
 
 
 if __name__ == '__main__':
     print("Starting")
-    aiorun.run(main())
+    workers = Config.fromEnvironment().get(Setting.SERVER_WORKERS)
+    if workers > 1:
+        WorkerPool(workers, runWorker).run()
+    else:
+        aiorun.run(main())
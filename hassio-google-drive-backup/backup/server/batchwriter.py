@@ -0,0 +1,119 @@
+import asyncio
+from typing import Any, Callable, Dict, List
+
+from backup.logger import getLogger
+
+logger = getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 1000
+DEFAULT_BATCH_SIZE = 100
+
+# Once the queue is this full, only one of every SAMPLE_RATE items is kept
+HIGH_WATER_FRACTION = 0.75
+SAMPLE_RATE = 10
+
+# How long stop() waits for what's queued to be written
+STOP_TIMEOUT_SECONDS = 10
+
+
+class BatchWriter():
+    """
+    Queues items for a blocking 'write' function and calls it from a background task, in a thread so a slow backend
+    never holds up the event loop.  Each call gets everything that queued up while the last one was running, up to
+    'batch_size' items, so the slower the backend gets the bigger its batches get.  The queue holds at most
+    'queue_size' items.  Once it passes its high water mark new items get sampled, and once it's full they're dropped,
+    so callers never wait on the backend no matter how far behind it falls.
+    """
+
+    def __init__(self, name: str, write: Callable[[List[Any]], None], queue_size: int = DEFAULT_QUEUE_SIZE,
+                 batch_size: int = DEFAULT_BATCH_SIZE):
+        self._name = name
+        self._write = write
+        self._queue_size = max(1, queue_size)
+        self._batch_size = max(1, batch_size)
+        self._queue: asyncio.Queue = None
+        self._task: asyncio.Task = None
+        self._sample_counter = 0
+        self.max_depth = 0
+        self.written = 0
+        self.batches = 0
+        self.sampled_out = 0
+        self.dropped = 0
+        self.failures = 0
+
+    def put(self, item) -> bool:
+        """Queues 'item' to be written, returning False if it was dropped because the queue is backed up"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Nothing to flush the queue without an event loop, so just write it now
+            self._writeBatch([item])
+            return True
+        self._ensureStarted()
+        depth = self._queue.qsize()
+        if depth >= self._queue_size:
+            self.dropped += 1
+            return False
+        if depth >= self._queue_size * HIGH_WATER_FRACTION:
+            self._sample_counter += 1
+            if self._sample_counter % SAMPLE_RATE != 0:
+                self.sampled_out += 1
+                return False
+        self._queue.put_nowait(item)
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+        return True
+
+    def depth(self) -> int:
+        return 0 if self._queue is None else self._queue.qsize()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'depth': self.depth(),
+            'max_depth': self.max_depth,
+            'written': self.written,
+            'batches': self.batches,
+            'sampled_out': self.sampled_out,
+            'dropped': self.dropped,
+            'failures': self.failures
+        }
+
+    async def stop(self):
+        """Writes whatever is still queued (waiting up to STOP_TIMEOUT_SECONDS) and stops the background task"""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), STOP_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            logger.error("Gave up writing {0} queued items for {1}".format(self._queue.qsize(), self._name))
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def _ensureStarted(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush(), name=self._name + " Writer")
+
+    async def _flush(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self._batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self._writeBatch, batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _writeBatch(self, batch: List[Any]):
+        try:
+            self._write(batch)
+            self.written += len(batch)
+            self.batches += 1
+        except Exception as e:
+            self.failures += 1
+            logger.error("Unable to write {0} items for {1}: {2}".format(len(batch), self._name, str(e)))
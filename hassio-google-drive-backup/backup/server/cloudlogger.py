@@ -1,9 +1,12 @@
 import os
 import json
+from typing import Any, Dict, List
+from backup.config import Config, Setting
 from backup.logger import getLogger, StandardLogger
 from injector import inject, singleton
 from google.cloud import logging
 from google.auth.exceptions import DefaultCredentialsError
+from .batchwriter import BatchWriter
 
 basic_logger = getLogger(__name__)
 
@@ -11,18 +14,31 @@ basic_logger = getLogger(__name__)
 @singleton
 class CloudLogger(StandardLogger):
     @inject
-    def __init__(self):
+    def __init__(self, config: Config):
         super().__init__(__name__)
         self.google_logger = None
         if os.environ.get('GOOGLE_APPLICATION_CREDENTIALS') is not None:
             try:
                 google_logger_client = logging.Client()
-                self.googler_logger = google_logger_client.logger("refresh_server")
+                self.google_logger = google_logger_client.logger("refresh_server")
             except DefaultCredentialsError:
                 basic_logger.error("Unable to start Google Logger, no default credentials")
+        self.writer = BatchWriter("Cloud Logger", self._commit,
+                                  queue_size=config.get(Setting.SERVER_WRITE_QUEUE_SIZE),
+                                  batch_size=config.get(Setting.SERVER_WRITE_BATCH_SIZE))
 
     def log_struct(self, data):
         if self.google_logger is not None:
-            self.google_logger.log_struct(data)
+            # Sent to Google in the background, so a slow logging API doesn't hold up the request
+            self.writer.put(data)
         else:
             basic_logger.info(json.dumps(data))
+
+    async def stop(self):
+        await self.writer.stop()
+
+    def _commit(self, entries: List[Dict[str, Any]]):
+        batch = self.google_logger.batch()
+        for data in entries:
+            batch.log_struct(data)
+        batch.commit()
@@ -2,7 +2,9 @@ import firebase_admin
 from firebase_admin import credentials
 from firebase_admin import firestore
 from datetime import datetime
+from typing import Any, Dict, List, Tuple
 from backup.config import Setting, Config
+from .batchwriter import BatchWriter
 from .cloudlogger import CloudLogger
 from injector import inject, singleton
 
@@ -24,9 +26,22 @@ class ErrorStore():
             })
             self.db = None
         self.last_error = None
+        self.writer = BatchWriter("Error Store", self._commit,
+                                  queue_size=config.get(Setting.SERVER_WRITE_QUEUE_SIZE),
+                                  batch_size=config.get(Setting.SERVER_WRITE_BATCH_SIZE))
 
     def store(self, error_data):
         if self.db is not None:
-            doc_ref = self.db.collection(u'error_reports').document(error_data.get('client', "unknown") + "-" + datetime.now().isoformat())
-            doc_ref.set(error_data)
+            # Written to firestore in the background, so a slow firestore doesn't hold up the request
+            self.writer.put((error_data.get('client', "unknown") + "-" + datetime.now().isoformat(), error_data))
         self.last_error = error_data
+
+    async def stop(self):
+        await self.writer.stop()
+
+    def _commit(self, reports: List[Tuple[str, Dict[str, Any]]]):
+        batch = self.db.batch()
+        collection = self.db.collection(u'error_reports')
+        for document, data in reports:
+            batch.set(collection.document(document), data)
+        batch.commit()
@@ -0,0 +1,93 @@
+import asyncio
+import hashlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from injector import inject, singleton
+
+from backup.config import Config, Setting
+from backup.creds import Creds
+from backup.time import Time
+
+
+@singleton
+class RefreshCache():
+    """
+    Remembers the credentials Google returned for recent refresh requests, so an add-on asking to refresh the same
+    token again within auth_refresh_cache_seconds gets the access token it was already given instead of the server
+    going back to Google.  Identical refreshes that arrive while one is already waiting on Google share its result.
+
+    Entries are keyed by a hash of the refresh token (so the tokens themselves aren't kept around as keys), held in
+    least-recently-used order and limited to auth_refresh_cache_max_entries.  Failed refreshes aren't cached, and a
+    cached access token is never handed back to an add-on that says it's the token it's trying to replace (eg because
+    Google rejected it), since the add-on would just keep asking for it again.
+    """
+    @inject
+    def __init__(self, config: Config, time: Time):
+        self._config = config
+        self._time = time
+        self._entries: OrderedDict[str, Tuple[datetime, Creds]] = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    async def refresh(self, refresh_token: str, refresher: Callable[[], Awaitable[Creds]], replacing: Optional[str] = None) -> Creds:
+        key = hashlib.sha256(refresh_token.encode()).hexdigest()
+        cached = self._get(key, replacing)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        task = self._in_flight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.create_task(self._refresh(key, refresher), name="Coalesced Refresh")
+            # Mark the error as retrieved even if every request waiting on it went away.
+            task.add_done_callback(lambda task: task.cancelled() or task.exception())
+            self._in_flight[key] = task
+        else:
+            self.coalesced += 1
+        # Shielded so one add-on disconnecting doesn't cancel the refresh for the others waiting on it.
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'entries': len(self._entries),
+            'in_flight': len(self._in_flight),
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'evictions': self.evictions
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _get(self, key: str, replacing: Optional[str]) -> Optional[Creds]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        cached_at, creds = entry
+        if self._time.now() >= cached_at + self._ttl() or creds.is_expired or creds.access_token == replacing:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return creds
+
+    async def _refresh(self, key: str, refresher: Callable[[], Awaitable[Creds]]) -> Creds:
+        try:
+            creds = await refresher()
+        finally:
+            del self._in_flight[key]
+        if self._ttl().total_seconds() > 0:
+            self._entries[key] = (self._time.now(), creds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > max(0, self._config.get(Setting.AUTH_REFRESH_CACHE_MAX_ENTRIES)):
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return creds
+
+    def _ttl(self) -> timedelta:
+        return timedelta(seconds=self._config.get(Setting.AUTH_REFRESH_CACHE_SECONDS))
@@ -1,4 +1,5 @@
 import json
+import os
 import aiohttp_jinja2
 import jinja2
 import base64
@@ -12,10 +13,12 @@ from backup.exceptions import GoogleCredentialsExpired, ensureKey, KnownError
 from injector import ClassAssistedBuilder, inject, singleton
 from .errorstore import ErrorStore
 from .cloudlogger import CloudLogger
+from .refreshcache import RefreshCache
 from yarl import URL
 from backup.config import Version
 from urllib.parse import unquote
 from backup.time import Time
+from .workerpool import SHUTDOWN_GRACE_SECONDS
 
 NEW_AUTH_MINIMUM = Version(0, 101, 3)
 
@@ -28,8 +31,10 @@ class Server():
                  exchanger_builder: ClassAssistedBuilder[Exchanger],
                  logger: CloudLogger,
                  error_store: ErrorStore,
+                 refresh_cache: RefreshCache,
                  time: Time):
         self._time = time
+        self.refresh_cache = refresh_cache
         self.exchanger = exchanger_builder.build(
             client_id=config.get(Setting.DEFAULT_DRIVE_CLIENT_ID),
             client_secret=config.get(Setting.DEFAULT_DRIVE_CLIENT_SECRET),
@@ -37,6 +42,9 @@ class Server():
         self.logger = logger
         self.config = config
         self.error_store = error_store
+        self._runner: AppRunner = None
+        self._worker = None
+        self._started = None
 
     def base_context(self, request: Request):
         return {
@@ -109,9 +117,10 @@ class Server():
 
     async def refresh(self, request: Request):
         try:
-            token = ensureKey('refresh_token', await request.json(), "the request payload")
-            creds = self.exchanger.refreshCredentials(token)
-            new_creds = await self.exchanger.refresh(creds)
+            payload = await request.json()
+            token = ensureKey('refresh_token', payload, "the request payload")
+            new_creds = await self.refresh_cache.refresh(token, lambda: self.exchanger.refresh(self.exchanger.refreshCredentials(token)),
+                                                         replacing=payload.get('access_token'))
             return json_response(new_creds.serialize(include_secret=False))
         except ClientResponseError as e:
             if e.status == 401:
@@ -167,7 +176,15 @@ class Server():
     async def health(self, request: Request):
         return json_response({
             'status': 'ok',
-            'messages': []
+            'messages': [],
+            'worker': {
+                'index': self._worker,
+                'pid': os.getpid(),
+                'uptime': (self._time.now() - self._started).total_seconds() if self._started else 0,
+                'refresh_cache': self.refresh_cache.stats(),
+                'error_writer': self.error_store.writer.stats(),
+                'log_writer': self.logger.writer.stats()
+            }
         })
 
     def buildApp(self, app):
@@ -185,12 +202,30 @@ class Server():
         aiohttp_jinja2.setup(app, loader=jinja2.FileSystemLoader(path))
         return app
 
-    async def start(self):
-        runner = AppRunner(self.buildApp(Application()))
-        await runner.setup()
-        site = TCPSite(runner, "0.0.0.0", int(self.config.get(Setting.PORT)))
+    async def start(self, worker: int = None):
+        """
+        Starts serving on the configured port.  When started as one of several worker processes (see WorkerPool), the
+        port is opened with SO_REUSEPORT so every worker can listen on it and 'worker' is reported by the health check.
+        """
+        self._worker = worker
+        self._started = self._time.now()
+        self._runner = AppRunner(self.buildApp(Application()), shutdown_timeout=SHUTDOWN_GRACE_SECONDS)
+        await self._runner.setup()
+        site = TCPSite(self._runner, "0.0.0.0", int(self.config.get(Setting.PORT)), reuse_port=worker is not None)
         await site.start()
-        self.logger.info("Backup Auth Server Started")
+        if worker is None:
+            self.logger.info("Backup Auth Server Started")
+        else:
+            self.logger.info("Backup Auth Server Worker {0} Started".format(worker))
+
+    async def stop(self):
+        # Stops accepting connections and waits for the requests in progress to finish
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        # Then write out whatever errors and logs are still queued
+        await self.error_store.stop()
+        await self.logger.stop()
 
     def logError(self, request: Request, exception: Exception):
         data = self.getRequestInfo(request)
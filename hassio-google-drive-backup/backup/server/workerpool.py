@@ -0,0 +1,127 @@
+import multiprocessing
+import os
+import signal
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from backup.util import Backoff
+from backup.logger import getLogger
+
+logger = getLogger(__name__)
+
+# How long workers get to finish the requests they're handling after being asked to stop, before they're killed.
+SHUTDOWN_GRACE_SECONDS = 10
+
+# How often the pool checks that its workers are still running
+CHECK_SECONDS = 1
+
+# How long to wait before restarting a worker that exited, doubling each time it exits again shortly after starting
+RESTART_BACKOFF_SECONDS = 1
+RESTART_BACKOFF_MAX_SECONDS = 60
+
+# A worker that stays up this long is considered healthy again, and its restart backoff starts over
+HEALTHY_SECONDS = 60
+
+
+def _runWorker(target: Callable[[int], Any], index: int):
+    # Forked workers inherit the pool's signal handlers, put the defaults back so the worker handles them itself.
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    target(index)
+
+
+class WorkerProcess():
+    def __init__(self, index: int):
+        self.index = index
+        self.process: Optional[multiprocessing.process.BaseProcess] = None
+        self.started: Optional[float] = None
+        self.restarts = 0
+        self.restart_at: Optional[float] = None
+        self.last_exit_code: Optional[int] = None
+        self.backoff = Backoff(base=RESTART_BACKOFF_SECONDS, max=RESTART_BACKOFF_MAX_SECONDS)
+
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            'index': self.index,
+            'pid': self.process.pid if self.process is not None else None,
+            'alive': self.alive(),
+            'restarts': self.restarts,
+            'last_exit_code': self.last_exit_code,
+        }
+
+
+class WorkerPool():
+    """
+    Runs 'target' in 'count' forked worker processes and keeps them running, restarting any that exit with a backoff.
+    Each worker is passed its index and is expected to serve on a socket opened with SO_REUSEPORT, so the kernel spreads
+    incoming connections across all of them.  On SIGTERM or SIGINT the workers are asked to stop with SIGTERM and
+    given 'grace' seconds to finish up before they're killed.
+    """
+
+    def __init__(self, count: int, target: Callable[[int], Any], grace: float = SHUTDOWN_GRACE_SECONDS):
+        self._target = target
+        self._grace = grace
+        self._workers = [WorkerProcess(index) for index in range(count)]
+        self._stopping = False
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._signal)
+        signal.signal(signal.SIGINT, self._signal)
+        self.start()
+        while not self._stopping:
+            self.check()
+            time.sleep(CHECK_SECONDS)
+        self.stop()
+
+    def start(self):
+        logger.info("Starting {0} server workers".format(len(self._workers)))
+        for worker in self._workers:
+            self._start(worker)
+
+    def check(self):
+        now = time.monotonic()
+        for worker in self._workers:
+            if worker.alive():
+                if worker.started is not None and now - worker.started >= HEALTHY_SECONDS:
+                    worker.backoff.reset()
+                continue
+            if worker.restart_at is None:
+                worker.last_exit_code = worker.process.exitcode
+                worker.restart_at = now + worker.backoff.backoff(None)
+                logger.error("Server worker {0} (pid {1}) exited with code {2}, restarting it in {3} seconds".format(
+                    worker.index, worker.process.pid, worker.last_exit_code, worker.restart_at - now))
+            elif now >= worker.restart_at:
+                worker.restarts += 1
+                self._start(worker)
+
+    def stop(self):
+        self._stopping = True
+        for worker in self._workers:
+            if worker.alive():
+                os.kill(worker.process.pid, signal.SIGTERM)
+        deadline = time.monotonic() + self._grace
+        for worker in self._workers:
+            if worker.process is None:
+                continue
+            worker.process.join(max(0, deadline - time.monotonic()))
+            if worker.process.is_alive():
+                logger.error("Server worker {0} (pid {1}) didn't stop in time, killing it".format(worker.index, worker.process.pid))
+                worker.process.kill()
+                worker.process.join()
+        logger.info("Server workers stopped")
+
+    def health(self) -> List[Dict[str, Any]]:
+        return [worker.health() for worker in self._workers]
+
+    def _start(self, worker: WorkerProcess):
+        worker.process = multiprocessing.get_context("fork").Process(target=_runWorker, args=(self._target, worker.index),
+                                                                     name="Server Worker {0}".format(worker.index))
+        worker.process.start()
+        worker.started = time.monotonic()
+        worker.restart_at = None
+
+    def _signal(self, signum, frame):
+        self._stopping = True
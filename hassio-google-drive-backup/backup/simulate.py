@@ -0,0 +1,89 @@
+"""
+Previews what the add-on's backup schedule and retention settings would keep and delete over the coming months, by
+asking a running add-on to simulate it from the backups it has now, eg:
+
+    python3 -m backup.simulate --months 12 --set max_backups_in_ha=2 --set generational_weeks=4
+
+Settings given with --set override the add-on's current ones for the preview only, nothing gets saved.  It talks to
+the add-on's ingress port, so run it from inside the add-on's container or point --url somewhere that reaches it.
+"""
+import argparse
+import asyncio
+import json
+import sys
+from typing import Any, Dict
+
+from aiohttp import ClientSession, ClientTimeout
+from yarl import URL
+
+from backup.config import Setting
+from backup.model import DEFAULT_SIMULATION_MONTHS
+
+DEFAULT_URL = "http://localhost:{0}".format(Setting.INGRESS_PORT.default())
+
+
+def parseSetting(value: str):
+    if "=" not in value:
+        raise argparse.ArgumentTypeError("'{0}' isn't a setting like max_backups_in_ha=4".format(value))
+    key, raw = value.split("=", 1)
+    try:
+        # Numbers and true/false come through as themselves, anything else is a string
+        return key.strip(), json.loads(raw)
+    except ValueError:
+        return key.strip(), raw
+
+
+async def simulate(url: URL, months: int, overrides: Dict[str, Any]) -> Dict[str, Any]:
+    async with ClientSession(timeout=ClientTimeout(total=300)) as session:
+        async with session.get(url.with_path("/getconfig")) as resp:
+            resp.raise_for_status()
+            config = (await resp.json())['config']
+        config.update(overrides)
+        async with session.post(url.with_path("/simulateretention"), json={'config': config, 'months': months}) as resp:
+            resp.raise_for_status()
+            return await resp.json()
+
+
+def printResults(results: Dict[str, Any]):
+    names = list(results['sources'].keys())
+    print("Simulated {0} months from {1}, creating {2} backups".format(results['months'], results['start'], results['created']))
+    for name, source in results['sources'].items():
+        print("  {0}: keeps {1} of at most {2}, deletes {3}".format(name, source['kept'], source['max'], source['deleted']))
+    if results['truncated']:
+        print("  Stopped early, the schedule creates too many backups to simulate")
+    if results['stalled']:
+        print("  The schedule stops creating new backups partway through")
+    print()
+    print("{0:<40} {1:<26} ".format("Backup", "Date") + " ".join("{0:<40}".format(name) for name in names))
+    for backup in results['backups']:
+        fates = []
+        for name in names:
+            fate = backup['sources'].get(name)
+            if fate is None:
+                fates.append("")
+            elif fate['deleted']:
+                fates.append("deleted {0}{1}".format(fate['deleted'][:10], " ({0})".format(fate['reason']) if fate['reason'] else ""))
+            else:
+                fates.append("kept")
+        name = backup['name'] if backup['simulated'] else backup['name'] + " (existing)"
+        print("{0:<40} {1:<26} ".format(name[:40], backup['date'][:19]) + " ".join("{0:<40}".format(fate) for fate in fates))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Previews what the add-on's retention settings would keep and delete")
+    parser.add_argument("--url", default=DEFAULT_URL, help="Where the add-on's ingress port can be reached")
+    parser.add_argument("--months", type=int, default=DEFAULT_SIMULATION_MONTHS, help="How many months to simulate")
+    parser.add_argument("--set", type=parseSetting, action="append", default=[], dest="overrides", metavar="SETTING=VALUE",
+                        help="A setting to change for the preview, eg max_backups_in_ha=2.  Can be given more than once.")
+    parser.add_argument("--json", action="store_true", help="Print the raw results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(simulate(URL(args.url), args.months, dict(args.overrides)))
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+    else:
+        printResults(results)
+
+
+if __name__ == '__main__':
+    main()
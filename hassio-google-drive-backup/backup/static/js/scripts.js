@@ -365,18 +365,40 @@ last_data = null;
 error_minimum = 0
 // Refreshes the display with stats from the server.
 function refreshstats() {
-  var jqxhr = $.get("getstatus", processStatusUpdate, "json").fail(
-    function (e) {
-      console.log("Status update failed: ");
-      console.log(e);
-      $("#backups_loading").show();
-      if (error_toast == null) {
-        M.Toast.dismissAll();
-        sync_toast = null;
-        error_toast = M.toast({ html: 'Lost connection to add-on, will keep trying to connect...', displayLength: 9999999 })
-      }
+  var jqxhr = $.get("getstatus", processStatusUpdate, "json").fail(statusConnectionLost)
+}
+
+function statusConnectionLost(e) {
+  console.log("Status update failed: ");
+  console.log(e);
+  $("#backups_loading").show();
+  if (error_toast == null) {
+    M.Toast.dismissAll();
+    sync_toast = null;
+    error_toast = M.toast({ html: 'Lost connection to add-on, will keep trying to connect...', displayLength: 9999999 })
+  }
+}
+
+// Listens for status updates pushed from the add-on, which only include the parts of the status that changed.
+// Returns false if the browser can't do that, in which case the status should be polled with refreshstats() instead.
+function listenForStatus() {
+  if (typeof (EventSource) === "undefined") {
+    return false;
+  }
+  let status = {};
+  let source = new EventSource("events");
+  source.addEventListener("status", function (e) {
+    status = Object.assign({}, status, JSON.parse(e.data));
+    processStatusUpdate(status);
+  });
+  source.onerror = function (e) {
+    statusConnectionLost(e);
+    if (source.readyState == EventSource.CLOSED) {
+      // The browser gave up reconnecting (eg a proxy doesn't allow streaming responses), so fall back to polling.
+      window.setInterval(refreshstats, 5000);
     }
-  )
+  };
+  return true;
 }
 
 function processSourcesUpdate(sources) {
@@ -282,6 +282,10 @@ function saveSettings() {
     return;
   }
   toast("Saving...")
+  postJson("saveconfig", {"config": gatherSettings(), "backup_folder": $("#settings_specify_folder_id").val()}, closeSettings, showSettingError); 
+}
+
+function gatherSettings() {
   var config = {}
   $("select", $("#settings_form")).each(function () {
     var target = $(this)
@@ -349,9 +353,57 @@ function saveSettings() {
   } else {
     config.accent_color = $("#accent_color").html();
   }
+  return config;
+}
+
+function previewRetention() {
+  if (!document.getElementById('settings_form').checkValidity()) {
+    showSettingError({message: "Some configuration is invalid, check for red errors up above."})
+    return;
+  }
+  var months = parseInt($("#retention_preview_months").val()) || 6;
+  postJson("simulateretention", {"config": gatherSettings(), "months": months}, showRetentionPreview, showSettingError, "Simulating...");
+}
+
+function showRetentionPreview(results) {
+  var summary = "Over " + results.months + " months, " + results.created + " new backups would be created.";
+  for (var name in results.sources) {
+    var source = results.sources[name];
+    summary += " " + name + " would keep " + source.kept + " and delete " + source.deleted + ".";
+  }
+  if (results.truncated) {
+    summary += " The simulation stopped early because the schedule creates too many backups to preview.";
+  }
+  if (results.stalled) {
+    summary += " The schedule stops creating new backups partway through.";
+  }
+  $("#retention_preview_summary").text(summary);
 
-  modal = M.Modal.getInstance(document.getElementById("settings_modal"))
-  postJson("saveconfig", {"config": config, "backup_folder": $("#settings_specify_folder_id").val()}, closeSettings, showSettingError); 
+  var names = Object.keys(results.sources);
+  var head = "<tr><th>Backup</th>";
+  for (var i = 0; i < names.length; i++) {
+    head += "<th>" + htmlEntities(names[i]) + "</th>";
+  }
+  $("#retention_preview_table thead").html(head + "</tr>");
+
+  var rows = "";
+  for (var i = results.backups.length - 1; i >= 0; i--) {
+    var backup = results.backups[i];
+    var row = "<tr><td>" + htmlEntities(backup.name) + (backup.simulated ? "" : " <i>(existing)</i>") + "<br><span class='grey-text'>" + new Date(backup.date).toLocaleString() + "</span></td>";
+    for (var j = 0; j < names.length; j++) {
+      var fate = backup.sources[names[j]];
+      if (!fate) {
+        row += "<td></td>";
+      } else if (fate.deleted) {
+        row += "<td class='red-text'>Deleted " + new Date(fate.deleted).toLocaleDateString() + (fate.reason ? "<br>" + htmlEntities(fate.reason) : "") + "</td>";
+      } else {
+        row += "<td class='green-text'>Kept</td>";
+      }
+    }
+    rows += row + "</tr>";
+  }
+  $("#retention_preview_table tbody").html(rows);
+  M.Modal.getInstance(document.getElementById("retention_preview_modal")).open();
 }
 
 function closeSettings(){
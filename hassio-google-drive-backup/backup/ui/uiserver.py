@@ -4,9 +4,10 @@ import json
 import aiohttp_jinja2
 import jinja2
 import base64
+import hashlib
 from datetime import timedelta
 from os.path import abspath, join
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Set, Tuple
 
 from aiohttp import BasicAuth, hdrs, web, ClientSession, ClientResponseError
 from aiohttp.web import HTTPException, Request, HTTPSeeOther, HTTPNotFound
@@ -14,15 +15,15 @@ from injector import ClassAssistedBuilder, ProviderOf, inject, singleton
 
 from backup.config import Config, Setting, CreateOptions, BoolValidator, Startable, Version, VERSION
 from backup.const import SOURCE_FILENIO, SOURCE_HA, GITHUB_BUG_TEMPLATE
-from backup.model import Coordinator, Backup, AbstractBackup
-from backup.exceptions import KnownError, GoogleCredGenerateError, ensureKey
-from backup.util import GlobalInfo, Estimator, DataCache, UpgradeFlags
+from backup.model import Coordinator, Backup, AbstractBackup, RetentionSimulator, DEFAULT_SIMULATION_MONTHS
+from backup.exceptions import KnownError, GoogleCredGenerateError, NoBackup, ensureKey
+from backup.util import GlobalInfo, Estimator, DataCache, UpgradeFlags, AsyncFileGetter, parseByteRanges
 from backup.file import File
 from backup.ha import HaSource, PendingBackup, BACKUP_NAME_KEYS, HaRequests, HaUpdater
 from backup.ha import Password
 from backup.time import Time
 from backup.worker import Trigger
-from backup.logger import getLogger, getHistory, TraceLogger
+from backup.logger import getLogger, getHistory, addHistoryListener, removeHistoryListener, TraceLogger
 from backup.creds import Exchanger, Creds
 from backup.debugworker import DebugWorker
 from backup.drive import FolderFinder, AuthCodeQuery
@@ -37,8 +38,20 @@ SCOPE: str = 'https://www.googleapis.com/auth/drive.file'
 
 MIME_TEXT_HTML = "text/html"
 MIME_JSON = "application/json"
+MIME_EVENT_STREAM = "text/event-stream"
+MIME_TAR = "application/tar"
 VERSION_CREATION_TRACKING = Version(0, 104, 0)
 
+# How often /events checks for status changes (eg how long ago a backup was made) when nothing else wakes it up, and
+# how often it sends upload progress during a sync.  Events are never sent closer together than EVENTS_MIN_SECONDS, so a
+# burst of log lines or changes gets batched together.
+EVENTS_IDLE_SECONDS = 5
+EVENTS_SYNCING_SECONDS = 1
+EVENTS_MIN_SECONDS = 0.25
+
+# Sent when nothing else has been for this long, so proxies don't decide the connection is dead.
+EVENTS_KEEPALIVE_SECONDS = 30
+
 
 @singleton
 class UiServer(Trigger, Startable):
@@ -47,7 +60,7 @@ class UiServer(Trigger, Startable):
                  time: Time, config: Config, global_info: GlobalInfo, estimator: Estimator,
                  session: ClientSession, exchanger_builder: ClassAssistedBuilder[Exchanger],
                  debug_worker: DebugWorker, folder_finder: FolderFinder, data_cache: DataCache,
-                 haupdater: HaUpdater, custom_auth_provider: ProviderOf[AuthCodeQuery]):
+                 haupdater: HaUpdater, custom_auth_provider: ProviderOf[AuthCodeQuery], retention: RetentionSimulator):
         super().__init__()
         # Currently running server tasks
         self.runners = []
@@ -74,11 +87,27 @@ class UiServer(Trigger, Startable):
         self.ignore_other_turned_on = False
         self._data_cache = data_cache
         self._haupdater = haupdater
+        self._retention = retention
         self._check_creds_loop: asyncio.Task = None
         self._check_creds_error: Exception = None
         self._device_code_authorizer: AuthCodeQuery = None
         self._upload_event = asyncio.Event()
 
+        # The parts of /getstatus that only change when the backups or config do, along with the Coordinator.version()
+        # they were built for.  See buildStatusInfo().
+        self._status_snapshot: Optional[Tuple[Any, Dict[str, Any]]] = None
+
+        # The ETag /getstatus last handed out, along with the _statusVersion() it was made for.  The generation gets
+        # bumped whenever the version changes, and the start time keeps ETags from before a restart from matching.
+        self._status_etag: Optional[Tuple[Any, str]] = None
+        self._status_generation = 0
+        self._status_etag_prefix = str(int(time.now().timestamp()))
+        self._name_keys: Optional[Tuple[Any, Any, Dict[str, str]]] = None
+
+        # Wakes up each open /events stream, and gets incremented when the server stops so the streams know to end.
+        self._event_streams: Set[asyncio.Event] = set()
+        self._event_stream_generation = 0
+
     def name(self):
         return "UI Server"
 
@@ -93,15 +122,178 @@ class UiServer(Trigger, Startable):
         }
 
     async def getstatus(self, request) -> Dict[Any, Any]:
-        return web.json_response(await self.buildStatusInfo())
+        etag = self._statusEtag()
+        if request is not None and request.method == "GET" and any(match.value == etag for match in (request.if_none_match or [])):
+            # The web UI polls this constantly, so let the browser reuse what it already has when nothing changed,
+            # without building the status at all.
+            response = web.Response(status=304)
+        else:
+            response = web.Response(body=json.dumps(await self.buildStatusInfo()).encode(), content_type=MIME_JSON)
+        response.etag = etag
+        response.headers[hdrs.CACHE_CONTROL] = "no-cache"
+        return response
+
+    async def events(self, request: Request):
+        """
+        Streams server-sent events so the web UI doesn't have to poll.  "status" events hold the keys from
+        buildStatusInfo() whose values changed since the last one (the first holds all of them) and, if the query has
+        log=true, "log" events hold new lines from the add-on's log formatted like /log?format=colored.
+        """
+        send_status = BoolValidator.strToBool(request.query.get("status", "true"))
+        send_log = BoolValidator.strToBool(request.query.get("log", "false"))
+        resp = web.StreamResponse()
+        resp.content_type = MIME_EVENT_STREAM
+        resp.headers[hdrs.CACHE_CONTROL] = "no-cache"
+        # Keep proxies (eg the one in front of ingress) from buffering the stream
+        resp.headers["X-Accel-Buffering"] = "no"
+        await resp.prepare(request)
+
+        loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+
+        def onLog():
+            loop.call_soon_threadsafe(wake.set)
+
+        generation = self._event_stream_generation
+        self._event_streams.add(wake)
+        self.addListener(wake)
+        self._coord.addListener(wake)
+        if send_log:
+            addHistoryListener(onLog)
+        log_index = self.last_log_index
+        last_status: Dict[str, Any] = {}
+        last_sent = loop.time()
+        try:
+            while generation == self._event_stream_generation:
+                sent = False
+                if send_status:
+                    status = await self.buildStatusInfo()
+                    changed = {key: value for key, value in status.items() if key not in last_status or last_status[key] != value}
+                    if len(changed) > 0:
+                        await self._sendEvent(resp, "status", changed)
+                        last_status = status
+                        sent = True
+                if send_log:
+                    lines = []
+                    for index, line in getHistory(log_index, True):
+                        log_index = index
+                        lines.append(line.replace("\n", "   \n") + "\n")
+                    if len(lines) > 0:
+                        await self._sendEvent(resp, "log", "".join(lines))
+                        sent = True
+                if sent:
+                    last_sent = loop.time()
+                elif loop.time() - last_sent >= EVENTS_KEEPALIVE_SECONDS:
+                    await resp.write(b": keepalive\n\n")
+                    last_sent = loop.time()
+
+                await asyncio.sleep(EVENTS_MIN_SECONDS)
+                interval = EVENTS_SYNCING_SECONDS if self._coord.isSyncing() else EVENTS_IDLE_SECONDS
+                try:
+                    await asyncio.wait_for(wake.wait(), max(0, interval - EVENTS_MIN_SECONDS))
+                except asyncio.TimeoutError:
+                    pass
+                wake.clear()
+        except ConnectionResetError:
+            # The browser went away, which is how these usually end.
+            pass
+        finally:
+            self._event_streams.discard(wake)
+            self.removeListener(wake)
+            self._coord.removeListener(wake)
+            if send_log:
+                removeHistoryListener(onLog)
+        return resp
+
+    async def _sendEvent(self, resp: web.StreamResponse, event: str, data: Any):
+        await resp.write("event: {0}\ndata: {1}\n\n".format(event, json.dumps(data)).encode())
+
+    def _statusEtag(self) -> str:
+        version = self._statusVersion()
+        if version is None or self._status_etag is None or self._status_etag[0] != version:
+            self._status_generation += 1
+            self._status_etag = (version, "{0}-{1}".format(self._status_etag_prefix, self._status_generation))
+        return self._status_etag[1]
+
+    def _statusVersion(self) -> Optional[Tuple[Any, ...]]:
+        """
+        Stands in for everything buildStatusInfo() reads, and is cheap enough to check on every poll of /getstatus.
+        Returns None while a sync is running, since backups and their upload progress change constantly then.
+        """
+        if self._coord.isSyncing():
+            return None
+        snapshot = self._statusSnapshot()
+        now = self._time.now()
+
+        # Relative times like "2 hours ago" only need to be current to the minute, unless one is down to seconds.
+        nearby = [snapshot['backups'][-1][0].date()] if len(snapshot['backups']) > 0 else []
+        next = self._coord.nextBackupTime()
+        if next is not None:
+            nearby.append(next)
+        if any(abs((now - date).total_seconds()) < 60 for date in nearby):
+            now = now.replace(microsecond=0)
+        else:
+            now = now.replace(second=0, microsecond=0)
+
+        pending = self._ha_source.pending_backup
+        info = self._global_info
+        return (
+            self._coord.version(),
+            now,
+            next,
+            (id(pending), pending.isComplete(), pending.isFailed()) if pending is not None else None,
+            (id(info._last_error), info.isErrorSuppressed(), info.failureCount(), info.ignoreErrorsForNow(), info._first_sync,
+             info.credVersion, id(info.getDnsInfo())),
+            self.folder_finder.getCachedFolder(),
+            self._ha_source.getHomeAssistantUrl(),
+            id(self._ha_source.getHostInfo()),
+            id(self._ha_source.mount_info),
+            self._coord.isWaitingForStartup(),
+            self._coord._model.dest.isCustomCreds(),
+            self._coord._model.dest.might_be_oob_creds,
+            self.ignore_other_turned_on,
+            self._data_cache.notifyForIgnoreUpgrades,
+            tuple(self._data_cache.checkFlag(flag) for flag in UpgradeFlags)
+        )
+
+    def _statusSnapshot(self) -> Dict[str, Any]:
+        """
+        Builds the parts of the status that are expensive and only change along with the backups or config, and
+        reuses them for as long as Coordinator.version() stays the same.  Nothing gets reused during a sync, since
+        that is when backups get added, deleted and uploaded.
+        """
+        version = self._coord.version()
+        if not self._coord.isSyncing() and self._status_snapshot is not None and self._status_snapshot[0] == version:
+            return self._status_snapshot[1]
+        backups = self._coord.backups()
+        not_ignored = list(filter(lambda s: not s.ignore(), backups))
+        upgrade_date = self._data_cache.getUpgradeTime(VERSION_CREATION_TRACKING)
+        snapshot = {
+            'backups': [(backup, self._staticBackupDetails(backup)) for backup in backups],
+            'latest': not_ignored[len(not_ignored) - 1].date() if len(not_ignored) > 0 else None,
+            'ignored_before_upgrade': len(list(filter(lambda s: s.date() < upgrade_date, filter(Backup.ignore, backups))))
+        }
+        self._status_snapshot = (version, snapshot)
+        return snapshot
+
+    def _backupNameKeys(self) -> Dict[str, str]:
+        # These are examples of what each key looks like in a backup's name, so they only need to be current to the minute.
+        now = self._time.now().replace(second=0, microsecond=0)
+        host_info = self._ha_source.getHostInfo()
+        if self._name_keys is None or self._name_keys[0] != now or self._name_keys[1] is not host_info:
+            name_keys = {}
+            for key in BACKUP_NAME_KEYS:
+                name_keys[key] = BACKUP_NAME_KEYS[key]("Full", now, host_info)
+            self._name_keys = (now, host_info, name_keys)
+        return self._name_keys[2]
 
     async def buildStatusInfo(self):
+        snapshot = self._statusSnapshot()
         status: Dict[Any, Any] = {}
         status['folder_id'] = self.folder_finder.getCachedFolder()
         status['backups'] = []
-        backups = self._coord.backups()
-        for backup in backups:
-            status['backups'].append(self.getBackupDetails(backup))
+        for backup, details in snapshot['backups']:
+            status['backups'].append(dict(details, **self._liveBackupDetails(backup)))
         status['ha_url_base'] = self._ha_source.getHomeAssistantUrl()
         status['restore_backup_path'] = "hassio/backups"
         status['ask_error_reports'] = not self.config.isExplicit(
@@ -125,9 +317,8 @@ class UiServer(Trigger, Startable):
             status['next_backup_machine'] = self._time.asRfc3339String(next)
             status['next_backup_detail'] = self._time.toLocal(
                 next).strftime("%c")
-        not_ignored = list(filter(lambda s: not s.ignore(), self._coord.backups()))
-        if len(not_ignored) > 0:
-            latest = not_ignored[len(not_ignored) - 1].date()
+        latest = snapshot['latest']
+        if latest is not None:
             status['last_backup_text'] = self._time.formatDelta(latest)
             status['last_backup_machine'] = self._time.asRfc3339String(
                 latest)
@@ -164,19 +355,13 @@ class UiServer(Trigger, Startable):
         status['is_specify_folder'] = self.config.get(
             Setting.SPECIFY_BACKUP_FOLDER)
         status['backup_cooldown_active'] = self._coord.isWaitingForStartup()
-        name_keys = {}
-        for key in BACKUP_NAME_KEYS:
-            name_keys[key] = BACKUP_NAME_KEYS[key](
-                "Full", self._time.now(), self._ha_source.getHostInfo())
-        status['backup_name_keys'] = name_keys
+        status['backup_name_keys'] = self._backupNameKeys()
         status['mounts'] = self._ha_source.mount_info
 
         # Indicate the user should be notified for a specific situation where:
         #  - They recently turned on "IGNORE_OTHER_BACKUPS"
         #  - They have ignored backups created before upgrading to v0.104.0 or higher.
-        upgrade_date = self._data_cache.getUpgradeTime(VERSION_CREATION_TRACKING)
-        ignored = len(list(filter(lambda s: s.date() < upgrade_date, filter(Backup.ignore, self._coord.backups()))))
-        status["notify_check_ignored"] = ignored > 0 and self.ignore_other_turned_on
+        status["notify_check_ignored"] = snapshot['ignored_before_upgrade'] > 0 and self.ignore_other_turned_on
         status["warn_backup_upgrade"] = self.config.get(Setting.CALL_BACKUP_SNAPSHOT) and not self._data_cache.checkFlag(UpgradeFlags.NOTIFIED_ABOUT_BACKUP_RENAME)
         status["warn_stop_addons"] = self.config.get(Setting.STOP_ADDONS) and not self._data_cache.checkFlag(UpgradeFlags.NOTIFIED_ABOUT_STOPADDONS)
         status["warn_upgrade_backups"] = self._data_cache.notifyForIgnoreUpgrades
@@ -187,7 +372,10 @@ class UiServer(Trigger, Startable):
         return web.Response(body="bootstrap_update_data = {0};".format(json.dumps(await self.buildStatusInfo(), indent=4)), content_type="text/javascript")
 
     def getBackupDetails(self, backup: Backup):
-        ha = backup.getSource(SOURCE_HA)
+        return dict(self._staticBackupDetails(backup), **self._liveBackupDetails(backup))
+
+    def _staticBackupDetails(self, backup: Backup):
+        """Details about a backup that only change along with Coordinator.version()"""
         sources = []
         for source_key in backup.sources:
             source: AbstractBackup = backup.sources[source_key]
@@ -201,14 +389,11 @@ class UiServer(Trigger, Startable):
                 'ignored': source.ignore(),
             })
 
-        data = {
+        return {
             'name': backup.name(),
             'slug': backup.slug(),
             'size': backup.sizeString(),
-            'status': backup.status(),
             'date': self._time.toLocal(backup.date()).strftime("%c"),
-            'createdAt': self._time.formatDelta(backup.date()),
-            'isPending': ha is not None and type(ha) is PendingBackup,
             'protected': backup.protected(),
             'type': backup.backupType(),
             'folders': backup.details().get("folders", []),
@@ -217,12 +402,21 @@ class UiServer(Trigger, Startable):
             'haVersion': False if backup.version() is None else backup.version(),
             'uploadable': backup.getSource(SOURCE_HA) is None and len(backup.sources) > 0,
             'restorable': backup.getSource(SOURCE_HA) is not None,
-            'status_detail': backup.getStatusDetail(),
-            'upload_info': backup.getUploadInfo(self._time),
             'ignored': backup.ignore(),
             'timestamp': backup.date().timestamp(),
             'note': backup.note()
         }
+
+    def _liveBackupDetails(self, backup: Backup):
+        """Details about a backup that change on their own, eg with the time or as an upload progresses"""
+        ha = backup.getSource(SOURCE_HA)
+        data = {
+            'status': backup.status(),
+            'createdAt': self._time.formatDelta(backup.date()),
+            'isPending': ha is not None and type(ha) is PendingBackup,
+            'status_detail': backup.getStatusDetail(),
+            'upload_info': backup.getUploadInfo(self._time)
+        }
         if isinstance(ha, PendingBackup):
             data["super_logs"] = ha.error_logs()
         return data
@@ -347,6 +541,13 @@ class UiServer(Trigger, Startable):
         await self.startSync(request)
         return web.json_response({'message': 'Done'})
 
+    async def simulateretention(self, request: Request):
+        """Previews what the settings being edited would keep and delete over the coming months, without saving them"""
+        data = await request.json()
+        update = ensureKey("config", data, "the retention preview request")
+        months = int(data.get("months", DEFAULT_SIMULATION_MONTHS))
+        return web.json_response(await self._retention.simulate(self.config.getConfigFor(update), months))
+
     async def confirmdelete(self, request: Request):
         always = BoolValidator.strToBool(request.query.get("always", False))
         self._global_info.allowMultipleDeletes()
@@ -641,23 +842,119 @@ class UiServer(Trigger, Startable):
 
     async def download(self, request: Request):
         slug = request.query.get("slug", "")
-        backup = self._coord.getBackup(slug)
-        stream = await self._coord.download(slug)
-        await stream.setup()
-        resp = web.StreamResponse()
-        resp.content_type = 'application/tar'
-        resp.headers['Content-Disposition'] = 'attachment; filename="{}.tar"'.format(
-            backup.name())
-        resp.headers['Content-Length'] = str(stream.size())
+        try:
+            backup = self._coord.getBackup(slug)
+        except NoBackup:
+            raise HTTPNotFound()
 
-        await resp.prepare(request)
+        # Conditional requests get answered from what the model knows about the backup, so a client checking whether
+        # its copy is still good doesn't make us open a connection to wherever the backup is stored.
+        etag = "{0}-{1}".format(slug, backup.sizeInt())
+        headers = {
+            hdrs.CONTENT_DISPOSITION: 'attachment; filename="{}.tar"'.format(backup.name()),
+            hdrs.ACCEPT_RANGES: 'bytes'
+        }
+        if self._etagMatches(etag, request.headers.get(hdrs.IF_NONE_MATCH)):
+            resp = web.Response(status=304, headers=headers)
+            resp.etag = etag
+            return resp
 
-        # SOMEDAY: consider re-streaming a decrypted tar file for the sake of convenience
+        # A Range is only honored if it's for the same version of the backup the client already has part of.
+        # If-Range can also be a date, but we never send Last-Modified, so a date never counts as a match and the
+        # whole file gets sent instead.
+        if_range = request.headers.get(hdrs.IF_RANGE)
+        honor_range = if_range is None or self._etagMatches(etag, if_range, weak=False)
 
-        async for chunk in stream.generator(self.config.get(Setting.DEFAULT_CHUNK_SIZE)):
-            await resp.write(chunk)
+        stream = await self._coord.download(slug)
+        async with stream:
+            size = stream.size()
+            ranges = parseByteRanges(request.headers.get(hdrs.RANGE), size) if honor_range else None
+            if ranges is not None and len(ranges) == 0:
+                headers[hdrs.CONTENT_RANGE] = "bytes */{0}".format(size)
+                return web.Response(status=416, headers=headers)
+
+            if ranges is None or len(ranges) == 1:
+                first, last = ranges[0] if ranges else (0, size - 1)
+                resp = web.StreamResponse(status=206 if ranges else 200, headers=headers)
+                resp.content_type = MIME_TAR
+                resp.etag = etag
+                resp.content_length = last - first + 1
+                if ranges:
+                    resp.headers[hdrs.CONTENT_RANGE] = "bytes {0}-{1}/{2}".format(first, last, size)
+                await resp.prepare(request)
+
+                if not isinstance(stream, AsyncFileGetter) or not await self._sendFile(request, stream.path(), first, last):
+                    # SOMEDAY: consider re-streaming a decrypted tar file for the sake of convenience
+                    await self._writeRange(resp, stream, first, last)
+                await resp.write_eof()
+                return resp
+
+            # Multiple ranges get sent as a multipart/byteranges body, with each part read from wherever the
+            # backup is stored.
+            boundary = hashlib.sha1(etag.encode()).hexdigest()
+            part_headers = []
+            length = 0
+            for first, last in ranges:
+                part_header = "--{0}\r\n{1}: {2}\r\n{3}: bytes {4}-{5}/{6}\r\n\r\n".format(
+                    boundary, hdrs.CONTENT_TYPE, MIME_TAR, hdrs.CONTENT_RANGE, first, last, size).encode()
+                part_headers.append(part_header)
+                length += len(part_header) + last - first + 1 + 2
+            trailer = "--{0}--\r\n".format(boundary).encode()
+            resp = web.StreamResponse(status=206, headers=headers)
+            resp.content_type = "multipart/byteranges; boundary=" + boundary
+            resp.etag = etag
+            resp.content_length = length + len(trailer)
+            await resp.prepare(request)
+            for part_header, (first, last) in zip(part_headers, ranges):
+                await resp.write(part_header)
+                await self._writeRange(resp, stream, first, last)
+                await resp.write(b"\r\n")
+            await resp.write(trailer)
+            await resp.write_eof()
+            return resp
+
+    async def _writeRange(self, resp: web.StreamResponse, stream, first: int, last: int):
+        chunk_size = self.config.get(Setting.DEFAULT_CHUNK_SIZE)
+        stream.position(first)
+        remaining = last - first + 1
+        while remaining > 0:
+            chunk = await stream.read(min(chunk_size, remaining))
+            if len(chunk.getbuffer()) == 0:
+                break
+            remaining -= len(chunk.getbuffer())
+            await resp.write(chunk.getbuffer())
+
+    async def _sendFile(self, request: Request, path: str, first: int, last: int) -> bool:
+        """
+        Has the kernel copy bytes first through last of a local file to the response's socket with sendfile().  Returns
+        False without sending anything if the event loop or transport can't do that, so the caller can stream it instead.
+        """
+        if request.transport is None:
+            raise ConnectionResetError("Connection lost")
+        loop = asyncio.get_event_loop()
+        file = await loop.run_in_executor(None, open, path, "rb")
+        try:
+            await loop.sendfile(request.transport, file, first, last - first + 1)
+            return True
+        except NotImplementedError:
+            return False
+        finally:
+            file.close()
 
-        await resp.write_eof()
+    def _etagMatches(self, etag: str, header: Optional[str], weak: bool = True) -> bool:
+        if header is None:
+            return False
+        for candidate in header.split(","):
+            candidate = candidate.strip()
+            if candidate == "*":
+                return True
+            if candidate.startswith("W/"):
+                if not weak:
+                    continue
+                candidate = candidate[2:]
+            if candidate == '"{0}"'.format(etag):
+                return True
+        return False
 
     async def run(self) -> None:
         await self.stop()
@@ -713,6 +1010,7 @@ class UiServer(Trigger, Startable):
         self._addRoute(app, self.pp)
 
         self._addRoute(app, self.getstatus)
+        self._addRoute(app, self.events)
         self._addRoute(app, self.backup)
         self._addRoute(app, self.manualauth)
         self._addRoute(app, self.token)
@@ -727,6 +1025,7 @@ class UiServer(Trigger, Startable):
         self._addRoute(app, self.errorreports)
         self._addRoute(app, self.exposeserver)
         self._addRoute(app, self.saveconfig)
+        self._addRoute(app, self.simulateretention)
         self._addRoute(app, self.changefolder)
         self._addRoute(app, self.confirmdelete)
         self._addRoute(app, self.resolvefolder)
@@ -774,6 +1073,11 @@ class UiServer(Trigger, Startable):
         await site.start()
 
     async def stop(self):
+        # End any open event streams, since they'd otherwise keep the server from shutting down until they time out
+        self._event_stream_generation += 1
+        for wake in self._event_streams:
+            wake.set()
+
         # Stop pending requests for all available servers
         for runner in self.runners:
             try:
@@ -1,9 +1,14 @@
 # flake8: noqa
 from .asynchttpgetter import AsyncHttpGetter
+from .asyncfilegetter import AsyncFileGetter
 from .backoff import Backoff
 from .estimator import Estimator
 from .globalinfo import GlobalInfo
 from .resolver import Resolver
 from .rangelookup import RangeLookup
-from .data_cache import DataCache, KEY_CREATED, KEY_I_MADE_THIS, KEY_PENDING, KEY_NOTE, KEY_IGNORE, KEY_LAST_SEEN, KEY_NAME, CACHE_EXPIRATION_DAYS, UpgradeFlags
+from .data_cache import DataCache, KEY_CREATED, KEY_I_MADE_THIS, KEY_PENDING, KEY_NOTE, KEY_IGNORE, KEY_LAST_SEEN, KEY_NAME, CACHE_EXPIRATION_DAYS, UpgradeFlags, KEY_UPLOAD_SESSION
 from .token_bucket import TokenBucket
+from .bufferpool import BufferPool
+from .readahead import ReadAheadStream
+from .byterange import parseByteRanges
+from .segmenteddownload import SegmentedDownload
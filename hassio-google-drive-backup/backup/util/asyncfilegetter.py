@@ -0,0 +1,92 @@
+import asyncio
+import os
+
+from .asynchttpgetter import AsyncHttpGetter
+from ..exceptions import LogicError
+from ..logger import getLogger
+from ..time import Time
+
+logger = getLogger(__name__)
+
+
+class AsyncFileGetter(AsyncHttpGetter):
+    """
+    Reads a file on local disk with the same interface as AsyncHttpGetter, so a backup that's already in the
+    backup directory can be uploaded or downloaded without the supervisor serving it back to us over HTTP.  Reads
+    happen on a worker thread so a slow disk doesn't block the event loop.
+    """
+
+    def __init__(self, path: str, time: Time):
+        super().__init__(path, {}, None, time=time)
+        self._path = path
+        self._fd = None
+
+        # The read running on a worker thread, if there is one.  It can outlive a cancelled readinto().
+        self._reading: asyncio.Future = None
+
+    def path(self) -> str:
+        return self._path
+
+    async def setup(self):
+        if not self._position == 0:
+            raise LogicError("AsyncFileGetter must also be set up at position 0")
+        self._open()
+        self._size = os.fstat(self._fd).st_size
+        self._history.append([self._time.now(), 0])
+        return self._size
+
+    async def readinto(self, buffer: memoryview) -> int:
+        self._ensureSetup()
+        needed = min(len(buffer), self.size() - self._position)
+        if needed <= 0:
+            return 0
+        await self.settle()
+        self._open()
+        target = buffer[:needed]
+        self._reading = asyncio.get_event_loop().run_in_executor(None, self._readAt, target, self._position)
+        # Cancelling this can't stop the thread, so it's shielded to keep track of when the thread is done with the buffer
+        received = await asyncio.shield(self._reading)
+        self._reading = None
+        # The worker thread can hang on to its arguments for a moment, so let go of the buffer now instead
+        target.release()
+        if received < needed:
+            raise LogicError("Backup file '{0}' got shorter while it was being read".format(self._path))
+        self._position += received
+        self._history.append([self._time.now(), self._position])
+        if len(self._history) > 50:
+            self._history.popleft()
+        return received
+
+    async def settle(self):
+        if self._reading is not None:
+            try:
+                await asyncio.shield(self._reading)
+            except Exception:
+                # Whoever started the read gets the error, or was cancelled and doesn't care anymore
+                pass
+            self._reading = None
+
+    async def __aexit__(self, type, value, traceback):
+        await self.settle()
+        self.close()
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _open(self):
+        if self._fd is None:
+            self._fd = os.open(self._path, os.O_RDONLY)
+            if hasattr(os, "posix_fadvise"):
+                # Let the kernel know it should read ahead aggressively, since the file is read start to finish.
+                os.posix_fadvise(self._fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+    def _readAt(self, buffer: memoryview, position: int) -> int:
+        received = 0
+        while received < len(buffer):
+            read = os.preadv(self._fd, [buffer[received:]], position + received)
+            if read == 0:
+                break
+            received += read
+        return received
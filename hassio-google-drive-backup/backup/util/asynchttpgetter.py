@@ -7,6 +7,7 @@ from aiohttp.client import ClientResponse, ClientPayloadError, ClientOSError
 from asyncio.exceptions import TimeoutError
 from collections import deque
 
+from .backoff import Backoff
 from ..exceptions import LogicError, ensureKey
 from ..logger import getLogger
 from ..time import Time
@@ -19,15 +20,36 @@ SERVER_CONTENT_LENGTH_ERROR = "Server returned a content length that didn't matc
 POSITION_ERROR_MESSAGE = "AsyncHttpGetter must also be set up at position 0"
 DEFAULT_CHUNK_SIZE = 1024 * 1024
 
+# How many times in a row a dropped or timed out connection gets reopened (with a Range request starting where it
+# left off) before the error is raised.  The count resets whenever a read succeeds.
+RECONNECT_ATTEMPTS = 3
+RECONNECT_BACKOFF_BASE = 1
+RECONNECTABLE_ERRORS = (TimeoutError, ClientPayloadError, ClientOSError)
+
 
 # This class is dumb but it gets around a dumb problem
 class Stupid(io.BytesIO):
     def __len__(self):
-        return len(self.getvalue())
+        with self.getbuffer() as view:
+            return view.nbytes
+
+    @classmethod
+    async def fill(cls, readinto, count: int) -> 'Stupid':
+        """Makes a stream of up to 'count' bytes that readinto() writes straight into, so they only get copied once"""
+        stream = cls()
+        if count > 0:
+            # Writing the last byte sizes the stream's buffer in one go
+            stream.seek(count - 1)
+            stream.write(b'\0')
+            with stream.getbuffer() as view:
+                read = await readinto(view)
+            stream.truncate(read)
+            stream.seek(0)
+        return stream
 
 
 class AsyncHttpGetter:
-    def __init__(self, url, headers: Dict[str, str], session, size: int = None, timeout=None, timeoutFactory=None, otherErrorFactory=None, time: Time = None):
+    def __init__(self, url, headers: Dict[str, str], session, size: int = None, timeout=None, timeoutFactory=None, otherErrorFactory=None, time: Time = None, reconnect_attempts: int = RECONNECT_ATTEMPTS):
         self._url: str = url
 
         # Current position of the stream
@@ -55,10 +77,28 @@ class AsyncHttpGetter:
         self.otherErrorFactory = otherErrorFactory
         self.timeout = timeout
 
+        # Reconnecting after an error mid-transfer
+        self._reconnect_attempts = reconnect_attempts
+        self._reconnect_backoff = Backoff(base=RECONNECT_BACKOFF_BASE, attempts=reconnect_attempts)
+
+        # Number of times the connection was reopened after an error, and the number of bytes that had to be
+        # downloaded again because of it (bytes the dropped connection received that weren't read yet, or everything
+        # before the range when the server ignores a Range request)
+        self.reconnects = 0
+        self.refetched = 0
+
+        # How much of the current response's body has been read, to tell how much it received that never got used
+        self._responseRead = 0
+
     async def setup(self):
         if not self._position == 0:
             raise LogicError(POSITION_ERROR_MESSAGE)
-        await self._startReadRemoteAt(0)
+        while True:
+            try:
+                await self._startReadRemoteAt(0)
+                break
+            except RECONNECTABLE_ERRORS as e:
+                await self._waitToReconnect(e)
         if CONTENT_LENGTH_HEADER in self._response.headers:
             self._size = int(ensureKey(
                 CONTENT_LENGTH_HEADER, self._response.headers, "web server get request's headers"))
@@ -156,73 +196,128 @@ class AsyncHttpGetter:
     def __format__(self, format_spec: str) -> str:
         return str(int(self.progress()))
 
+    def reconnectInfo(self) -> Dict[str, int]:
+        return {
+            'reconnects': self.reconnects,
+            'refetched_bytes': self.refetched
+        }
+
     async def _startReadRemoteAt(self, where: int):
         headers = self._headers.copy()
         # request a byte range
         if where != 0:
-            headers['range'] = "bytes=%s-%s" % (self._position, self._size - 1)
+            headers['range'] = "bytes=%s-%s" % (where, self._size - 1)
         if self._response is not None:
             self._response.release()
-        try:
-            resp = await self._session.get(self._url, headers=headers, timeout=self.timeout)
-        except TimeoutError:
-            if self.timeoutFactory is not None:
-                raise self.timeoutFactory()
-            raise
-        except ClientPayloadError:
-            if self.otherErrorFactory is not None:
-                raise self.otherErrorFactory()
-            raise
-        except ClientOSError:
-            if self.otherErrorFactory is not None:
-                raise self.otherErrorFactory()
-            raise
+            self._response = None
+        resp = await self._session.get(self._url, headers=headers, timeout=self.timeout)
         resp.raise_for_status()
         if where == 0 and self._size is not None and CONTENT_LENGTH_HEADER in resp.headers and int(resp.headers[CONTENT_LENGTH_HEADER]) != self._size:
             resp.release()
             raise LogicError(SERVER_CONTENT_LENGTH_ERROR)
+        if where != 0 and resp.status != 206:
+            # The server ignored the range and is sending everything again, so skip past what we already have.
+            try:
+                skipped = 0
+                while skipped < where:
+                    data = await resp.content.read(min(where - skipped, DEFAULT_CHUNK_SIZE))
+                    if len(data) == 0:
+                        raise ClientPayloadError("Response ended before reaching the requested range")
+                    skipped += len(data)
+            except BaseException:
+                self.refetched += resp.content.total_bytes
+                resp.release()
+                raise
+            self.refetched += where
         self._response = resp
         self._responseStart = where
+        self._responseRead = where if resp.status != 206 else 0
+
+    def _abandonResponse(self):
+        """
+        Drops the current response after an error so the next read makes a new request, counting what it received
+        that wasn't read yet as refetched since the new request downloads it again.
+        """
+        self._responseStart = -1
+        if self._response is not None:
+            self.refetched += max(0, self._response.content.total_bytes - self._responseRead)
+            self._response.release()
+            self._response = None
+
+    async def _waitToReconnect(self, error: BaseException):
+        """Waits before reopening the connection after 'error', or raises it if there have been too many attempts"""
+        self._abandonResponse()
+        error = self._translateError(error)
+        if self._reconnect_attempts <= 0:
+            raise error
+        wait = self._reconnect_backoff.backoff(error)
+        self.reconnects += 1
+        logger.debug("Reconnecting to {0} at byte {1} in {2} seconds after an error: {3}".format(
+            self._url, self._position, wait, str(error)))
+        await self._time.sleepAsync(wait)
+
+    def _translateError(self, error: BaseException) -> BaseException:
+        if isinstance(error, TimeoutError):
+            if self.timeoutFactory is not None:
+                return self.timeoutFactory()
+        elif self.otherErrorFactory is not None:
+            return self.otherErrorFactory()
+        return error
 
     async def read(self, count=DEFAULT_CHUNK_SIZE):
         self._ensureSetup()
-        ret = Stupid()
+        return await Stupid.fill(self.readinto, min(count, max(0, self.size() - self._position)))
+
+    async def settle(self):
+        """
+        Waits until nothing is writing into a buffer given to readinto() anymore, which can take a moment after a
+        cancelled read if the stream reads on another thread.  Do this before reusing a buffer a cancelled read had.
+        """
+        pass
+
+    async def readinto(self, buffer: memoryview) -> int:
+        """
+        Reads up to len(buffer) bytes from the stream into buffer and returns how many were read, which is only less
+        than len(buffer) at the end of the stream.  The bytes only get copied once (from the connection into buffer),
+        so this is preferable to read() for large chunks.
+
+        If the connection drops or times out partway through, it gets reopened with a Range request starting at the
+        first byte that hasn't been received yet, up to RECONNECT_ATTEMPTS times in a row.
+        """
+        self._ensureSetup()
         if self._size is not None and self._position >= self._size:
-            return ret
-
-        # See if we need to move the stream elsewhere
-        if self._responseStart != self._position:
-            # Reset the stream's position
-            await self._startReadRemoteAt(self._position)
+            return 0
 
         # Limit by how much we can get from the stream
-        needed = min(count, self.size() - self._position)
+        needed = min(len(buffer), self.size() - self._position)
+        received = 0
+        while received < needed:
+            try:
+                # See if we need to move the stream elsewhere
+                if self._responseStart != self._position + received:
+                    await self._startReadRemoteAt(self._position + received)
+                data = await self._response.content.read(needed - received)
+                if len(data) == 0:
+                    raise ClientPayloadError("Response ended before the expected number of bytes were received")
+                buffer[received:received + len(data)] = data
+                received += len(data)
+                self._responseStart += len(data)
+                self._responseRead += len(data)
+            except RECONNECTABLE_ERRORS as e:
+                await self._waitToReconnect(e)
+            except BaseException:
+                # Some unknown amount of the response was consumed (this includes cancellation), so force the
+                # next read to make a new request.
+                self._abandonResponse()
+                raise
+        self._reconnect_backoff.reset()
 
-        # And then get it
-        try:
-            data = await self._response.content.readexactly(needed)
-        except TimeoutError:
-            if self.timeoutFactory is not None:
-                raise self.timeoutFactory()
-            raise
-        except ClientPayloadError:
-            if self.otherErrorFactory is not None:
-                raise self.otherErrorFactory()
-            raise
-        except ClientOSError:
-            if self.otherErrorFactory is not None:
-                raise self.otherErrorFactory()
-            raise
-        ret.write(data)
         # Keep track of where we are in the stream
-        self._responseStart += len(data)
-        self._position += len(data)
+        self._position += received
         self._history.append([self._time.now(), self._position])
         if len(self._history) > 50:
             self._history.popleft()
-
-        ret.seek(0)
-        return ret
+        return received
 
     async def __aenter__(self):
         await self.setup()
@@ -0,0 +1,41 @@
+from typing import List
+
+from injector import inject, singleton
+
+# How many unused buffers the pool holds on to.  Uploads use two at a time (one being sent, one being read ahead)
+MAX_IDLE_BUFFERS = 2
+
+
+@singleton
+class BufferPool:
+    """
+    Keeps around a few large bytearrays so chunks of a backup can be read into memory that was already allocated,
+    instead of allocating (and eventually garbage collecting) several new copies of every chunk.  This matters on
+    devices like a Raspberry Pi, where a 10MB upload chunk is a meaningful amount of memory.
+    """
+    @inject
+    def __init__(self):
+        self._free: List[bytearray] = []
+
+        # Total number of buffers this pool ever had to allocate, useful for verifying buffers get reused.
+        self.allocations = 0
+
+    def acquire(self, size: int) -> bytearray:
+        """Returns a buffer at least 'size' bytes long, reusing a free one if possible"""
+        for buffer in self._free:
+            if len(buffer) >= size:
+                self._free.remove(buffer)
+                return buffer
+        self.allocations += 1
+        return bytearray(size)
+
+    def release(self, buffer: bytearray):
+        """Gives a buffer back to the pool.  The caller must not use it (or any view of it) afterward."""
+        self._free.append(buffer)
+        if len(self._free) > MAX_IDLE_BUFFERS:
+            # Keep the largest buffers, since they can satisfy any request the smaller ones could.
+            self._free.sort(key=len, reverse=True)
+            del self._free[MAX_IDLE_BUFFERS:]
+
+    def idle(self) -> int:
+        return len(self._free)
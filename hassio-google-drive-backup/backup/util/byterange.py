@@ -0,0 +1,44 @@
+from typing import List, Optional, Tuple
+
+BYTES_UNIT = "bytes"
+
+
+def parseByteRanges(header: Optional[str], size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Parses an HTTP Range header (RFC 7233) for a representation that's 'size' bytes long into a list of inclusive
+    (first, last) byte positions, in the order they were requested.
+
+    Returns None when the header is missing or can't be parsed, in which case it should be ignored and the whole
+    representation sent.  Returns an empty list when none of the requested ranges overlap the representation,
+    which should get a 416 response.
+    """
+    if header is None:
+        return None
+    unit, sep, specs = header.partition("=")
+    if not sep or unit.strip().lower() != BYTES_UNIT:
+        return None
+    ranges = []
+    valid = False
+    for spec in specs.split(","):
+        spec = spec.strip()
+        if len(spec) == 0:
+            continue
+        first, sep, last = spec.partition("-")
+        first = first.strip()
+        last = last.strip()
+        if not sep or (first and not first.isdigit()) or (last and not last.isdigit()) or not (first or last):
+            return None
+        if not first:
+            # A suffix range, ie the last N bytes
+            valid = True
+            if int(last) > 0 and size > 0:
+                ranges.append((max(0, size - int(last)), size - 1))
+            continue
+        if last and int(last) < int(first):
+            return None
+        valid = True
+        if int(first) < size:
+            ranges.append((int(first), min(int(last), size - 1) if last else size - 1))
+    if not valid:
+        return None
+    return ranges
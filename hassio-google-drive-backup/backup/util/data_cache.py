@@ -17,6 +17,7 @@ KEY_LAST_VERSION = "last_verison"
 KEY_UPGRADES = "upgrades"
 KEY_FLAGS = "flags"
 KEY_NOTE = "note"
+KEY_UPLOAD_SESSION = "upload_session"
 
 CACHE_EXPIRATION_DAYS = 30
 
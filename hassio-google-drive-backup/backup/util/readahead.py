@@ -0,0 +1,163 @@
+import asyncio
+from typing import List
+
+from .asynchttpgetter import DEFAULT_CHUNK_SIZE
+from .bufferpool import BufferPool
+from ..logger import getLogger
+
+logger = getLogger(__name__)
+
+
+class ReadAheadStream:
+    """
+    Wraps an AsyncHttpGetter so the next chunk of a stream can be fetched in the background while the
+    caller is busy doing something else with the last one, eg uploading it to Google Drive.  At most one
+    chunk is ever read ahead.  Seeking to a position outside of what has been read ahead just drops the
+    buffered bytes, so callers can move the position around exactly as they would with the wrapped stream.
+
+    Chunks are read straight into (at most two) buffers borrowed from a BufferPool and handed out as
+    memoryviews, so a chunk's bytes are never copied again once they've been read from the network.  A view
+    returned by read() stays valid until the next call to read() or close().
+    """
+
+    def __init__(self, stream, pool: BufferPool = None, buffer_size: int = DEFAULT_CHUNK_SIZE):
+        self._stream = stream
+        self._pool = pool if pool is not None else BufferPool()
+        self._buffer_size = buffer_size
+        self._position: int = stream.position()
+
+        # Buffers borrowed from the pool, and the one backing the view most recently returned by read(), which the
+        # caller may still be using so it can't be written to.
+        self._buffers: List[bytearray] = []
+        self._handed_out: bytearray = None
+
+        # Bytes that were read ahead of the current position are _filled[_filled_offset:_filled_offset + _filled_length],
+        # and start at _filled_start in the stream.
+        self._filled: bytearray = None
+        self._filled_offset: int = 0
+        self._filled_length: int = 0
+        self._filled_start: int = self._position
+
+        # The in-flight background read, if there is one.
+        self._prefetch: asyncio.Task = None
+        self._closed = False
+
+    def size(self) -> int:
+        return self._stream.size()
+
+    def __len__(self):
+        return self.size()
+
+    def position(self, pos=None):
+        if pos is not None:
+            self._position = pos
+        return self._position
+
+    def buffered(self) -> int:
+        """Number of bytes read ahead of the current position that are ready to be returned"""
+        if self._prefetch is not None and self._prefetch.done() and self._prefetch.exception() is None:
+            self._filled_length += self._prefetch.result()
+            self._prefetch = None
+        end = self._filled_start + self._filled_length
+        if self._position < self._filled_start or self._position > end:
+            return 0
+        return end - self._position
+
+    def prefetch(self, count=DEFAULT_CHUNK_SIZE):
+        """Starts reading the next 'count' bytes in the background, if a read isn't already in flight"""
+        if self._prefetch is not None:
+            return
+        self._trim()
+        start = self._filled_start + self._filled_length
+        needed = min(count - self._filled_length, self.size() - start)
+        if needed <= 0:
+            return
+        self._moveFilledTo(self._spare(count))
+        view = memoryview(self._filled)[self._filled_length:self._filled_length + needed]
+        self._prefetch = asyncio.create_task(self._fetch(start, view), name="Stream Read Ahead")
+
+    async def read(self, count=DEFAULT_CHUNK_SIZE) -> memoryview:
+        await self._finishPrefetch()
+        self._trim()
+        start = self._filled_start + self._filled_length
+        if self._filled_length < count and start < self.size():
+            # Get the rest of the chunk from the stream, making sure it ends up contiguous with what was read ahead.
+            self._moveFilledTo(self._spare(count))
+            self._filled_length += await self._fetch(start, memoryview(self._filled)[self._filled_length:count])
+        if self._filled is None:
+            return memoryview(b'')
+        length = min(count, self._filled_length)
+        ret = memoryview(self._filled)[self._filled_offset:self._filled_offset + length]
+        self._handed_out = self._filled
+        self._filled_offset += length
+        self._filled_length -= length
+        self._position += length
+        self._filled_start = self._position
+        return ret
+
+    async def close(self):
+        """
+        Waits for any in-flight read to finish, gives buffers back to the pool, and leaves the wrapped stream at this
+        stream's position.  The background read isn't cancelled because that would force the wrapped stream to make
+        a new request.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._prefetch is not None:
+            try:
+                await self._prefetch
+            except Exception as e:
+                logger.debug("Discarding a failed read-ahead: " + str(e))
+            self._prefetch = None
+        # A cancelled read() could have left the wrapped stream still writing into one of the buffers
+        await self._stream.settle()
+        for buffer in self._buffers:
+            self._pool.release(buffer)
+        self._buffers = []
+        self._filled = None
+        self._handed_out = None
+        self._filled_length = 0
+        self._stream.position(self._position)
+
+    async def _fetch(self, start: int, view: memoryview) -> int:
+        self._stream.position(start)
+        return await self._stream.readinto(view)
+
+    async def _finishPrefetch(self):
+        if self._prefetch is None:
+            return
+        task = self._prefetch
+        self._prefetch = None
+        self._filled_length += await task
+
+    def _trim(self):
+        end = self._filled_start + self._filled_length
+        if self._position < self._filled_start or self._position > end:
+            # The position moved somewhere that wasn't read ahead, so those bytes are useless
+            self._filled_offset = 0
+            self._filled_length = 0
+        else:
+            self._filled_offset += self._position - self._filled_start
+            self._filled_length -= self._position - self._filled_start
+        self._filled_start = self._position
+
+    def _spare(self, size: int) -> bytearray:
+        """Finds a buffer of at least 'size' bytes that isn't backing a view the caller might still be using"""
+        for buffer in self._buffers:
+            if buffer is not self._handed_out and len(buffer) >= size:
+                return buffer
+        buffer = self._pool.acquire(max(size, self._buffer_size))
+        self._buffers.append(buffer)
+        return buffer
+
+    def _moveFilledTo(self, target: bytearray):
+        """Moves the bytes that were read ahead to the start of target, then gives back any buffer that isn't needed"""
+        if self._filled is not None and self._filled_length > 0 and (self._filled is not target or self._filled_offset > 0):
+            memoryview(target)[0:self._filled_length] = memoryview(self._filled)[self._filled_offset:self._filled_offset + self._filled_length]
+        self._filled = target
+        self._filled_offset = 0
+        for buffer in list(self._buffers):
+            if buffer is not self._filled and buffer is not self._handed_out:
+                self._buffers.remove(buffer)
+                self._pool.release(buffer)
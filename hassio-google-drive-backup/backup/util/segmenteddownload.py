@@ -0,0 +1,177 @@
+import asyncio
+from typing import Dict
+
+from aiohttp.client import ClientResponseError, ClientPayloadError, ClientOSError
+from asyncio.exceptions import TimeoutError
+
+from .asynchttpgetter import AsyncHttpGetter, Stupid, CONTENT_LENGTH_ERROR, POSITION_ERROR_MESSAGE, DEFAULT_CHUNK_SIZE
+from .backoff import Backoff
+from ..exceptions import LogicError
+from ..logger import getLogger
+from ..time import Time
+
+logger = getLogger(__name__)
+
+DEFAULT_CONNECTIONS = 4
+DEFAULT_SEGMENT_SIZE = 4 * 1024 * 1024
+
+# How many times a segment gets requested before its download is considered failed.  Each retry picks up from the
+# last byte received, so a connection that drops partway through doesn't lose what it already got.
+SEGMENT_ATTEMPTS = 5
+SEGMENT_BACKOFF_BASE = 2
+RANGE_IGNORED_ERROR = "Server ignored a request for a byte range"
+
+
+class Segment:
+    """One byte range of the file, [start, end), and the bytes of it that have been received so far"""
+
+    def __init__(self, start: int, end: int):
+        self.start = start
+        self.end = end
+        self.buffer = bytearray(end - start)
+        self.received = 0
+        self.task: asyncio.Task = None
+
+        # Set whenever more bytes arrive or the download stops, so a reader waiting on this segment wakes up
+        self.changed = asyncio.Event()
+
+    def done(self) -> bool:
+        return self.received >= len(self.buffer)
+
+
+class SegmentedDownload(AsyncHttpGetter):
+    """
+    Reads a file of known size over HTTP like AsyncHttpGetter, but splits it into byte ranges that get downloaded
+    concurrently on their own connections.  Google Drive throttles each connection well below what most links can
+    handle, so this is much faster for big files.
+
+    At most 'connections' segments of 'segment_size' bytes are held at once, starting with the one at the current
+    position, and a segment is dropped as soon as reading moves past it, so memory use is bounded no matter how big
+    the file is.  Each segment is retried on its own with a Backoff, resuming with a Range request from the last byte
+    it received.  Bytes come back in order and can be read from a segment before the rest of it has arrived.
+    """
+
+    def __init__(self, url, headers: Dict[str, str], session, size: int, connections: int = DEFAULT_CONNECTIONS,
+                 segment_size: int = DEFAULT_SEGMENT_SIZE, timeout=None, timeoutFactory=None, otherErrorFactory=None,
+                 time: Time = None):
+        super().__init__(url, headers, session, size=size, timeout=timeout, timeoutFactory=timeoutFactory,
+                         otherErrorFactory=otherErrorFactory, time=time)
+        self._connections = max(1, connections)
+        self._segment_size = max(1, segment_size)
+        self._segments: Dict[int, Segment] = {}
+        self._setup = False
+
+    async def setup(self):
+        if not self._position == 0:
+            raise LogicError(POSITION_ERROR_MESSAGE)
+        if self._size is None:
+            raise LogicError(CONTENT_LENGTH_ERROR)
+        self._setup = True
+        self._fill(0)
+        self._history.append([self._time.now(), 0])
+        return self._size
+
+    def _ensureSetup(self):
+        if not self._setup:
+            raise LogicError("AsyncHttpGetter.setup() must be called first")
+
+    async def read(self, count=DEFAULT_CHUNK_SIZE):
+        self._ensureSetup()
+        return await Stupid.fill(self.readinto, min(count, max(0, self.size() - self._position)))
+
+    async def readinto(self, buffer: memoryview) -> int:
+        self._ensureSetup()
+        received = 0
+        while received < len(buffer) and self._position < self.size():
+            segment = await self._waitForSegment(self._position)
+            offset = self._position - segment.start
+            count = min(len(buffer) - received, segment.received - offset)
+            buffer[received:received + count] = memoryview(segment.buffer)[offset:offset + count]
+            received += count
+            self._position += count
+        self._history.append([self._time.now(), self._position])
+        if len(self._history) > 50:
+            self._history.popleft()
+        return received
+
+    async def __aexit__(self, type, value, traceback):
+        self.close()
+
+    def close(self):
+        for index in list(self._segments.keys()):
+            self._drop(index)
+
+    async def _waitForSegment(self, position: int) -> Segment:
+        """Returns the segment holding 'position' once at least the byte at 'position' has been downloaded"""
+        index = position // self._segment_size
+        self._fill(index)
+        segment = self._segments[index]
+        while segment.received <= position - segment.start:
+            if segment.task.done():
+                # Raises whatever made the download give up
+                segment.task.result()
+                raise LogicError("Segment download finished without receiving all of its bytes")
+            segment.changed.clear()
+            await segment.changed.wait()
+        return segment
+
+    def _fill(self, first: int):
+        """Drops segments outside of the window starting at segment 'first', then starts downloading the missing ones"""
+        last = min(first + self._connections, (self.size() + self._segment_size - 1) // self._segment_size)
+        for index in list(self._segments.keys()):
+            if index < first or index >= last:
+                self._drop(index)
+        for index in range(first, last):
+            if index not in self._segments:
+                segment = Segment(index * self._segment_size, min(self.size(), (index + 1) * self._segment_size))
+                segment.task = asyncio.create_task(self._download(segment), name="Segmented Download")
+                self._segments[index] = segment
+
+    def _drop(self, index: int):
+        segment = self._segments.pop(index)
+        if not segment.task.done():
+            segment.task.cancel()
+        elif not segment.task.cancelled():
+            # Mark any error as retrieved, since nobody is going to read this segment now.
+            segment.task.exception()
+
+    async def _download(self, segment: Segment):
+        backoff = Backoff(base=SEGMENT_BACKOFF_BASE, attempts=SEGMENT_ATTEMPTS - 1)
+        try:
+            while not segment.done():
+                try:
+                    await self._downloadFrom(segment)
+                except ClientResponseError as e:
+                    if e.status < 500 and e.status != 429:
+                        raise
+                    await self._retry(segment, backoff, e)
+                except (TimeoutError, ClientPayloadError, ClientOSError) as e:
+                    await self._retry(segment, backoff, e)
+        finally:
+            segment.changed.set()
+
+    async def _downloadFrom(self, segment: Segment):
+        headers = self._headers.copy()
+        headers['range'] = "bytes={0}-{1}".format(segment.start + segment.received, segment.end - 1)
+        async with self._session.get(self._url, headers=headers, timeout=self.timeout) as resp:
+            resp.raise_for_status()
+            if resp.status != 206 and (segment.start + segment.received > 0 or segment.end < self.size()):
+                raise LogicError(RANGE_IGNORED_ERROR)
+            while not segment.done():
+                data = await resp.content.read(len(segment.buffer) - segment.received)
+                if len(data) == 0:
+                    raise ClientPayloadError("Response ended before the expected number of bytes were received")
+                segment.buffer[segment.received:segment.received + len(data)] = data
+                segment.received += len(data)
+                segment.changed.set()
+
+    async def _retry(self, segment: Segment, backoff: Backoff, error: Exception):
+        if isinstance(error, TimeoutError) and self.timeoutFactory is not None:
+            error = self.timeoutFactory()
+        elif not isinstance(error, (TimeoutError, ClientResponseError)) and self.otherErrorFactory is not None:
+            error = self.otherErrorFactory()
+        wait = backoff.backoff(error)
+        self.reconnects += 1
+        logger.debug("Retrying bytes {0}-{1} in {2} seconds after an error: {3}".format(
+            segment.start + segment.received, segment.end - 1, wait, str(error)))
+        await self._time.sleepAsync(wait)
@@ -56,6 +56,7 @@ class Watcher(Trigger, FileSystemEventHandler, Startable):
             return
         logger.trace("Backup directory modified: %s %s", event.event_type, event.src_path)
         with self.lock:
+            first_change = not self._changes_have_happened
             self._last_change_time = self.time.now()
             self._changes_have_happened = True
 
@@ -68,6 +69,16 @@ class Watcher(Trigger, FileSystemEventHandler, Startable):
                 self._last_log_time = self.time.now()
             if not self.noticed_change_signal.is_set():
                 self._loop.call_soon_threadsafe(self.noticed_change_signal.set)
+            if first_change:
+                # Let the sync worker know it has a new deadline to wait for.  Later changes only push that deadline
+                # back, so they don't need to wake it.
+                self._loop.call_soon_threadsafe(self.reschedule)
+
+    def nextCheck(self):
+        with self.lock:
+            if not self._changes_have_happened or not self._last_change_time:
+                return None
+            return self._last_change_time + CHANGES_CHECK_DELAY
 
     async def check(self):
         if not self._changes_have_happened:
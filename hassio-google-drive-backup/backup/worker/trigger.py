@@ -1,14 +1,37 @@
+import asyncio
+from datetime import datetime
+from typing import List, Optional
+
 from ..logger import getLogger
 
 logger = getLogger(__name__)
 
 
 class Trigger():
+    """
+    Something that can ask for a sync.  trigger() asks for one right away by waking anything listening to it (ie the
+    Scyncer), and nextCheck() tells listeners when to call check() again if nothing triggers before then, so they can
+    sleep until there is actually something to do instead of polling.
+    """
     def __init__(self):
         self._triggered = False
+        self._listeners: List[asyncio.Event] = []
 
     def trigger(self) -> None:
         self._triggered = True
+        self.reschedule()
+
+    def reschedule(self) -> None:
+        """Wakes listeners so they call check() and nextCheck() again, eg because the next deadline moved"""
+        for listener in self._listeners:
+            listener.set()
+
+    def addListener(self, listener: asyncio.Event) -> None:
+        self._listeners.append(listener)
+
+    def removeListener(self, listener: asyncio.Event) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
 
     def reset(self) -> None:
         self._triggered = False
@@ -19,6 +42,10 @@ class Trigger():
     def name(self):
         return "Unnamed Trigger"
 
+    def nextCheck(self) -> Optional[datetime]:
+        """The next time check() could return True without trigger() being called, or None if there isn't one"""
+        return None
+
     async def check(self) -> bool:
         if self.triggered():
             self.reset()
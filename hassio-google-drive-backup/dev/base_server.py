@@ -1,8 +1,10 @@
 import random
 import re
-import io
+from aiohttp.payload import Payload
 from aiohttp.web import HTTPBadRequest, Request, Response
-from typing import Any
+from typing import Any, Union
+
+from backup.drive.driverequests import ViewPayload
 
 rangePattern = re.compile("bytes=\\d+-\\d+")
 bytesPattern = re.compile("^bytes \\d+-\\d+/\\d+$")
@@ -18,7 +20,7 @@ class BaseServer:
     def timeToRfc3339String(self, time) -> str:
         return time.strftime("%Y-%m-%dT%H:%M:%SZ")
 
-    def serve_bytes(self, request: Request, bytes: bytearray, include_length: bool = True) -> Any:
+    def serve_bytes(self, request: Request, bytes: Union[bytearray, Payload], include_length: bool = True) -> Any:
         if "Range" in request.headers:
             # Do range request
             if not rangePattern.match(request.headers['Range']):
@@ -41,7 +43,13 @@ class BaseServer:
                 resp.headers["Content-length"] = str(len(bytes))
             return resp
         else:
-            resp = Response(body=io.BytesIO(bytes))
+            if isinstance(bytes, Payload):
+                # Already knows how to send itself, eg a backup the benchmarks generate as it's sent
+                body = bytes
+            else:
+                # Sent a slice at a time from a view, since BytesIO would copy the whole file on every download
+                body = ViewPayload(memoryview(bytes))
+            resp = Response(body=body)
             resp.headers["Content-length"] = str(len(bytes))
             return resp
 
@@ -0,0 +1,119 @@
+"""
+Runs the add-on's benchmarks and writes their results as JSON, eg:
+
+    python -m dev.benchmark sync --counts 10,100,1000 --sizes 1MB,100MB --latency 0,0.05 --output results.json
+    python -m dev.benchmark sync --counts 10,100 --compare results.json
+    python -m dev.benchmark retention --months 12,120 --days 1,0.1 --output retention.json
+    python -m dev.benchmark backups --counts 10000 --output backups.json
+
+Every case runs in a fresh process.  With --compare, each result is also printed next to the result for the same case
+in an earlier results file.
+"""
+import argparse
+import itertools
+import json
+import logging
+import re
+
+from backup.logger import CONSOLE
+
+from .harness import compare, describe, runIsolated, writeResults
+from . import backups, retention, sync
+
+SIZE_PATTERN = re.compile("^([0-9.]+) *([KMG]?)B?$", re.IGNORECASE)
+SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024 * 1024, 'G': 1024 * 1024 * 1024}
+
+SYNC_METRICS = ["initial.seconds", "initial.bytes_per_second", "steady.seconds", "peak_rss_bytes", "initial.loop_lag.max_ms"]
+RETENTION_METRICS = ["seconds", "backups_per_second", "peak_rss_bytes"]
+BACKUPS_METRICS = ["bytes_per_backup", "ns_per_call_mean", "sort_seconds"]
+
+
+def parseSize(value: str) -> int:
+    match = SIZE_PATTERN.match(value.strip())
+    if not match:
+        raise argparse.ArgumentTypeError("'{0}' isn't a size like 500KB, 10MB or 1GB".format(value))
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).upper()])
+
+
+def listOf(parse):
+    return lambda value: [parse(item) for item in value.split(",")]
+
+
+def runSync(args):
+    results = []
+    for count, size, latency, bandwidth in itertools.product(args.counts, args.sizes, args.latency, args.bandwidth):
+        case = {'count': count, 'size': size, 'latency': latency, 'bandwidth': bandwidth}
+        print("Running " + describe(case))
+        result = runIsolated(sync.runCase, case)
+        print("  initial sync {0:.2f}s ({1:.1f} MB/s), steady sync {2:.2f}s, peak RSS {3:.0f} MB".format(
+            result['initial']['seconds'], result['initial']['bytes_per_second'] / 1024 / 1024, result['steady']['seconds'],
+            result['peak_rss_bytes'] / 1024 / 1024))
+        results.append(result)
+    return results, SYNC_METRICS
+
+
+def runRetention(args):
+    results = []
+    for months, days, generational, existing in itertools.product(args.months, args.days, args.generational, args.existing):
+        case = {'months': months, 'days': days, 'generational': generational, 'existing': existing}
+        print("Running " + describe(case))
+        result = runIsolated(retention.runCase, case)
+        print("  {0} backups in {1:.2f}s ({2:.0f}/s), peak RSS {3:.0f} MB".format(
+            result['created'], result['seconds'], result['backups_per_second'], result['peak_rss_bytes'] / 1024 / 1024))
+        results.append(result)
+    return results, RETENTION_METRICS
+
+
+def runBackups(args):
+    results = []
+    for count in args.counts:
+        case = {'count': count}
+        print("Running " + describe(case))
+        result = runIsolated(backups.runCase, case)
+        print("  {0:.0f} bytes per backup, {1:.0f}ns per accessor call, sorted in {2:.3f}s".format(
+            result['bytes_per_backup'], result['ns_per_call_mean'], result['sort_seconds']))
+        results.append(result)
+    return results, BACKUPS_METRICS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the add-on against the simulation server")
+    parser.add_argument("--output", help="Where to write the results as JSON")
+    parser.add_argument("--compare", help="An earlier results file to compare against")
+    parser.add_argument("--verbose", action="store_true", help="Show the add-on's log output")
+    suites = parser.add_subparsers(dest="suite", required=True)
+
+    sync_parser = suites.add_parser("sync", help="Sync backups from the simulated supervisor to the simulated Google Drive")
+    sync_parser.add_argument("--counts", type=listOf(int), default=[10, 100], help="Numbers of backups, eg 10,100,5000")
+    sync_parser.add_argument("--sizes", type=listOf(parseSize), default=[1024 * 1024], help="Backup sizes, eg 1MB,100MB,1GB")
+    sync_parser.add_argument("--latency", type=listOf(float), default=[0], help="Seconds added to every request, eg 0,0.05")
+    sync_parser.add_argument("--bandwidth", type=listOf(parseSize), default=[0],
+                             help="The add-on's upload limit setting in bytes per second, 0 for none, eg 0,10MB.  The simulated network isn't throttled")
+    sync_parser.set_defaults(run=runSync)
+
+    retention_parser = suites.add_parser("retention", help="Preview retention settings with the RetentionSimulator")
+    retention_parser.add_argument("--months", type=listOf(int), default=[12, 120], help="Months to simulate, eg 12,120")
+    retention_parser.add_argument("--days", type=listOf(float), default=[1, 0.1], help="Days between backups, eg 1,0.1")
+    retention_parser.add_argument("--generational", type=listOf(lambda value: value.lower() == "true"), default=[False, True],
+                                  help="Whether generational backups are on, eg false,true")
+    retention_parser.add_argument("--existing", type=listOf(int), default=[100], help="Backups that exist before the simulation, eg 0,1000")
+    retention_parser.set_defaults(run=runRetention)
+
+    backups_parser = suites.add_parser("backups", help="Measure the memory and accessor cost of the backup model")
+    backups_parser.add_argument("--counts", type=listOf(int), default=[10000], help="Numbers of backups, eg 1000,10000")
+    backups_parser.set_defaults(run=runBackups)
+
+    args = parser.parse_args()
+    if not args.verbose:
+        CONSOLE.setLevel(logging.WARNING)
+    results, metrics = args.run(args)
+    if args.output:
+        writeResults(args.output, args.suite, results)
+    else:
+        print(json.dumps(results, indent=2))
+    if args.compare:
+        compare(args.compare, results, metrics)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Backup model micro-benchmark.  Each case builds 'count' backups that are both in Home Assistant and Google Drive, then
+reports how much memory the Backup objects take on top of the data they were parsed from, how long the accessors that
+sorting, purging and building the status page lean on take per call, and how long sorting all of them by date takes.
+"""
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List
+
+from backup.config import Config, Setting
+from backup.const import NECESSARY_PROP_KEY_DATE, NECESSARY_PROP_KEY_NAME, NECESSARY_PROP_KEY_SLUG
+from backup.model import Backup, DriveBackup, HABackup
+from backup.time import Time
+from backup.util import DataCache
+from .harness import peakRssBytes
+
+# How many times each accessor gets called on every backup
+CALL_ROUNDS = 5
+
+ACCESSORS: Dict[str, Callable[[Backup], Any]] = {
+    'name': Backup.name,
+    'slug': Backup.slug,
+    'date': Backup.date,
+    'size': Backup.size,
+    'version': Backup.version,
+    'ignore': Backup.ignore,
+    'note': Backup.note,
+    'isPending': Backup.isPending,
+}
+
+
+def haData(index: int, date: datetime) -> Dict[str, Any]:
+    return {
+        'name': "Full Backup {0}".format(index),
+        'slug': "slug{0}".format(index),
+        'date': date.isoformat(),
+        'size': 100.5,
+        'type': "full",
+        'homeassistant': "2023.1.1",
+        'protected': False,
+        'addons': [{'slug': "addon{0}".format(addon)} for addon in range(3)],
+        'folders': ["share", "ssl"],
+    }
+
+
+def driveData(index: int, date: datetime) -> Dict[str, Any]:
+    return {
+        'name': "Full Backup {0}.tar".format(index),
+        'id': "id{0}".format(index),
+        'size': str(100 * 1024 * 1024),
+        'appProperties': {
+            NECESSARY_PROP_KEY_SLUG: "slug{0}".format(index),
+            NECESSARY_PROP_KEY_DATE: date.isoformat(),
+            NECESSARY_PROP_KEY_NAME: "Full Backup {0}".format(index),
+            'type': "full",
+            'version': "2023.1.1",
+            'protected': "false",
+        },
+        'capabilities': {'canDelete': True},
+    }
+
+
+def runCase(case: Dict[str, Any]) -> Dict[str, Any]:
+    config = Config.withOverrides({Setting.DATA_CACHE_FILE_PATH: os.path.join(tempfile.mkdtemp(), "data_cache.json")})
+    data_cache = DataCache(config, Time())
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    raw = [(haData(index, start + timedelta(hours=index)), driveData(index, start + timedelta(hours=index))) for index in range(case['count'])]
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    backups: List[Backup] = []
+    for ha, drive in raw:
+        backup = Backup(HABackup(ha, data_cache, config))
+        backup.addSource(DriveBackup(drive))
+        backups.append(backup)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    calls = {}
+    for name, accessor in ACCESSORS.items():
+        begin = time.perf_counter()
+        for _ in range(CALL_ROUNDS):
+            for backup in backups:
+                accessor(backup)
+        calls[name] = (time.perf_counter() - begin) * 1e9 / (CALL_ROUNDS * len(backups))
+
+    # Shuffle deterministically so every run sorts the same thing
+    shuffled = backups[1::2] + backups[::2]
+    begin = time.perf_counter()
+    shuffled.sort(key=Backup.date)
+    sort_seconds = time.perf_counter() - begin
+
+    return {
+        'case': case,
+        'bytes_per_backup': used / len(backups),
+        'ns_per_call': calls,
+        'ns_per_call_mean': sum(calls.values()) / len(calls),
+        'sort_seconds': sort_seconds,
+        'peak_rss_bytes': peakRssBytes(),
+    }
@@ -0,0 +1,172 @@
+import asyncio
+import inspect
+import json
+import multiprocessing
+import platform
+import resource
+import time
+import traceback
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from backup.config import VERSION
+
+# How often the event loop lag monitor checks in
+LAG_INTERVAL_SECONDS = 0.01
+
+
+class LoopLagMonitor():
+    """
+    Measures how late the event loop runs a task that asks to wake up every LAG_INTERVAL_SECONDS, which is how long
+    anything else waiting on the loop (eg a request to the web UI) would have been held up.
+    """
+
+    def __init__(self):
+        self._lags: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._monitor(), name="Loop Lag Monitor")
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    def stats(self) -> Dict[str, float]:
+        if len(self._lags) == 0:
+            return {'max_ms': 0, 'mean_ms': 0, 'p99_ms': 0}
+        ordered = sorted(self._lags)
+        return {
+            'max_ms': ordered[-1] * 1000,
+            'mean_ms': sum(ordered) / len(ordered) * 1000,
+            'p99_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000,
+        }
+
+    async def _monitor(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(LAG_INTERVAL_SECONDS)
+            self._lags.append(max(0, time.perf_counter() - start - LAG_INTERVAL_SECONDS))
+
+
+class Timings():
+    """Totals up how long, and how many times, named pieces of code ran"""
+
+    def __init__(self):
+        self.totals: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self._wrapped: List[Tuple[Any, str]] = []
+
+    @contextmanager
+    def measure(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.totals[name] = self.totals.get(name, 0) + time.perf_counter() - start
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def wrap(self, target: Any, method: str, name: str):
+        """
+        Replaces the async 'method' of the object 'target' with one that records its timing under 'name'.  For async
+        generators this is the time from the first call until the generator finishes.
+        """
+        original = getattr(target, method)
+
+        async def timed(*args, **kwargs):
+            with self.measure(name):
+                return await original(*args, **kwargs)
+
+        async def timedGenerator(*args, **kwargs):
+            with self.measure(name):
+                async for item in original(*args, **kwargs):
+                    yield item
+        setattr(target, method, timedGenerator if inspect.isasyncgenfunction(original) else timed)
+        self._wrapped.append((target, method))
+
+    def restore(self):
+        """Puts back the methods replaced by wrap()"""
+        for target, method in self._wrapped:
+            delattr(target, method)
+        self._wrapped = []
+
+    def results(self) -> Dict[str, Dict[str, float]]:
+        return {name: {'seconds': self.totals[name], 'calls': self.counts[name]} for name in self.totals}
+
+
+def peakRssBytes() -> int:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if platform.system() == "Darwin" else peak * 1024
+
+
+def runIsolated(function: Callable[..., Dict[str, Any]], *args) -> Dict[str, Any]:
+    """Runs 'function' in a fresh process, so peak memory use measured in it belongs to that run alone"""
+    context = multiprocessing.get_context("fork")
+    receive, send = context.Pipe(duplex=False)
+    process = context.Process(target=_runAndSend, args=(send, function, args))
+    process.start()
+    send.close()
+    try:
+        succeeded, result = receive.recv()
+    except EOFError:
+        succeeded, result = False, "Benchmark process died"
+    process.join()
+    if not succeeded:
+        raise Exception(result)
+    return result
+
+
+def _runAndSend(send, function: Callable[..., Dict[str, Any]], args):
+    try:
+        send.send((True, function(*args)))
+    except Exception:
+        send.send((False, traceback.format_exc()))
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        'version': VERSION,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'system': platform.system(),
+        'cpus': multiprocessing.cpu_count(),
+    }
+
+
+def writeResults(path: str, suite: str, results: List[Dict[str, Any]]):
+    with open(path, "w") as f:
+        json.dump({'suite': suite, 'environment': environment(), 'results': results}, f, indent=2)
+
+
+def compare(baseline_path: str, results: List[Dict[str, Any]], metrics: List[str]):
+    """Prints how each of 'metrics' changed relative to the results with the same case in an earlier results file"""
+    with open(baseline_path) as f:
+        baseline = {json.dumps(result['case'], sort_keys=True): result for result in json.load(f)['results']}
+    for result in results:
+        before = baseline.get(json.dumps(result['case'], sort_keys=True))
+        if before is None:
+            continue
+        changes = []
+        for metric in metrics:
+            old = lookup(before, metric)
+            new = lookup(result, metric)
+            if old and new is not None:
+                changes.append("{0} {1:+.1f}%".format(metric, (new - old) / old * 100))
+        print("{0}: {1}".format(describe(result['case']), ", ".join(changes)))
+
+
+def lookup(result: Dict[str, Any], path: str):
+    value: Any = result
+    for key in path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def describe(case: Dict[str, Any]) -> str:
+    return " ".join("{0}={1}".format(key, value) for key, value in case.items())
@@ -0,0 +1,317 @@
+"""
+End to end sync benchmark.  Each case starts the simulated supervisor and Google Drive in their own process, loaded
+with 'count' backups of 'size' bytes, then runs the add-on's Coordinator against them twice: first a sync that uploads
+every backup to Drive, then a steady-state sync where there's nothing left to do.  Both report wall time, upload
+throughput, event loop lag, requests made to each service and the time spent in Model.sync, HaSource.get,
+DriveSource.get and DriveRequests.create.  Peak RSS covers the add-on's process alone.  'bandwidth' only sets the
+add-on's upload_limit_bytes_per_second, the connection to the simulation server itself isn't throttled.
+"""
+import asyncio
+import io
+import json
+import multiprocessing
+import os
+import socket
+import tarfile
+import tempfile
+import time
+from datetime import timedelta
+from typing import Any, Dict, List
+
+from aiohttp.payload import Payload
+from aiohttp.web import AppRunner, Request, TCPSite, get, json_response
+from injector import Injector, Module, provider, singleton
+from yarl import URL
+
+from backup.config import Config, Setting
+from backup.creds import Creds
+from backup.drive import DriveRequests, DriveSource
+from backup.ha import HaSource
+from backup.model import Coordinator, Model
+from backup.module import BaseModule
+from backup.time import Time
+from backup.util import GlobalInfo
+from dev.ports import Ports
+from dev.request_interceptor import RequestInterceptor
+from dev.simulated_google import SimulatedGoogle, URL_MATCH_DRIVE_API
+from dev.simulated_supervisor import SimulatedSupervisor
+from dev.simulationserver import SimulationServer
+from .harness import LoopLagMonitor, Timings, peakRssBytes
+
+CLIENT_ID = "test_client_id"
+CLIENT_SECRET = "test_client_secret"
+STARTUP_SECONDS = 60
+
+# Padding for generated backups, a prime length so it doesn't line up with chunk boundaries
+PATTERN = bytes(x % 251 for x in range(4099))
+
+# How much of a generated backup gets sent at a time
+SEND_SLICE_BYTES = 64 * 1024
+REPEATED_PATTERN = PATTERN * (SEND_SLICE_BYTES // len(PATTERN) + 2)
+
+
+class PatternBackup(Payload):
+    """
+    A backup's tar file holding backup.json and 'size' bytes of PATTERN, generated as it gets sent.  Big backups never
+    sit in memory, so the simulation server's memory doesn't get in the way of the add-on's.  Supports len() and
+    slicing like bytes so the simulated supervisor can serve it, ranges included.
+    """
+
+    def __init__(self, size: int):
+        super().__init__(None, content_type="application/tar")
+        stream = io.BytesIO()
+        with tarfile.open(fileobj=stream, mode="w") as tar:
+            info = json.dumps({'slug': "benchmark", 'name': "Benchmark"}).encode()
+            member = tarfile.TarInfo("backup.json")
+            member.size = len(info)
+            tar.addfile(member, io.BytesIO(info))
+            member = tarfile.TarInfo("padding.dat")
+            member.size = size
+            self._head = stream.getvalue() + member.tobuf(tar.format, tar.encoding, tar.errors)
+        self._pattern_size = size
+
+        # The padding gets rounded up to a whole block, then the archive ends with two empty blocks and gets rounded up
+        # to a whole record, same as TarFile.close()
+        end = len(self._head) + size + (-size % tarfile.BLOCKSIZE) + 2 * tarfile.BLOCKSIZE
+        self._size = end + (-end % tarfile.RECORDSIZE)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, key: slice) -> bytes:
+        start, stop, _ = key.indices(self._size)
+        return b''.join(self._slices(start, stop))
+
+    def _slices(self, start: int, stop: int):
+        while start < stop:
+            data = self._read(start, min(SEND_SLICE_BYTES, stop - start))
+            yield data
+            start += len(data)
+
+    def _read(self, offset: int, count: int) -> bytes:
+        """Generates up to 'count' bytes of the file starting at offset, stopping early at the end of the header or pattern"""
+        if offset < len(self._head):
+            return self._head[offset:offset + count]
+        offset -= len(self._head)
+        if offset >= self._pattern_size:
+            # The tar's padding and end blocks are all zeros
+            return bytes(count)
+        count = min(count, self._pattern_size - offset)
+        start = offset % len(PATTERN)
+        return REPEATED_PATTERN[start:start + count]
+
+    def decode(self, encoding: str = "utf-8", errors: str = "strict") -> str:
+        return self[:].decode(encoding, errors)
+
+    async def write(self, writer):
+        for data in self._slices(0, self._size):
+            await writer.write(data)
+
+
+def freePorts(count: int) -> List[int]:
+    sockets = []
+    for _ in range(count):
+        s = socket.socket()
+        s.bind(("localhost", 0))
+        sockets.append(s)
+    ports = [s.getsockname()[1] for s in sockets]
+    for s in sockets:
+        s.close()
+    return ports
+
+
+def makeConfig(case: Dict[str, Any], ports: Ports, workdir: str) -> Config:
+    server_url = URL("http://localhost").with_port(ports.server)
+    return Config.withOverrides({
+        Setting.DRIVE_URL: str(server_url),
+        Setting.SUPERVISOR_URL: str(server_url) + "/",
+        Setting.AUTHORIZATION_HOST: str(server_url),
+        Setting.TOKEN_SERVER_HOSTS: str(server_url),
+        Setting.DRIVE_REFRESH_URL: str(server_url.with_path("/oauth2/v4/token")),
+        Setting.DRIVE_AUTHORIZE_URL: str(server_url.with_path("/o/oauth2/v2/auth")),
+        Setting.DRIVE_TOKEN_URL: str(server_url.with_path("/token")),
+        Setting.DRIVE_DEVICE_CODE_URL: str(server_url.with_path("/device/code")),
+        Setting.SUPERVISOR_TOKEN: "test_header",
+        Setting.SECRETS_FILE_PATH: os.path.join(workdir, "secrets.yaml"),
+        Setting.CREDENTIALS_FILE_PATH: os.path.join(workdir, "credentials.dat"),
+        Setting.FOLDER_FILE_PATH: os.path.join(workdir, "folder.dat"),
+        Setting.RETAINED_FILE_PATH: os.path.join(workdir, "retained.json"),
+        Setting.ID_FILE_PATH: os.path.join(workdir, "id.json"),
+        Setting.DATA_CACHE_FILE_PATH: os.path.join(workdir, "data_cache.json"),
+        Setting.STOP_ADDON_STATE_PATH: os.path.join(workdir, "stop_addon.json"),
+        Setting.INGRESS_TOKEN_FILE_PATH: os.path.join(workdir, "ingress.dat"),
+        Setting.BACKUP_DIRECTORY_PATH: os.path.join(workdir, "backups"),
+        Setting.DEFAULT_DRIVE_CLIENT_ID: CLIENT_ID,
+        Setting.DEFAULT_DRIVE_CLIENT_SECRET: CLIENT_SECRET,
+        Setting.PORT: ports.ui,
+        Setting.INGRESS_PORT: ports.ingress,
+        Setting.BACKUP_STARTUP_DELAY_MINUTES: 0,
+        Setting.MAX_BACKUPS_IN_HA: case['count'],
+        Setting.MAX_BACKUPS_IN_FILENIO: case['count'],
+        # Only sync what's there, never create a new backup
+        Setting.DAYS_BETWEEN_BACKUPS: 0,
+        # This is the add-on's own upload limit, the simulated network itself is never throttled
+        Setting.UPLOAD_LIMIT_BYTES_PER_SECOND: case.get('bandwidth', 0),
+    })
+
+
+class BenchmarkModule(Module):
+    def __init__(self, config: Config, ports: Ports):
+        self._config = config
+        self._ports = ports
+
+    @provider
+    @singleton
+    def getConfig(self) -> Config:
+        return self._config
+
+    @provider
+    @singleton
+    def getPorts(self) -> Ports:
+        return self._ports
+
+    @provider
+    @singleton
+    def getDriveCreds(self, time: Time) -> Creds:
+        return Creds(time, CLIENT_ID, time.now(), "test_access_token", "test_refresh_token", CLIENT_SECRET)
+
+
+def requestCategory(path: str) -> str:
+    if path.startswith("/upload/"):
+        return "drive_upload"
+    if path.startswith("/drive/v3") or path.startswith("/batch/"):
+        return "drive"
+    if path.startswith("/oauth2") or path.startswith("/drive/refresh") or path in ["/token", "/device/code"]:
+        return "auth"
+    return "supervisor"
+
+
+def serveSimulation(case: Dict[str, Any], ports: Ports, workdir: str, ready):
+    async def serve():
+        injector = Injector([BaseModule(), BenchmarkModule(makeConfig(case, ports, workdir), ports)])
+        server = injector.get(SimulationServer)
+        google = injector.get(SimulatedGoogle)
+        google.keep_bytes = False
+        google.setDriveSpaceAvailable(case['count'] * (case['size'] + 1024 * 1024) * 2)
+        supervisor = injector.get(SimulatedSupervisor)
+        time = injector.get(Time)
+
+        # Every backup shares the same generated tar, only their info differs
+        data = PatternBackup(case['size'])
+        for index in range(case['count']):
+            date = time.now() - timedelta(days=index + 1)
+            supervisor.insertBackup({
+                'slug': "bench{0:06d}".format(index),
+                'name': date.strftime("Full Backup %Y-%m-%d"),
+                'date': date.isoformat(),
+                'type': "full",
+                'protected': False,
+                'homeassistant': "0.92.2",
+                'folders': [],
+                'addons': [],
+                'repositories': [],
+                'size': round(len(data) / 1024.0 / 1024.0, 2),
+                'version': 'dev',
+            }, data)
+
+        if case.get('latency', 0) > 0:
+            supervisor.setLatency(case['latency'])
+            injector.get(RequestInterceptor).setSleep(URL_MATCH_DRIVE_API, sleep=case['latency'])
+
+        async def requests(request: Request):
+            counts: Dict[str, int] = {}
+            for url in server.urls:
+                category = requestCategory(URL(url).path)
+                counts[category] = counts.get(category, 0) + 1
+            return json_response(counts)
+
+        app = server.createApp()
+        app.router.add_routes([get("/benchmark/requests", requests)])
+        runner = AppRunner(app)
+        await runner.setup()
+        await TCPSite(runner, "localhost", ports.server).start()
+        ready.set()
+        await asyncio.Event().wait()
+    asyncio.run(serve())
+
+
+async def requestCounts(session, ports: Ports) -> Dict[str, int]:
+    async with session.get(URL("http://localhost").with_port(ports.server).with_path("/benchmark/requests")) as resp:
+        resp.raise_for_status()
+        return await resp.json()
+
+
+async def runPhase(injector: Injector, ports: Ports) -> Dict[str, Any]:
+    coord = injector.get(Coordinator)
+    model = injector.get(Model)
+    info = injector.get(GlobalInfo)
+    session = injector.get(DriveRequests).session
+
+    timings = Timings()
+    timings.wrap(model, 'sync', "Model.sync")
+    timings.wrap(injector.get(HaSource), 'get', "HaSource.get")
+    timings.wrap(injector.get(DriveSource), 'get', "DriveSource.get")
+    timings.wrap(injector.get(DriveRequests), 'create', "DriveRequests.create")
+
+    uploaded_before = sum(backup.size() for backup in coord.backups() if backup.getSource(injector.get(DriveSource).name()))
+    requests_before = await requestCounts(session, ports)
+    lag = LoopLagMonitor()
+    lag.start()
+    start = time.perf_counter()
+    await coord.sync()
+    elapsed = time.perf_counter() - start
+    await lag.stop()
+    requests_after = await requestCounts(session, ports)
+
+    # Counting requests is a request too
+    requests_after['supervisor'] -= 1
+    if info._last_error is not None:
+        raise info._last_error
+    timings.restore()
+    uploaded = sum(backup.size() for backup in coord.backups() if backup.getSource(injector.get(DriveSource).name())) - uploaded_before
+    return {
+        'seconds': elapsed,
+        'bytes_uploaded': int(uploaded),
+        'bytes_per_second': uploaded / elapsed if elapsed > 0 else 0,
+        'loop_lag': lag.stats(),
+        'requests': {category: count - requests_before.get(category, 0) for category, count in requests_after.items()},
+        'timings': timings.results(),
+    }
+
+
+def runCase(case: Dict[str, Any]) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp()
+    os.mkdir(os.path.join(workdir, "backups"))
+    with open(os.path.join(workdir, "secrets.yaml"), "w") as f:
+        f.write("for_benchmarks: \"password value\"\n")
+    with open(os.path.join(workdir, "credentials.dat"), "w") as f:
+        f.write(json.dumps(Creds(Time(), CLIENT_ID, None, "test_access_token", "test_refresh_token").serialize()))
+    ports = Ports(*freePorts(3))
+
+    context = multiprocessing.get_context("fork")
+    ready = context.Event()
+    simulation = context.Process(target=serveSimulation, args=(case, ports, workdir, ready), name="Simulation Server")
+    simulation.start()
+    try:
+        if not ready.wait(STARTUP_SECONDS):
+            raise Exception("The simulation server didn't start")
+
+        async def run():
+            injector = Injector([BaseModule(), BenchmarkModule(makeConfig(case, ports, workdir), ports)])
+            session = injector.get(DriveRequests).session
+            try:
+                return {
+                    'initial': await runPhase(injector, ports),
+                    'steady': await runPhase(injector, ports),
+                }
+            finally:
+                await session.close()
+        phases = asyncio.run(run())
+    finally:
+        simulation.terminate()
+        simulation.join()
+    return {
+        'case': case,
+        **phases,
+        'peak_rss_bytes': peakRssBytes(),
+    }
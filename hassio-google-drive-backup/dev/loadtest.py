@@ -0,0 +1,136 @@
+"""
+Measures how many requests per second the auth server can handle, to help size its instances.
+
+Starts the simulation server (which stands in for Google) and the auth server as separate processes, with the auth
+server pointed at the simulated Google, then sends requests from 'concurrency' concurrent clients for 'duration'
+seconds and reports the throughput and latency.  Run it from the add-on's directory, eg:
+
+    python -m dev.loadtest --workers 4 --concurrency 64 --endpoint refresh
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from statistics import quantiles
+from typing import Dict, List
+
+from aiohttp import ClientSession, ClientError, TCPConnector
+from yarl import URL
+
+SIMULATION_PORT = 56153
+REFRESH_TOKEN = "test_refresh_token"
+STARTUP_SECONDS = 30
+
+ENDPOINTS = {
+    'health': ('get', "/health", None),
+    'index': ('get', "/", None),
+    'picker': ('get', "/drive/picker", None),
+    'refresh': ('post', "/drive/refresh", {'refresh_token': REFRESH_TOKEN}),
+}
+
+
+def startProcesses(args) -> List[subprocess.Popen]:
+    google = URL("http://localhost").with_port(SIMULATION_PORT)
+    env = {
+        **os.environ,
+        'PORT': str(args.port),
+        'SERVER_WORKERS': str(args.workers),
+        'AUTHORIZATION_HOST': str(URL("http://localhost").with_port(args.port)),
+        'DRIVE_AUTHORIZE_URL': str(google.with_path("/o/oauth2/v2/auth")),
+        'DRIVE_REFRESH_URL': str(google.with_path("/oauth2/v4/token")),
+        'DRIVE_TOKEN_URL': str(google.with_path("/token")),
+        'DRIVE_DEVICE_CODE_URL': str(google.with_path("/device/code")),
+    }
+    if args.no_cache:
+        env['AUTH_REFRESH_CACHE_SECONDS'] = "0"
+    output = None if args.verbose else subprocess.DEVNULL
+    return [
+        subprocess.Popen([sys.executable, "-m", "dev.simulationserver"], stdout=output, stderr=output),
+        subprocess.Popen([sys.executable, "-m", "backup.server"], env=env, stdout=output, stderr=output),
+    ]
+
+
+async def waitFor(session: ClientSession, url: URL):
+    deadline = time.monotonic() + STARTUP_SECONDS
+    while True:
+        try:
+            async with session.get(url) as resp:
+                if resp.status < 500:
+                    return
+        except ClientError:
+            pass
+        if time.monotonic() > deadline:
+            raise Exception("{0} didn't come up within {1} seconds".format(url, STARTUP_SECONDS))
+        await asyncio.sleep(0.2)
+
+
+async def client(session: ClientSession, url: URL, method: str, payload, stop_at: float, latencies: List[float], statuses: Dict[str, int]):
+    while time.monotonic() < stop_at:
+        start = time.monotonic()
+        try:
+            async with session.request(method, url, json=payload) as resp:
+                await resp.read()
+                status = str(resp.status)
+        except (ClientError, asyncio.TimeoutError) as e:
+            status = type(e).__name__
+        latencies.append(time.monotonic() - start)
+        statuses[status] = statuses.get(status, 0) + 1
+
+
+async def run(args):
+    method, path, payload = ENDPOINTS[args.endpoint]
+    base = URL("http://localhost").with_port(args.port)
+    async with ClientSession(connector=TCPConnector(limit=args.concurrency, force_close=args.new_connections)) as session:
+        await waitFor(session, URL("http://localhost").with_port(SIMULATION_PORT).with_path("/debug/google"))
+        await waitFor(session, base.with_path("/health"))
+
+        # Warm up, so template compilation and the first refresh aren't counted
+        async with session.request(method, base.with_path(path), json=payload) as resp:
+            await resp.read()
+
+        latencies: List[float] = []
+        statuses: Dict[str, int] = {}
+        start = time.monotonic()
+        await asyncio.gather(*[client(session, base.with_path(path), method, payload, start + args.duration, latencies, statuses)
+                               for _ in range(args.concurrency)])
+        elapsed = time.monotonic() - start
+
+    print("{0} {1} with {2} worker(s) and {3} concurrent client(s) for {4:.1f}s".format(
+        method.upper(), path, args.workers, args.concurrency, elapsed))
+    print("  requests:   {0}".format(len(latencies)))
+    print("  throughput: {0:.1f} requests/s".format(len(latencies) / elapsed))
+    if len(latencies) > 1:
+        cuts = quantiles(latencies, n=100)
+        print("  latency:    p50 {0:.1f}ms, p90 {1:.1f}ms, p99 {2:.1f}ms".format(cuts[49] * 1000, cuts[89] * 1000, cuts[98] * 1000))
+    print("  responses:  " + ", ".join("{0}: {1}".format(status, count) for status, count in sorted(statuses.items())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the auth server against the simulated Google")
+    parser.add_argument("--workers", type=int, default=1, help="Auth server worker processes")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds to send requests for")
+    parser.add_argument("--endpoint", choices=ENDPOINTS.keys(), default="health")
+    parser.add_argument("--port", type=int, default=1627, help="Port to run the auth server on")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the auth server's refresh cache")
+    parser.add_argument("--new-connections", action="store_true", help="Open a new connection for every request")
+    parser.add_argument("--verbose", action="store_true", help="Show output from the servers")
+    args = parser.parse_args()
+
+    processes = startProcesses(args)
+    try:
+        asyncio.run(run(args))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+if __name__ == '__main__':
+    main()
@@ -9,6 +9,7 @@ from backup.creds import KEY_CLIENT_SECRET, KEY_CLIENT_ID, KEY_ACCESS_TOKEN, KEY
 from aiohttp.web import (HTTPBadRequest, HTTPNotFound,
                          HTTPUnauthorized, Request, Response, delete, get,
                          json_response, patch, post, put, HTTPSeeOther)
+from aiohttp import ClientSession, MultipartWriter
 from injector import inject, singleton
 from .base_server import BaseServer, bytesPattern, intPattern
 from .ports import Ports
@@ -34,9 +35,10 @@ URL_MATCH_TOKEN = "^/token$"
 @singleton
 class SimulatedGoogle(BaseServer):
     @inject
-    def __init__(self, config: Config, time: Time, ports: Ports):
+    def __init__(self, config: Config, time: Time, ports: Ports, session: ClientSession):
         self._time = time
         self.config = config
+        self._session = session
 
         # auth state
         self._custom_drive_client_id = self.generateId(5)
@@ -54,6 +56,14 @@ class SimulatedGoogle(BaseServer):
         self.space_available = 5 * 1024 * 1024 * 1024
         self.usage = 0
 
+        # Benchmarks set this to False to upload more than fits in memory, uploaded items then have no bytes to read.
+        self.keep_bytes = True
+
+        # Change log for the changes api, a page token is just an index into it.
+        self.changes = []
+        self._oldest_change_token = 0
+        self._reported_lost_permission = set()
+
         # Upload state information
         self._upload_info: Dict[str, Any] = {}
         self.chunks = []
@@ -87,6 +97,15 @@ class SimulatedGoogle(BaseServer):
         self.config.override(Setting.DEFAULT_DRIVE_CLIENT_ID, self.generateId(5))
         self.config.override(Setting.DEFAULT_DRIVE_CLIENT_SECRET, self.generateId(5))
 
+    def expireChangeTokens(self):
+        # Simulates Drive forgetting old changes, so any token handed out before now becomes invalid.  The gap in the
+        # log makes sure that includes a token for the current position.
+        self.changes.append(None)
+        self._oldest_change_token = len(self.changes)
+
+    def _recordChange(self, id):
+        self.changes.append(id)
+
     def creds(self):
         return Creds(self._time,
                      id=self.config.get(Setting.DEFAULT_DRIVE_CLIENT_ID),
@@ -107,6 +126,9 @@ class SimulatedGoogle(BaseServer):
             get('/o/oauth2/v2/auth', self._oAuth2Authorize),
             get('/drive/customcreds', self._getCustomCred),
             get('/drive/v3/about', self._driveAbout),
+            get('/drive/v3/changes/startPageToken', self._changesStartToken),
+            get('/drive/v3/changes', self._changes),
+            post('/batch/drive/v3', self._batch),
             post('/device/code', self._deviceCode),
             get('/device', self._device),
             get('/debug/google', self._debug),
@@ -354,6 +376,7 @@ class SimulatedGoogle(BaseServer):
                 self.items[id][key].update(update[key])
             else:
                 self.items[id][key] = update[key]
+        self._recordChange(id)
         return Response()
 
     async def _driveAbout(self, request: Request):
@@ -373,8 +396,41 @@ class SimulatedGoogle(BaseServer):
         if id not in self.items:
             raise HTTPNotFound()
         del self.items[id]
+        self._recordChange(id)
         return Response()
 
+    async def _changesStartToken(self, request: Request):
+        await self._checkDriveHeaders(request)
+        return json_response({'startPageToken': str(len(self.changes))})
+
+    async def _changes(self, request: Request):
+        await self._checkDriveHeaders(request)
+        token = request.query.get("pageToken", "")
+        if not token.isdigit() or int(token) < self._oldest_change_token or int(token) > len(self.changes):
+            return json_response({"error": {"errors": [{"reason": "invalid"}], "message": "Invalid pageToken"}}, status=400)
+        fields = self.parseFields(request.query.get('fields', 'id').replace("changes(", "").replace("file(", "").replace(")", ""))
+        page_size = int(request.query.get("pageSize", 100))
+
+        # Losing access to a file shows up as a change that removes it
+        for id in self.lostPermission:
+            if id not in self._reported_lost_permission:
+                self._reported_lost_permission.add(id)
+                self._recordChange(id)
+
+        start = int(token)
+        end = min(len(self.changes), start + page_size)
+        ret = []
+        for id in self.changes[start:end]:
+            if id is None:
+                continue
+            if id in self.items and id not in self.lostPermission:
+                ret.append({'fileId': id, 'removed': False, 'file': self.filter_fields(self.items[id], fields)})
+            else:
+                ret.append({'fileId': id, 'removed': True})
+        if end < len(self.changes):
+            return json_response({'changes': ret, 'nextPageToken': str(end)})
+        return json_response({'changes': ret, 'newStartPageToken': str(end)})
+
     async def _query(self, request: Request):
         await self._checkDriveHeaders(request)
         query: str = request.query.get("q", "")
@@ -408,10 +464,41 @@ class SimulatedGoogle(BaseServer):
         else:
             raise HTTPBadRequest
 
+    async def _batch(self, request: Request):
+        await self._checkDriveHeaders(request)
+        if request.content_type != "multipart/mixed":
+            raise HTTPBadRequest()
+        reader = await request.multipart()
+        writer = MultipartWriter("mixed", boundary="batch_" + self.generateId(10))
+        while True:
+            part = await reader.next()
+            if part is None:
+                break
+            if part.headers.get("Content-Type") != "application/http":
+                raise HTTPBadRequest()
+            head, _, body = (await part.read()).decode().partition("\r\n\r\n")
+            lines = head.split("\r\n")
+            method, path, _ = lines[0].split(" ")
+            headers = {"Authorization": request.headers["Authorization"]}
+            for line in lines[1:]:
+                key, _, value = line.partition(": ")
+                headers[key] = value
+
+            # Make each request back to this server, so they get handled (and intercepted) like any other request
+            async with self._session.request(method, URL("http://localhost:" + str(self._port) + path), headers=headers, data=body.encode() if len(body) > 0 else None) as resp:
+                response_body = await resp.text()
+                response = "HTTP/1.1 {0} {1}\r\nContent-Type: {2}\r\n\r\n{3}".format(resp.status, resp.reason, resp.content_type, response_body)
+            writer.append(response, {
+                "Content-Type": "application/http",
+                "Content-ID": "<response-" + part.headers.get("Content-ID", "").strip("<>") + ">"
+            })
+        return Response(body=writer)
+
     async def _create(self, request: Request):
         await self._checkDriveHeaders(request)
         item = self.formatItem(await request.json(), self.generateId(30))
         self.items[item['id']] = item
+        self._recordChange(item['id'])
         return json_response({'id': item['id']})
 
     async def _upload(self, request: Request):
@@ -502,16 +589,18 @@ class SimulatedGoogle(BaseServer):
         if len(received_bytes) != end - start + 1:
             raise HTTPBadRequest()
 
-        self._upload_info['item']['bytes'].extend(received_bytes)
+        if self.keep_bytes:
+            self._upload_info['item']['bytes'].extend(received_bytes)
 
-        if len(self._upload_info['item']['bytes']) != end + 1:
-            raise HTTPBadRequest()
+            if len(self._upload_info['item']['bytes']) != end + 1:
+                raise HTTPBadRequest()
         self.usage += len(received_bytes)
         self.chunks.append(len(received_bytes))
         if end == total - 1:
             # upload is complete, so create the item
             completed = self.formatItem(self._upload_info['item'], self._upload_info['id'])
             self.items[completed['id']] = completed
+            self._recordChange(completed['id'])
             return json_response({"id": completed['id']})
         else:
             # Return an incomplete response
@@ -10,10 +10,11 @@ from backup.time import Time
 from aiohttp.web import (HTTPBadRequest, HTTPNotFound,
                          HTTPUnauthorized, Request, Response, get,
                          json_response, post, delete, FileResponse)
+from aiohttp.payload import Payload
 from injector import inject, singleton
 from .base_server import BaseServer
 from .ports import Ports
-from typing import Any, Dict
+from typing import Any, Dict, Union
 from tests.helpers import all_addons, createBackupTar, parseBackupInfo
 
 URL_MATCH_BACKUP_FULL = "^/backups/new/full$"
@@ -40,7 +41,7 @@ class SimulatedSupervisor(BaseServer):
         self._ports = ports
         self._auth_token = "test_header"
         self._backups: Dict[str, Any] = {}
-        self._backup_data: Dict[str, bytearray] = {}
+        self._backup_data: Dict[str, Union[bytearray, Payload]] = {}
         self._backup_lock = asyncio.Lock()
         self._backup_inner_lock = asyncio.Lock()
         self._entities = {}
@@ -55,6 +56,9 @@ class SimulatedSupervisor(BaseServer):
         self._password = "pass"
         self._addons = all_addons.copy()
         self._super_version = Version(2023, 7)
+        self._latency = 0
+        self._in_flight = 0
+        self.max_in_flight = 0
         self._mounts = {
             'default_backup_mount': None,
             'mounts': [
@@ -170,7 +174,19 @@ class SimulatedSupervisor(BaseServer):
         else:
             await self._backup_lock.acquire()
 
+    def setLatency(self, seconds):
+        # Makes every supervisor request take at least this long, and tracks how many of them are in flight at once.
+        self._latency = seconds
+        self.max_in_flight = 0
+
     async def _verifyHeader(self, request) -> bool:
+        if self._latency > 0:
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+            try:
+                await asyncio.sleep(self._latency)
+            finally:
+                self._in_flight -= 1
         if request.headers.get("Authorization", None) == "Bearer " + self._auth_token:
             return
         if request.headers.get("X-Supervisor-Token", None) == self._auth_token:
@@ -308,6 +324,12 @@ class SimulatedSupervisor(BaseServer):
     async def createBackup(self, input_json, date=None):
         return await self._internalNewBackup(None, input_json, date=date, verify_header=False)
 
+    def insertBackup(self, info: Dict[str, Any], data: Union[bytearray, Payload]):
+        # Adds a backup without generating its tar, so benchmarks can share the same bytes between many backups.  The
+        # data can also be a Payload that generates the tar as it's downloaded, see dev/benchmark/sync.py
+        self._backups[info['slug']] = info
+        self._backup_data[info['slug']] = data
+
     async def _newbackup(self, request: Request):
         if self._backup_lock.locked():
             raise HTTPBadRequest()
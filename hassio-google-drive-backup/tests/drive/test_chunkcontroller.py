@@ -0,0 +1,107 @@
+from backup.config import Config, Setting
+from backup.drive.chunkcontroller import ChunkSizeController, BASE_CHUNK_SIZE, CHUNK_UPLOAD_TARGET_SECONDS
+from ..faketime import FakeTime
+
+
+def test_starts_small(config: Config, time: FakeTime):
+    controller = ChunkSizeController(config, time)
+    assert controller.size() == 1
+    assert controller.info() == {
+        'chunk_size': BASE_CHUNK_SIZE,
+        'recovering': False,
+        'backoffs': 0
+    }
+
+
+def test_sizes_chunks_to_target_duration(config: Config, time: FakeTime):
+    config.override(Setting.MAXIMUM_UPLOAD_CHUNK_BYTES, BASE_CHUNK_SIZE * 1000)
+    controller = ChunkSizeController(config, time)
+
+    # One chunk per second means 10 chunks should take the target duration
+    controller.success(1, 1)
+    assert controller.size() == CHUNK_UPLOAD_TARGET_SECONDS
+
+    # Sending instantly means we can't tell how fast the link is, so go as big as possible
+    controller.success(1, 0)
+    assert controller.size() == 1000
+
+
+def test_limited_by_maximum(config: Config, time: FakeTime):
+    config.override(Setting.MAXIMUM_UPLOAD_CHUNK_BYTES, 1)
+    controller = ChunkSizeController(config, time)
+    controller.success(1, 0)
+    assert controller.size() == 1
+
+    config.override(Setting.MAXIMUM_UPLOAD_CHUNK_BYTES, BASE_CHUNK_SIZE * 3.5)
+    controller.success(1, 0)
+    assert controller.size() == 3
+    controller.success(1, 1000000)
+    assert controller.size() == 1
+
+
+def test_single_slow_chunk_is_smoothed(config: Config, time: FakeTime):
+    config.override(Setting.MAXIMUM_UPLOAD_CHUNK_BYTES, BASE_CHUNK_SIZE * 1000)
+    controller = ChunkSizeController(config, time)
+    controller.success(10, 1)
+    assert controller.size() == 100
+
+    # A chunk that took 100x longer than usual only moves the estimate by EWMA_WEIGHT
+    controller.success(100, 100)
+    assert controller.size() == 73
+
+
+def test_round_trip_time_reduces_chunk_size(config: Config, time: FakeTime):
+    config.override(Setting.MAXIMUM_UPLOAD_CHUNK_BYTES, BASE_CHUNK_SIZE * 1000)
+    controller = ChunkSizeController(config, time)
+    controller.recordRoundTrip(2)
+    assert controller.info()['rtt'] == 2
+
+    # 2 of the 3 seconds were spent waiting on Google, so the link moves 5 chunks/second
+    controller.success(5, 3)
+    assert controller.info()['bandwidth'] == 5 * BASE_CHUNK_SIZE
+    assert controller.size() == 5 * (CHUNK_UPLOAD_TARGET_SECONDS - 2)
+
+    # A round trip longer than the target means chunks should be as small as possible
+    controller.recordRoundTrip(100)
+    controller.success(1, 100)
+    assert controller.size() == 1
+
+
+def test_aimd_backoff(config: Config, time: FakeTime):
+    config.override(Setting.MAXIMUM_UPLOAD_CHUNK_BYTES, BASE_CHUNK_SIZE * 1000)
+    controller = ChunkSizeController(config, time)
+    controller.success(10, 1)
+    assert controller.size() == 100
+
+    # Errors cut the size in half
+    controller.failure()
+    assert controller.size() == 50
+    controller.failure()
+    assert controller.size() == 25
+    assert controller.info()['recovering']
+    assert controller.info()['backoffs'] == 2
+
+    # Then it only grows by one chunk at a time
+    controller.success(25, 0.25)
+    assert controller.size() == 26
+    controller.success(26, 0.26)
+    assert controller.size() == 27
+
+    # Until it reaches the bandwidth estimate
+    config.override(Setting.MAXIMUM_UPLOAD_CHUNK_BYTES, BASE_CHUNK_SIZE * 50)
+    for _ in range(22):
+        controller.success(controller.size(), controller.size() / 100)
+    assert controller.size() == 49
+    assert controller.info()['recovering']
+    controller.success(controller.size(), controller.size() / 100)
+    assert controller.size() == 50
+    assert not controller.info()['recovering']
+
+
+def test_never_below_one_chunk(config: Config, time: FakeTime):
+    controller = ChunkSizeController(config, time)
+    controller.failure()
+    controller.failure()
+    assert controller.size() == 1
+    time.advance(minutes=1)
+    assert controller.info()['last_backoff'] == "1 minute ago"
@@ -11,13 +11,15 @@ from dev.simulationserver import SimulationServer
 from dev.simulated_google import SimulatedGoogle, URL_MATCH_UPLOAD_PROGRESS, URL_MATCH_FILE
 from dev.request_interceptor import RequestInterceptor
 from backup.drive import DriveSource, FolderFinder, DriveRequests, RETRY_SESSION_ATTEMPTS, UPLOAD_SESSION_EXPIRATION_DURATION, URL_START_UPLOAD
-from backup.drive.driverequests import (BASE_CHUNK_SIZE, CHUNK_UPLOAD_TARGET_SECONDS)
+from backup.drive import driverequests
+from backup.drive.driverequests import BASE_CHUNK_SIZE
 from backup.drive.drivesource import FOLDER_MIME_TYPE
 from backup.exceptions import (BackupFolderInaccessible, BackupFolderMissingError,
                                DriveQuotaExceeded, ExistingBackupFolderError,
                                GoogleCantConnect, GoogleCredentialsExpired,
                                GoogleInternalError, GoogleUnexpectedError,
-                               GoogleSessionError, GoogleTimeoutError, CredRefreshMyError, CredRefreshGoogleError)
+                               GoogleSessionError, GoogleTimeoutError, CredRefreshMyError, CredRefreshGoogleError,
+                               GoogleRateLimitError, GoogleDrivePermissionDenied)
 from backup.creds import Creds
 from backup.model import DriveBackup, DummyBackup
 from ..faketime import FakeTime
@@ -69,3 +71,158 @@ async def test_higher_speed_limit(drive_requests: DriveRequests, time: FakeTime,
             assert time.sleeps[-1] == 0.5
     assert len(time.sleeps) == 11
 
+
+@pytest.mark.asyncio
+async def test_next_chunk_read_while_uploading(drive_requests: DriveRequests, backup_helper: BackupHelper, config: Config, interceptor: RequestInterceptor):
+    config.override(Setting.MAXIMUM_UPLOAD_CHUNK_BYTES, BASE_CHUNK_SIZE)
+    from_backup, data = await backup_helper.createFile(BASE_CHUNK_SIZE * 4)
+
+    # Let the first chunk upload, then hold up the second one
+    matcher = interceptor.setWaiter(URL_MATCH_UPLOAD_PROGRESS, attempts=1)
+
+    async def upload():
+        async for progress in drive_requests.create(data, {}, "unused"):
+            if not isinstance(progress, float):
+                return progress
+
+    async with data:
+        task = asyncio.create_task(upload())
+        await matcher.waitForCall()
+
+        # The third chunk should get read from the source while the second is still being sent to Drive
+        for x in range(100):
+            if data.position() == BASE_CHUNK_SIZE * 3:
+                break
+            await asyncio.sleep(0.01)
+        assert data.position() == BASE_CHUNK_SIZE * 3
+
+        matcher.clear()
+        item = await task
+        assert item['size'] == data.size()
+
+
+@pytest.mark.asyncio
+async def test_chunk_size_carries_over_and_backs_off(drive_requests: DriveRequests, backup_helper: BackupHelper, config: Config, interceptor: RequestInterceptor, google: SimulatedGoogle):
+    config.override(Setting.MAXIMUM_UPLOAD_CHUNK_BYTES, BASE_CHUNK_SIZE * 4)
+    from_backup, data = await backup_helper.createFile(BASE_CHUNK_SIZE * 10)
+    async with data:
+        async for progress in drive_requests.create(data, {}, "unused"):
+            pass
+    assert google.chunks[:3] == [BASE_CHUNK_SIZE, BASE_CHUNK_SIZE * 4, BASE_CHUNK_SIZE * 4]
+
+    # The next upload starts where the last one left off, and an error on the second chunk halves the size of the third
+    google.chunks.clear()
+    interceptor.setError(URL_MATCH_UPLOAD_PROGRESS, status=500, fail_after=1, fail_for=1)
+    data.position(0)
+    async with data:
+        async for progress in drive_requests.create(data, {}, "unused"):
+            pass
+    assert google.chunks[:3] == [BASE_CHUNK_SIZE * 4, BASE_CHUNK_SIZE * 4, BASE_CHUNK_SIZE * 2]
+    assert sum(google.chunks) == data.size()
+    assert drive_requests.chunk_controller.info()['backoffs'] == 1
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_doesnt_shrink_chunks(drive_requests: DriveRequests, backup_helper: BackupHelper, config: Config, interceptor: RequestInterceptor, google: SimulatedGoogle):
+    config.override(Setting.MAXIMUM_UPLOAD_CHUNK_BYTES, BASE_CHUNK_SIZE * 4)
+    from_backup, data = await backup_helper.createFile(BASE_CHUNK_SIZE * 10)
+    interceptor.setError(URL_MATCH_UPLOAD_PROGRESS, status=429, fail_after=1, fail_for=1)
+    async with data:
+        async for progress in drive_requests.create(data, {}, "unused"):
+            pass
+    assert google.chunks[:3] == [BASE_CHUNK_SIZE, BASE_CHUNK_SIZE * 4, BASE_CHUNK_SIZE * 4]
+    assert sum(google.chunks) == data.size()
+    assert drive_requests.chunk_controller.info()['backoffs'] == 0
+
+
+@pytest.mark.asyncio
+async def test_batch(drive_requests: DriveRequests, google: SimulatedGoogle, interceptor: RequestInterceptor):
+    first = (await drive_requests.createFolder({'name': "first", 'mimeType': FOLDER_MIME_TYPE}))['id']
+    second = (await drive_requests.createFolder({'name': "second", 'mimeType': FOLDER_MIME_TYPE}))['id']
+    interceptor.clear()
+
+    results = await drive_requests.batch([
+        drive_requests.deleteRequest(first),
+        drive_requests.updateRequest(second, {"name": "renamed"}),
+        ("GET", "/drive/v3/files/" + second + "/?fields=id,name", None),
+        drive_requests.deleteRequest("missing"),
+    ])
+    assert results[0] is None
+    assert results[1] is None
+    assert results[2] == {'id': second, 'name': "renamed"}
+    assert isinstance(results[3], ClientResponseError)
+    assert results[3].status == 404
+    assert first not in google.items
+    assert google.items[second]['name'] == "renamed"
+
+    # All of it should have gone to Drive in one request
+    assert len([url for url in interceptor._history if url.startswith("/batch/")]) == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_split_into_groups(drive_requests: DriveRequests, google: SimulatedGoogle, interceptor: RequestInterceptor, monkeypatch):
+    monkeypatch.setattr(driverequests, "BATCH_MAX_REQUESTS", 2)
+    ids = [(await drive_requests.createFolder({'name': str(i), 'mimeType': FOLDER_MIME_TYPE}))['id'] for i in range(5)]
+    interceptor.clear()
+    assert await drive_requests.batch([drive_requests.deleteRequest(id) for id in ids]) == [None] * 5
+    assert len([url for url in interceptor._history if url.startswith("/batch/")]) == 3
+    for id in ids:
+        assert id not in google.items
+
+
+@pytest.mark.asyncio
+async def test_batch_retries_transient_errors(drive_requests: DriveRequests, google: SimulatedGoogle, interceptor: RequestInterceptor, time: FakeTime):
+    first = (await drive_requests.createFolder({'name': "first", 'mimeType': FOLDER_MIME_TYPE}))['id']
+    second = (await drive_requests.createFolder({'name': "second", 'mimeType': FOLDER_MIME_TYPE}))['id']
+
+    # Only the request that failed gets sent again
+    interceptor.setError("^/drive/v3/files/" + second + "/$", status=500, fail_for=1)
+    assert await drive_requests.batch([drive_requests.deleteRequest(first), drive_requests.deleteRequest(second)]) == [None, None]
+    assert time.sleeps == [2]
+    assert first not in google.items
+    assert second not in google.items
+
+    # Errors are given back once retries run out
+    third = (await drive_requests.createFolder({'name': "third", 'mimeType': FOLDER_MIME_TYPE}))['id']
+    interceptor.setError("^/drive/v3/files/" + third + "/$", status=429)
+    results = await drive_requests.batch([drive_requests.deleteRequest(third)])
+    assert isinstance(results[0], GoogleRateLimitError)
+    assert time.sleeps == [2, 2, 4, 8, 16, 32]
+
+
+@pytest.mark.asyncio
+async def test_batch_maps_errors(drive_requests: DriveRequests, google: SimulatedGoogle, interceptor: RequestInterceptor):
+    id = (await drive_requests.createFolder({'name': "folder", 'mimeType': FOLDER_MIME_TYPE}))['id']
+    google.lostPermission.append(id)
+    results = await drive_requests.batch([("GET", "/drive/v3/files/" + id + "/?fields=id", None)])
+    assert isinstance(results[0], GoogleDrivePermissionDenied)
+
+
+@pytest.mark.asyncio
+async def test_single_flight_refresh(drive: DriveSource, drive_requests: DriveRequests, google: SimulatedGoogle, time: FakeTime, interceptor: RequestInterceptor):
+    drive.saveCreds(google.creds())
+    old_token = await drive_requests.getToken()
+    time.advanceDay()
+
+    # Everyone who finds the credentials expired waits on the same refresh
+    waiter = interceptor.setWaiter("/drive/refresh")
+    callers = [asyncio.create_task(drive_requests.getToken()) for _ in range(5)]
+    callers.append(asyncio.create_task(drive_requests.refreshToken()))
+    await waiter.waitForCall()
+    waiter.clear()
+    tokens = await asyncio.gather(*callers)
+    assert waiter.callCount() == 1
+    assert drive_requests.refreshes == 1
+    assert set(tokens[:5]) == {drive_requests.creds.access_token}
+    assert drive_requests.creds.access_token != old_token
+
+    # A caller giving up doesn't cancel the refresh for everyone else
+    time.advanceDay()
+    waiter = interceptor.setWaiter("/drive/refresh")
+    first = asyncio.create_task(drive_requests.getToken())
+    second = asyncio.create_task(drive_requests.getToken())
+    await waiter.waitForCall()
+    first.cancel()
+    waiter.clear()
+    assert await second == drive_requests.creds.access_token
+    assert drive_requests.refreshes == 2
@@ -0,0 +1,64 @@
+import pytest
+from datetime import timedelta
+
+from backup.config import Config, Setting
+from backup.drive import DriveSource, DriveRequests, TokenRefresher
+from backup.drive.tokenrefresher import MAX_CHECK_SECONDS, MIN_CHECK_SECONDS, FAILURE_BACKOFF_SECONDS
+from dev.simulated_google import SimulatedGoogle
+from dev.request_interceptor import RequestInterceptor
+from ..faketime import FakeTime
+
+
+@pytest.fixture
+def refresher(injector, server) -> TokenRefresher:
+    return injector.get(TokenRefresher)
+
+
+@pytest.mark.asyncio
+async def test_refreshes_before_expiration(refresher: TokenRefresher, drive: DriveSource, drive_requests: DriveRequests, google: SimulatedGoogle, time: FakeTime, config: Config):
+    drive.saveCreds(google.creds())
+    margin = timedelta(seconds=config.get(Setting.DRIVE_TOKEN_REFRESH_MARGIN_SECONDS))
+    expiration = drive_requests.creds.expiration
+    old_token = drive_requests.creds.access_token
+
+    # Nothing happens until the credentials are within the margin of expiring
+    await refresher.check()
+    assert drive_requests.refreshes == 0
+    assert refresher.secondsUntilNextCheck() == min(MAX_CHECK_SECONDS, (expiration - margin - time.now()).total_seconds())
+
+    time.setNow(expiration - margin + timedelta(seconds=1))
+    assert refresher.secondsUntilNextCheck() == MIN_CHECK_SECONDS
+    await refresher.check()
+    assert drive_requests.refreshes == 1
+    assert drive_requests.creds.access_token != old_token
+
+    # So requests don't have to wait on a refresh
+    assert not drive_requests.creds.is_expired
+    await drive.get()
+    assert drive_requests.refreshes == 1
+
+
+@pytest.mark.asyncio
+async def test_disabled_by_zero_margin(refresher: TokenRefresher, drive: DriveSource, drive_requests: DriveRequests, google: SimulatedGoogle, time: FakeTime, config: Config):
+    drive.saveCreds(google.creds())
+    config.override(Setting.DRIVE_TOKEN_REFRESH_MARGIN_SECONDS, 0)
+    time.setNow(drive_requests.creds.expiration - timedelta(seconds=1))
+    await refresher.check()
+    assert drive_requests.refreshes == 0
+    assert refresher.secondsUntilNextCheck() == MAX_CHECK_SECONDS
+
+
+@pytest.mark.asyncio
+async def test_backs_off_after_failure(refresher: TokenRefresher, drive: DriveSource, drive_requests: DriveRequests, google: SimulatedGoogle, time: FakeTime, interceptor: RequestInterceptor):
+    drive.saveCreds(google.creds())
+    time.setNow(drive_requests.creds.expiration)
+    interceptor.setError("^/drive/refresh$", 503)
+    await refresher.check()
+    assert refresher.secondsUntilNextCheck() == FAILURE_BACKOFF_SECONDS
+    await refresher.check()
+    assert refresher.secondsUntilNextCheck() == FAILURE_BACKOFF_SECONDS * 2
+
+    interceptor.clear()
+    await refresher.check()
+    assert drive_requests.refreshes == 1
+    assert refresher.secondsUntilNextCheck() == MAX_CHECK_SECONDS
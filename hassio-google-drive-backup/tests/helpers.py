@@ -167,12 +167,14 @@ class HelperTestSource(SimulatedSource):
         self.allow_create = True
         self.allow_save = True
         self.queries = 0
+        self.delete_batches = []
 
     def reset(self):
         self.saved = []
         self.deleted = []
         self.created = []
         self.queries = 0
+        self.delete_batches = []
 
     @property
     def query_count(self):
@@ -198,6 +200,10 @@ class HelperTestSource(SimulatedSource):
             raise IntentionalFailure()
         return await super().create(options)
 
+    async def deleteMany(self, backups):
+        self.delete_batches.append(len(backups))
+        await super().deleteMany(backups)
+
     async def save(self, backup, bytes: IOBase = None):
         if not self.allow_save:
             raise IntentionalFailure()
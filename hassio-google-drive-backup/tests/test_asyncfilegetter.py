@@ -0,0 +1,116 @@
+import asyncio
+import os
+import threading
+
+import pytest
+from backup.exceptions import LogicError
+from backup.util import AsyncFileGetter, BufferPool, ReadAheadStream
+from .faketime import FakeTime
+
+
+def writeFile(cleandir, data) -> str:
+    path = os.path.join(cleandir, "backup.tar")
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+@pytest.mark.asyncio
+async def test_basics(cleandir, time: FakeTime):
+    getter = AsyncFileGetter(writeFile(cleandir, bytearray([0, 1, 2, 3, 4, 5, 6, 7])), time)
+    assert await getter.setup() == 8
+    assert getter.size() == 8
+    assert (await getter.read(1)).read() == bytearray([0])
+    assert (await getter.read(2)).read() == bytearray([1, 2])
+    assert (await getter.read(100)).read() == bytearray([3, 4, 5, 6, 7])
+    assert (await getter.read(3)).read() == bytearray([])
+
+    getter.position(2)
+    assert (await getter.read(2)).read() == bytearray([2, 3])
+    assert getter.progress() == 50
+    getter.close()
+
+
+@pytest.mark.asyncio
+async def test_readinto(cleandir, time: FakeTime):
+    getter = AsyncFileGetter(writeFile(cleandir, bytearray(range(10))), time)
+    await getter.setup()
+    buffer = bytearray(4)
+    getter.position(8)
+    assert await getter.readinto(memoryview(buffer)) == 2
+    assert buffer[:2] == bytearray([8, 9])
+    assert await getter.readinto(memoryview(buffer)) == 0
+    assert getter.position() == 10
+    getter.close()
+
+
+@pytest.mark.asyncio
+async def test_setup_required(cleandir, time: FakeTime):
+    getter = AsyncFileGetter(writeFile(cleandir, bytearray(10)), time)
+    with pytest.raises(LogicError):
+        await getter.read(1)
+
+
+@pytest.mark.asyncio
+async def test_context_manager_closes(cleandir, time: FakeTime):
+    getter = AsyncFileGetter(writeFile(cleandir, bytearray(range(10))), time)
+    async with getter:
+        assert (await getter.read(3)).read() == bytearray([0, 1, 2])
+    assert getter._fd is None
+
+
+@pytest.mark.asyncio
+async def test_file_shrinks(cleandir, time: FakeTime):
+    path = writeFile(cleandir, bytearray(10))
+    getter = AsyncFileGetter(path, time)
+    await getter.setup()
+    os.truncate(path, 5)
+    with pytest.raises(LogicError):
+        await getter.read(10)
+    getter.close()
+
+
+@pytest.mark.asyncio
+async def test_speed(cleandir, time: FakeTime):
+    getter = AsyncFileGetter(writeFile(cleandir, bytearray(100)), time)
+    await getter.setup()
+    assert getter.speed() is None
+    time.advance(seconds=1)
+    await getter.read(10)
+    assert getter.speed(period=getter._time.now() - getter.startTime()) == 10
+    getter.close()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_read_keeps_buffer_until_thread_finishes(cleandir, time: FakeTime):
+    getter = AsyncFileGetter(writeFile(cleandir, bytearray(range(10))), time)
+    await getter.setup()
+    started = threading.Event()
+    proceed = threading.Event()
+    readAt = getter._readAt
+
+    def slowReadAt(buffer, position):
+        started.set()
+        proceed.wait()
+        return readAt(buffer, position)
+    getter._readAt = slowReadAt
+
+    pool = BufferPool()
+    reader = ReadAheadStream(getter, pool, 10)
+    read = asyncio.create_task(reader.read(10))
+    await asyncio.get_event_loop().run_in_executor(None, started.wait)
+    read.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await read
+
+    # The thread is still writing into the buffer, so closing has to wait for it before giving the buffer back
+    closing = asyncio.create_task(reader.close())
+    try:
+        await asyncio.sleep(0.1)
+        assert not closing.done()
+        assert pool.idle() == 0
+    finally:
+        proceed.set()
+    await closing
+    assert pool.idle() == 1
+    getter.close()
@@ -1,7 +1,7 @@
 from datetime import timedelta
 import pytest
-from aiohttp import ClientSession
-from aiohttp.web import StreamResponse
+from aiohttp import ClientSession, ClientPayloadError
+from aiohttp.web import Response, StreamResponse
 from .conftest import Uploader
 from backup.exceptions import LogicError
 from dev.request_interceptor import RequestInterceptor
@@ -115,3 +115,58 @@ async def test_speed(uploader: Uploader, server, time: FakeTime):
     assert getter.speed(period=timedelta(seconds=10)) == 2
     time.advance(seconds=5)
     assert getter.speed(period=timedelta(seconds=10)) == 1
+
+
+@pytest.mark.asyncio
+async def test_reconnects_after_dropped_connection(uploader: Uploader, server, interceptor: RequestInterceptor, time: FakeTime):
+    getter = await uploader.upload(bytearray(range(10)))
+    await getter.setup()
+    assert (await getter.read(2)).read() == bytearray([0, 1])
+
+    # The response for the next range gets cut off after 2 bytes, so the rest gets requested again
+    interceptor.setError("/readfile").addResponse(Response(status=206, body=bytes([5, 6])))
+    getter.position(5)
+    assert (await getter.read(5)).read() == bytearray([5, 6, 7, 8, 9])
+    assert getter.reconnectInfo() == {'reconnects': 1, 'refetched_bytes': 0}
+    assert time.sleeps == [1]
+
+
+@pytest.mark.asyncio
+async def test_dropped_connection_counts_unread_bytes(uploader: Uploader, server, interceptor: RequestInterceptor, time: FakeTime):
+    getter = await uploader.upload(bytearray(range(10)))
+    await getter.setup()
+    assert (await getter.read(2)).read() == bytearray([0, 1])
+
+    # The connection drops after it received bytes that weren't read yet, so they get downloaded again
+    getter._response.content.set_exception(ClientPayloadError("Connection dropped"))
+    assert (await getter.read(8)).read() == bytearray(range(2, 10))
+    assert getter.reconnectInfo() == {'reconnects': 1, 'refetched_bytes': 8}
+
+
+@pytest.mark.asyncio
+async def test_range_ignored(uploader: Uploader, server, interceptor: RequestInterceptor):
+    getter = await uploader.upload(bytearray(range(10)))
+    await getter.setup()
+    interceptor.setError("/readfile").addResponse(Response(status=200, body=bytes(range(10))))
+    getter.position(5)
+    assert (await getter.read(5)).read() == bytearray([5, 6, 7, 8, 9])
+    assert getter.reconnectInfo() == {'reconnects': 0, 'refetched_bytes': 5}
+
+
+@pytest.mark.asyncio
+async def test_reconnect_gives_up(uploader: Uploader, server, interceptor: RequestInterceptor, time: FakeTime):
+    getter = await uploader.upload(bytearray(range(10)))
+    await getter.setup()
+    intercept = interceptor.setError("/readfile")
+    for _ in range(4):
+        intercept.addResponse(Response(status=206, body=bytes([5])))
+    getter.position(5)
+    with pytest.raises(ClientPayloadError):
+        await getter.read(5)
+    assert getter.reconnects == 3
+    assert time.sleeps == [1, 2, 4]
+
+    # A successful read starts the count over
+    getter.position(5)
+    assert (await getter.read(5)).read() == bytearray([5, 6, 7, 8, 9])
+    assert getter.reconnects == 3
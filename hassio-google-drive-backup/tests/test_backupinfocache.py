@@ -0,0 +1,105 @@
+import pytest
+from os.path import exists
+
+from backup.config import Config, Setting
+from backup.ha.backupinfocache import BackupInfoCache
+from backup.ha import HaSource
+from dev.simulated_supervisor import SimulatedSupervisor
+from dev.request_interceptor import RequestInterceptor
+
+
+def listing(slug, date="2023-01-01T00:00:00+00:00", size=1.0):
+    return {'slug': slug, 'date': date, 'size': size}
+
+
+@pytest.mark.asyncio
+async def test_hit_and_miss(config: Config):
+    cache = BackupInfoCache(config)
+    assert cache.get("slug", listing("slug")) is None
+    cache.put("slug", {'name': "Backup"}, listing("slug"))
+    assert cache.get("slug", listing("slug")) == {'name': "Backup"}
+    assert cache.get("slug") == {'name': "Backup"}
+    assert cache.stats() == {'entries': 1, 'hits': 2, 'misses': 1, 'evictions': 0}
+
+
+@pytest.mark.asyncio
+async def test_changed_backup_invalidated(config: Config):
+    cache = BackupInfoCache(config)
+    cache.put("slug", {'name': "Backup"}, listing("slug"))
+    assert cache.get("slug", listing("slug", size=2.0)) is None
+    assert len(cache) == 0
+
+    cache.put("slug", {'name': "Backup"}, listing("slug"))
+    assert cache.get("slug", listing("slug", date="2023-01-02T00:00:00+00:00")) is None
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_evicted(config: Config):
+    config.override(Setting.BACKUP_INFO_CACHE_MAX_ENTRIES, 2)
+    cache = BackupInfoCache(config)
+    cache.put("first", {}, listing("first"))
+    cache.put("second", {}, listing("second"))
+    assert cache.get("first") is not None
+    cache.put("third", {}, listing("third"))
+    assert cache.get("second") is None
+    assert cache.get("first") is not None
+    assert cache.get("third") is not None
+    assert cache.evictions == 1
+
+    config.override(Setting.BACKUP_INFO_CACHE_MAX_ENTRIES, 0)
+    cache.put("fourth", {}, listing("fourth"))
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_retain_only(config: Config):
+    cache = BackupInfoCache(config)
+    cache.put("first", {}, listing("first"))
+    cache.put("second", {}, listing("second"))
+    cache.retainOnly(["second", "other"])
+    assert cache.get("first") is None
+    assert cache.get("second") is not None
+
+
+@pytest.mark.asyncio
+async def test_persisted(config: Config):
+    cache = BackupInfoCache(config)
+    cache.put("first", {'name': "First"}, listing("first"))
+    cache.put("second", {'name': "Second"}, listing("second"))
+    cache.get("first")
+    cache.saveIfDirty()
+    assert exists(cache.path())
+
+    # Order gets saved too, so "second" is still the least recently used
+    config.override(Setting.BACKUP_INFO_CACHE_MAX_ENTRIES, 2)
+    loaded = BackupInfoCache(config)
+    assert loaded.get("first", listing("first")) == {'name': "First"}
+    loaded.put("third", {}, listing("third"))
+    assert loaded.get("second") is None
+
+
+@pytest.mark.asyncio
+async def test_corrupt_file_ignored(config: Config):
+    cache = BackupInfoCache(config)
+    with open(cache.path(), "w") as f:
+        f.write("[1, 2, 3]")
+    assert len(BackupInfoCache(config)) == 0
+
+
+@pytest.mark.asyncio
+async def test_restart_warm_starts(ha: HaSource, config: Config, supervisor: SimulatedSupervisor, interceptor: RequestInterceptor, time):
+    slug = await supervisor.createBackup({'name': "Test"}, date=time.now())
+    await ha.get()
+    assert interceptor.urlWasCalled("^/backups/{0}/info$".format(slug))
+
+    # A new cache loads what the old one saved, so the backup's info doesn't get requested again
+    ha.harequests.cache = BackupInfoCache(config)
+    interceptor.clear()
+    assert list((await ha.get()).keys()) == [slug]
+    assert not interceptor.urlWasCalled("^/backups/{0}/info$".format(slug))
+    assert ha.harequests.cache.stats()['hits'] == 1
+
+    # Deleted backups get dropped from the cache
+    del supervisor._backups[slug]
+    assert len(await ha.get()) == 0
+    assert len(ha.harequests.cache) == 0
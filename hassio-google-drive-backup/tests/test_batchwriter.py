@@ -0,0 +1,98 @@
+import asyncio
+import threading
+
+import pytest
+
+from backup.server.batchwriter import BatchWriter, SAMPLE_RATE
+
+
+class SlowBackend():
+    def __init__(self):
+        self.batches = []
+        self.release = threading.Event()
+        self.release.set()
+        self.fail = False
+
+    def write(self, batch):
+        self.release.wait()
+        if self.fail:
+            raise Exception("Backend is down")
+        self.batches.append(list(batch))
+
+
+@pytest.mark.asyncio
+async def test_writes_in_background():
+    backend = SlowBackend()
+    writer = BatchWriter("Test", backend.write)
+    assert writer.put("a")
+    assert writer.put("b")
+    await writer.stop()
+    assert [item for batch in backend.batches for item in batch] == ["a", "b"]
+    assert writer.stats()['written'] == 2
+    assert writer.depth() == 0
+
+
+@pytest.mark.asyncio
+async def test_batches_while_backend_is_slow():
+    backend = SlowBackend()
+    backend.release.clear()
+    writer = BatchWriter("Test", backend.write, batch_size=3)
+    writer.put(0)
+
+    # Let the first write start and get stuck, then queue up more behind it
+    await asyncio.sleep(0.1)
+    for i in range(1, 6):
+        assert writer.put(i)
+    assert writer.depth() == 5
+    assert writer.max_depth == 5
+    backend.release.set()
+    await writer.stop()
+    assert backend.batches == [[0], [1, 2, 3], [4, 5]]
+    assert writer.stats()['batches'] == 3
+
+
+@pytest.mark.asyncio
+async def test_samples_then_drops_under_backpressure():
+    backend = SlowBackend()
+    backend.release.clear()
+    writer = BatchWriter("Test", backend.write, queue_size=20)
+    writer.put("stuck")
+    await asyncio.sleep(0.1)
+
+    # The first 15 items fill the queue to its high water mark, then only one of every SAMPLE_RATE gets kept.
+    accepted = [writer.put(i) for i in range(15 + 5 * SAMPLE_RATE)]
+    assert all(accepted[:15])
+    assert sum(accepted[15:]) == 5
+    assert writer.depth() == 20
+    assert writer.sampled_out == 5 * (SAMPLE_RATE - 1)
+
+    # Once it's full everything gets dropped
+    assert not writer.put("dropped")
+    assert writer.dropped == 1
+    backend.release.set()
+    await writer.stop()
+    assert writer.written == 21
+
+
+@pytest.mark.asyncio
+async def test_failures_are_counted():
+    backend = SlowBackend()
+    backend.fail = True
+    writer = BatchWriter("Test", backend.write)
+    writer.put("a")
+    await writer.stop()
+    assert writer.failures == 1
+    assert writer.written == 0
+
+    # The writer keeps going after a failure
+    backend.fail = False
+    writer.put("b")
+    await writer.stop()
+    assert backend.batches == [["b"]]
+
+
+def test_writes_immediately_without_event_loop():
+    backend = SlowBackend()
+    writer = BatchWriter("Test", backend.write)
+    assert writer.put("a")
+    assert backend.batches == [["a"]]
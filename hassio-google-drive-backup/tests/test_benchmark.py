@@ -0,0 +1,84 @@
+from typing import Dict
+
+from backup.model.backupscheme import GenerationalPlanner, GenerationalScheme, OldestScheme, Partition
+from dev.benchmark import backups, retention, sync
+from dev.benchmark.__main__ import parseSize
+from dev.benchmark.harness import runIsolated
+
+
+def test_parse_size():
+    assert parseSize("100") == 100
+    assert parseSize("10KB") == 10 * 1024
+    assert parseSize("1.5mb") == int(1.5 * 1024 * 1024)
+    assert parseSize("2G") == 2 * 1024 * 1024 * 1024
+
+
+def test_sync_benchmark():
+    result = runIsolated(sync.runCase, {'count': 3, 'size': 100 * 1024, 'latency': 0, 'bandwidth': 0})
+    assert result['initial']['timings']['DriveRequests.create']['calls'] == 3
+    assert result['initial']['bytes_uploaded'] > 3 * 100 * 1024
+    assert result['initial']['requests']['drive_upload'] >= 3
+    assert result['steady']['bytes_uploaded'] == 0
+    assert 'DriveRequests.create' not in result['steady']['timings']
+    assert result['peak_rss_bytes'] > 0
+
+
+def test_retention_benchmark():
+    result = runIsolated(retention.runCase, {'months': 2, 'days': 1, 'generational': True, 'existing': 10})
+    assert result['created'] >= 59
+    assert not result['truncated']
+    assert result['backups_per_second'] > 0
+    assert result['peak_rss_bytes'] > 0
+
+
+def countCalls(monkeypatch, cls, name: str) -> Dict[str, int]:
+    counts = {'calls': 0}
+    original = getattr(cls, name)
+
+    def counted(*args, **kwargs):
+        counts['calls'] += 1
+        return original(*args, **kwargs)
+    monkeypatch.setattr(cls, name, counted)
+    return counts
+
+
+def test_retention_work_per_backup(monkeypatch):
+    # Machine independent stand-ins for speed: each simulated backup should only lay out and make partitions for its
+    # own day, not redo all of them or work out purges from scratch.
+    relayouts = countCalls(monkeypatch, GenerationalPlanner, "_relayout")
+    partitions = countCalls(monkeypatch, Partition, "__init__")
+    rebuilds = countCalls(monkeypatch, GenerationalScheme, "_buildPartitions")
+    days = countCalls(monkeypatch, GenerationalScheme, "_buildDays")
+    others = [countCalls(monkeypatch, GenerationalScheme, name) for name in ["_buildWeeks", "_buildMonths", "_buildYears"]]
+    result = retention.runCase({'months': 24, 'days': 1, 'generational': True, 'existing': 100})
+
+    created = result['created']
+    assert created >= 730
+    assert not result['truncated']
+
+    # Once in each of the two sources when a backup starts a new day
+    assert relayouts['calls'] <= 2 * created + 10
+    # A layout is about 30 partitions, but usually only the newest day's is new
+    assert partitions['calls'] <= 3 * created
+    # Only Model.sync() lays out every partition from scratch
+    assert rebuilds['calls'] <= 2
+    # Weeks, months and years only get laid out again when they change
+    assert days['calls'] <= created + 10
+    for other in others:
+        assert other['calls'] <= created / 5
+
+
+def test_retention_work_per_backup_without_generational(monkeypatch):
+    oldest = countCalls(monkeypatch, OldestScheme, "getOldest")
+    result = retention.runCase({'months': 24, 'days': 1, 'generational': False, 'existing': 100})
+    assert result['created'] >= 730
+
+    # The simulation keeps its backups in an OldestPlanner rather than asking the scheme for every purge
+    assert oldest['calls'] <= 2
+
+
+def test_backups_benchmark():
+    result = runIsolated(backups.runCase, {'count': 100})
+    assert result['bytes_per_backup'] > 0
+    assert set(result['ns_per_call'].keys()) == {'name', 'slug', 'date', 'size', 'version', 'ignore', 'note', 'isPending'}
+    assert result['sort_seconds'] >= 0
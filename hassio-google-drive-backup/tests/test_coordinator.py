@@ -550,3 +550,24 @@ async def test_precaching(coord: Coordinator, precache: DestinationPrecache, des
     assert dest.query_count == 1
     assert precache.cached(dest.name(), time.now()) is None
     assert global_info._last_error is None
+
+
+@pytest.mark.asyncio
+async def test_version_tracks_changes(coord: Coordinator, backup: Backup, simple_config: Config):
+    version = coord.version()
+    metrics = coord.buildBackupMetrics()
+    assert coord.version() == version
+    assert coord.buildBackupMetrics() is metrics
+
+    # Changing a backup, syncing, or changing config should all invalidate anything built from the backups
+    await coord.note("note", backup.slug())
+    assert coord.version() != version
+    assert coord.buildBackupMetrics() is not metrics
+
+    version = coord.version()
+    await coord.sync()
+    assert coord.version() != version
+
+    version = coord.version()
+    simple_config.override(Setting.MAX_BACKUPS_IN_HA, 10)
+    assert coord.version() != version
@@ -11,7 +11,7 @@ from dev.simulationserver import SimulationServer
 from dev.simulated_google import SimulatedGoogle, URL_MATCH_UPLOAD_PROGRESS, URL_MATCH_FILE
 from dev.request_interceptor import RequestInterceptor
 from backup.drive import DriveSource, FolderFinder, DriveRequests, RETRY_SESSION_ATTEMPTS, UPLOAD_SESSION_EXPIRATION_DURATION, URL_START_UPLOAD
-from backup.drive.driverequests import (BASE_CHUNK_SIZE, CHUNK_UPLOAD_TARGET_SECONDS)
+from backup.drive.driverequests import BASE_CHUNK_SIZE
 from backup.drive.drivesource import FOLDER_MIME_TYPE
 from backup.exceptions import (BackupFolderInaccessible, BackupFolderMissingError,
                                DriveQuotaExceeded, ExistingBackupFolderError,
@@ -21,6 +21,7 @@ from backup.exceptions import (BackupFolderInaccessible, BackupFolderMissingErro
 from backup.creds import Creds
 from backup.model import DriveBackup, DummyBackup
 from .faketime import FakeTime
+from backup.util import DataCache, KEY_UPLOAD_SESSION, SegmentedDownload
 from .helpers import compareStreams, createBackupTar
 
 RETRY_EXHAUSTION_SLEEPS = [2, 4, 8, 16, 32]
@@ -234,36 +235,6 @@ async def test_upload_resume(drive: DriveSource, time, backup_helper: BackupHelp
     await compareStreams(data, await drive.read(from_backup))
 
 
-def test_chunk_size(drive: DriveSource, config: Config):
-    max = config.get(Setting.MAXIMUM_UPLOAD_CHUNK_BYTES) / BASE_CHUNK_SIZE
-    assert drive.drivebackend._getNextChunkSize(
-        1000000000, 0) == max
-    assert drive.drivebackend._getNextChunkSize(
-        1, CHUNK_UPLOAD_TARGET_SECONDS) == 1
-    assert drive.drivebackend._getNextChunkSize(
-        1000000000, CHUNK_UPLOAD_TARGET_SECONDS) == max
-    assert drive.drivebackend._getNextChunkSize(
-        1, CHUNK_UPLOAD_TARGET_SECONDS) == 1
-    assert drive.drivebackend._getNextChunkSize(
-        1, 1) == CHUNK_UPLOAD_TARGET_SECONDS
-    assert drive.drivebackend._getNextChunkSize(
-        1, 1.01) == CHUNK_UPLOAD_TARGET_SECONDS - 1
-
-
-def test_chunk_size_limits(drive: DriveSource, config: Config):
-    config.override(Setting.MAXIMUM_UPLOAD_CHUNK_BYTES, 1)
-    assert drive.drivebackend._getNextChunkSize(1000000000, 0) == 1
-    assert drive.drivebackend._getNextChunkSize(1, 1000000) == 1
-
-    config.override(Setting.MAXIMUM_UPLOAD_CHUNK_BYTES, BASE_CHUNK_SIZE * 1.5)
-    assert drive.drivebackend._getNextChunkSize(1000000000, 0) == 1
-    assert drive.drivebackend._getNextChunkSize(1, 1000000) == 1
-
-    config.override(Setting.MAXIMUM_UPLOAD_CHUNK_BYTES, BASE_CHUNK_SIZE * 3.5)
-    assert drive.drivebackend._getNextChunkSize(1000000000, 0) == 3
-    assert drive.drivebackend._getNextChunkSize(1, 1000000) == 1
-
-
 @pytest.mark.asyncio
 async def test_working_through_upload(drive: DriveSource, server: SimulationServer, backup_helper: BackupHelper, interceptor: RequestInterceptor):
     assert not drive.isWorking()
@@ -393,6 +364,35 @@ async def test_resume_session_abandoned_on_http4XX(time, drive: DriveSource, con
     await compareStreams(data, download)
 
 
+@pytest.mark.asyncio
+async def test_resume_upload_after_restart(drive: DriveSource, time, backup_helper, interceptor: RequestInterceptor, google: SimulatedGoogle, data_cache: DataCache):
+    # Allow an upload to update one chunk and then fail.
+    from_backup, data = await backup_helper.createFile()
+    interceptor.setError(URL_MATCH_UPLOAD_PROGRESS, fail_after=1, status=500)
+    with pytest.raises(GoogleInternalError):
+        await drive.save(from_backup, data)
+    assert google.chunks == [BASE_CHUNK_SIZE]
+    last_location = drive.drivebackend.last_attempt_location
+    assert data_cache.backup(from_backup.slug())[KEY_UPLOAD_SESSION]['location'] == last_location
+
+    # Forget everything kept in memory, like an addon restart would
+    drive.drivebackend.last_attempt_location = None
+    drive.drivebackend.last_attempt_metadata = None
+    drive.drivebackend.last_attempt_count = 0
+    drive.drivebackend.last_attempt_start_time = None
+
+    # The upload should pick up from the saved session instead of starting over
+    interceptor.clear()
+    data.position(0)
+    drive_backup = await drive.save(from_backup, data)
+    assert not interceptor.urlWasCalled(URL_START_UPLOAD)
+    assert interceptor.urlWasCalled(URL(last_location).path)
+    assert google.chunks[0] == BASE_CHUNK_SIZE
+    assert sum(google.chunks) == data.size()
+    assert KEY_UPLOAD_SESSION not in data_cache.backup(from_backup.slug())
+    from_backup.addSource(drive_backup)
+
+
 @pytest.mark.asyncio
 async def test_resume_session_abandoned_after_a_long_time(time: FakeTime, drive: DriveSource, config: Config, server: SimulationServer, backup_helper, interceptor: RequestInterceptor):
     from_backup, data = await backup_helper.createFile()
@@ -468,6 +468,8 @@ async def test_resume_session_reused_on_http5XX(time, drive: DriveSource, config
 
 @pytest.mark.asyncio
 async def test_resume_session_reused_abonded_after_retries(time, drive: DriveSource, config: Config, server: SimulationServer, backup_helper, interceptor: RequestInterceptor):
+    # Keep chunks small so every upload below is more than one chunk, even though the chunk size carries over between uploads.
+    config.override(Setting.MAXIMUM_UPLOAD_CHUNK_BYTES, BASE_CHUNK_SIZE)
     from_backup, data = await backup_helper.createFile()
 
     # Configure the upload to fail after the first upload chunk
@@ -868,6 +870,27 @@ async def test_download_timeout(time, drive: DriveSource, config: Config, interc
         await compareStreams(data, download)
 
 
+@pytest.mark.asyncio
+async def test_segmented_download(time, drive: DriveSource, config: Config, backup_helper):
+    config.override(Setting.DRIVE_DOWNLOAD_SEGMENT_BYTES, 256 * 1024)
+    from_backup, data = await backup_helper.createFile()
+    backup = await drive.save(from_backup, data)
+    from_backup.addSource(backup)
+
+    download = await drive.read(from_backup)
+    assert isinstance(download, SegmentedDownload)
+    data.position(0)
+    async with download:
+        await compareStreams(data, download)
+
+    # A single connection uses a plain AsyncHttpGetter
+    config.override(Setting.DRIVE_DOWNLOAD_CONNECTIONS, 1)
+    download = await drive.read(from_backup)
+    assert not isinstance(download, SegmentedDownload)
+    data.position(0)
+    await compareStreams(data, download)
+
+
 @pytest.mark.asyncio
 async def test_resume_session_ignored_on_http404(time, drive: DriveSource, config: Config, server: SimulationServer, backup_helper: BackupHelper, interceptor: RequestInterceptor):
     from_backup, data = await backup_helper.createFile()
@@ -1046,3 +1069,121 @@ async def test_note_creation(drive: DriveSource, time: FakeTime, folder_finder:
     from_backup, data = await backup_helper.createFile(note="test")
     backup = await drive.save(from_backup, data)
     assert backup.note() == "test"
+
+
+@pytest.mark.asyncio
+async def test_sync_uses_changes(drive: DriveSource, backup_helper, google: SimulatedGoogle, interceptor: RequestInterceptor):
+    from_backup, data = await backup_helper.createFile()
+    await drive.save(from_backup, data)
+    assert list((await drive.get()).keys()) == ["testslug"]
+
+    # Nothing changed, so only the changes api should get called
+    interceptor.clear()
+    assert list((await drive.get()).keys()) == ["testslug"]
+    assert interceptor.urlWasCalled("^/drive/v3/changes\\?")
+    assert not interceptor.urlWasCalled("^/drive/v3/files/\\?")
+    assert not interceptor.urlWasCalled("^/drive/v3/about")
+
+    # New backups, trashed backups and deleted backups all get picked up from the changes
+    from_backup, data = await backup_helper.createFile(slug="second")
+    second = await drive.save(from_backup, data)
+    assert (await drive.get()).keys() == {"testslug", "second"}
+
+    await drive.drivebackend.update(second.id(), {"trashed": True})
+    assert list((await drive.get()).keys()) == ["testslug"]
+
+    first = (await drive.get())["testslug"]
+    await drive.drivebackend.delete(first.id())
+    assert len(await drive.get()) == 0
+    assert not interceptor.urlWasCalled("^/drive/v3/files/\\?")
+
+
+@pytest.mark.asyncio
+async def test_sync_changes_in_other_folders_ignored(drive: DriveSource, backup_helper, google: SimulatedGoogle):
+    await drive.get()
+    from_backup, data = await backup_helper.createFile()
+    backup = await drive.save(from_backup, data)
+    assert len(await drive.get()) == 1
+
+    # Moving the backup somewhere else means it isn't in the backup folder anymore
+    google.items[backup.id()]['parents'] = ["somewhere else"]
+    google.changes.append(backup.id())
+    assert len(await drive.get()) == 0
+
+
+@pytest.mark.asyncio
+async def test_sync_expired_changes_token(drive: DriveSource, backup_helper, google: SimulatedGoogle, interceptor: RequestInterceptor):
+    from_backup, data = await backup_helper.createFile()
+    await drive.save(from_backup, data)
+    assert len(await drive.get()) == 1
+
+    # Drive no longer recognizes the token, so the folder has to be listed again
+    google.expireChangeTokens()
+    interceptor.clear()
+    assert len(await drive.get()) == 1
+    assert interceptor.urlWasCalled("^/drive/v3/changes\\?")
+    assert interceptor.urlWasCalled("^/drive/v3/files/\\?")
+
+    # And the new token works
+    interceptor.clear()
+    assert len(await drive.get()) == 1
+    assert not interceptor.urlWasCalled("^/drive/v3/files/\\?")
+
+
+@pytest.mark.asyncio
+async def test_sync_full_listing_interval(drive: DriveSource, config: Config, time: FakeTime, interceptor: RequestInterceptor):
+    config.override(Setting.DRIVE_FULL_SYNC_INTERVAL_SECONDS, 60 * 60)
+    await drive.get()
+
+    interceptor.clear()
+    time.advance(minutes=59)
+    await drive.get()
+    assert not interceptor.urlWasCalled("^/drive/v3/files/\\?")
+
+    time.advance(minutes=1)
+    await drive.get()
+    assert interceptor.urlWasCalled("^/drive/v3/files/\\?")
+
+
+@pytest.mark.asyncio
+async def test_sync_changes_disabled(drive: DriveSource, config: Config, interceptor: RequestInterceptor):
+    config.override(Setting.DRIVE_FULL_SYNC_INTERVAL_SECONDS, 0)
+    await drive.get()
+    interceptor.clear()
+    await drive.get()
+    assert interceptor.urlWasCalled("^/drive/v3/files/\\?")
+    assert not interceptor.urlWasCalled("^/drive/v3/changes.*")
+
+
+@pytest.mark.asyncio
+async def test_delete_many(drive: DriveSource, backup_helper, google: SimulatedGoogle, interceptor: RequestInterceptor):
+    backups = []
+    for slug in ["first", "second", "third"]:
+        from_backup, data = await backup_helper.createFile(slug=slug)
+        from_backup.addSource(await drive.save(from_backup, data))
+        backups.append(from_backup)
+    assert len(await drive.get()) == 3
+
+    interceptor.clear()
+    await drive.deleteMany(backups)
+    assert len([url for url in interceptor._history if url.startswith("/batch/")]) == 1
+    assert len(await drive.get()) == 0
+    for backup in backups:
+        assert backup.getSource(drive.name()) is None
+
+
+@pytest.mark.asyncio
+async def test_delete_many_partial_failure(drive: DriveSource, backup_helper, google: SimulatedGoogle, interceptor: RequestInterceptor):
+    backups = []
+    for slug in ["first", "second"]:
+        from_backup, data = await backup_helper.createFile(slug=slug)
+        from_backup.addSource(await drive.save(from_backup, data))
+        backups.append(from_backup)
+
+    # The backup that could be deleted should be, and the error for the other should still be raised.
+    interceptor.setError("^/drive/v3/files/" + backups[1].getSource(drive.name()).id() + "/$", status=400)
+    with pytest.raises(ClientResponseError):
+        await drive.deleteMany(backups)
+    assert backups[0].getSource(drive.name()) is None
+    assert backups[1].getSource(drive.name()) is not None
+    assert list((await drive.get()).keys()) == ["second"]
@@ -1,6 +1,7 @@
 import asyncio
 from datetime import timedelta
 import os
+from time import monotonic
 
 import pytest
 from aiohttp.client_exceptions import ClientResponseError
@@ -9,7 +10,7 @@ from backup.config import Config, Setting, CreateOptions, Version
 from backup.const import SOURCE_HA
 from backup.exceptions import (HomeAssistantDeleteError, BackupInProgress,
                                BackupPasswordKeyInvalid, UploadFailed, SupervisorConnectionError, SupervisorPermissionError, SupervisorTimeoutError, UnknownNetworkStorageError, InactiveNetworkStorageError)
-from backup.util import GlobalInfo, DataCache, KEY_CREATED, KEY_LAST_SEEN, KEY_NAME
+from backup.util import GlobalInfo, DataCache, AsyncFileGetter, KEY_CREATED, KEY_LAST_SEEN, KEY_NAME
 from backup.ha import HaSource, PendingBackup, EVENT_BACKUP_END, EVENT_BACKUP_START, HABackup, Password, AddonStopper
 from backup.model import DummyBackup
 from dev.simulationserver import SimulationServer
@@ -445,6 +446,7 @@ async def test_failed_backup_retry(ha: HaSource, time: FakeTime, config: Config,
 
     assert await ha.check()
     assert not await ha.check()
+    assert ha.nextCheck() == time.now() + timedelta(seconds=config.get(Setting.FAILED_BACKUP_TIMEOUT_SECONDS))
     time.advance(seconds=config.get(Setting.FAILED_BACKUP_TIMEOUT_SECONDS))
 
     # should trigger a sync after the failed backup timeout
@@ -946,6 +948,25 @@ async def test_ignore_upgrade_backup_empty(ha: HaSource, time: Time, supervisor:
     assert not backups[slug].ignore()
 
 
+@pytest.mark.asyncio
+async def test_ignore_updates_listed_backup(ha: HaSource, time: Time, supervisor: SimulatedSupervisor, config: Config, data_cache: DataCache):
+    config.override(Setting.IGNORE_OTHER_BACKUPS, True)
+    slug = (await ha.harequests.createBackup({'name': "Suddenly Appears", 'folders': [], 'addons': []}))['slug']
+    listed = (await ha.get())[slug]
+    assert listed.ignore()
+    assert not listed.madeByTheAddon()
+
+    # The backup already listed sees the change without HaSource listing it again
+    full = DummyBackup(listed.name(), listed.date(), listed.size(), listed.slug(), "dummy")
+    full.addSource(listed)
+    await ha.ignore(full, False)
+    assert not listed.ignore()
+    assert not (await ha.get())[slug].ignore()
+
+    await ha.ignore(full, True)
+    assert listed.ignore()
+
+
 @pytest.mark.asyncio
 async def test_very_long_running_backup(time, config, ha: HaSource, supervisor: SimulatedSupervisor):
     config.override(Setting.NEW_BACKUP_TIMEOUT_SECONDS, 1)
@@ -1166,3 +1187,93 @@ async def test_exclude_database(ha: HaSource, time, config: Config, supervisor:
         backup = await ha.create(CreateOptions(time.now(), "Test Name"))
         assert isinstance(backup, PendingBackup)
         assert backup._request_info['homeassistant_exclude_database']
+
+
+async def createWrappedBackup(ha: HaSource, time) -> DummyBackup:
+    created: HABackup = await ha.create(CreateOptions(time.now(), "Test Name"))
+    from_ha = await ha.harequests.backup(created.slug())
+    backup = DummyBackup(from_ha.name(), from_ha.date(), from_ha.size(), from_ha.slug(), "dummy")
+    backup.addSource(from_ha)
+    return backup
+
+
+@pytest.mark.asyncio
+async def test_read_local_backup_file(ha: HaSource, time, interceptor: RequestInterceptor, supervisor: SimulatedSupervisor, config: Config) -> None:
+    backup = await createWrappedBackup(ha, time)
+    other = await createWrappedBackup(ha, time)
+    data = supervisor._backup_data[backup.slug()]
+    directory = config.get(Setting.BACKUP_DIRECTORY_PATH)
+    os.makedirs(directory, exist_ok=True)
+
+    # Newer supervisors name the files after the backup instead of its slug, and not everything in there is a backup
+    with open(os.path.join(directory, "Full_Backup.tar"), "wb") as f:
+        f.write(data)
+    with open(os.path.join(directory, other.slug() + ".tar"), "wb") as f:
+        f.write(supervisor._backup_data[other.slug()])
+    with open(os.path.join(directory, "not_a_backup.tar"), "wb") as f:
+        f.write(b"junk")
+
+    download = await ha.read(backup)
+    assert isinstance(download, AsyncFileGetter)
+    async with download:
+        assert download.size() == len(data)
+        assert (await download.read(len(data))).getbuffer() == data
+    assert not interceptor.urlWasCalled(URL_MATCH_BACKUP_DOWNLOAD)
+
+    # Files only get opened once to find out which backup is in them
+    ha._readSlug = None
+    download = await ha.read(other)
+    assert isinstance(download, AsyncFileGetter)
+    async with download:
+        assert (await download.read(10)).getbuffer() == supervisor._backup_data[other.slug()][:10]
+    assert not interceptor.urlWasCalled(URL_MATCH_BACKUP_DOWNLOAD)
+
+
+@pytest.mark.asyncio
+async def test_read_falls_back_to_supervisor(ha: HaSource, time, interceptor: RequestInterceptor, supervisor: SimulatedSupervisor, config: Config) -> None:
+    backup = await createWrappedBackup(ha, time)
+
+    # The backup's file isn't on disk
+    download = await ha.read(backup)
+    assert not isinstance(download, AsyncFileGetter)
+
+    # The backup is on network storage, so the local file (if there is one) shouldn't be trusted
+    os.makedirs(config.get(Setting.BACKUP_DIRECTORY_PATH), exist_ok=True)
+    with open(os.path.join(config.get(Setting.BACKUP_DIRECTORY_PATH), backup.slug() + ".tar"), "wb") as f:
+        f.write(supervisor._backup_data[backup.slug()])
+    backup.getSource(ha.name()).details()['location'] = "some_nas"
+    download = await ha.read(backup)
+    assert not isinstance(download, AsyncFileGetter)
+    async with download:
+        assert (await download.read(10)).getbuffer() == supervisor._backup_data[backup.slug()][:10]
+    assert interceptor.urlWasCalled(URL_MATCH_BACKUP_DOWNLOAD)
+
+
+@pytest.mark.asyncio
+async def test_backup_details_fetched_concurrently(ha: HaSource, supervisor: SimulatedSupervisor, config: Config, time: FakeTime):
+    slugs = []
+    for i in range(12):
+        slugs.append(await supervisor.createBackup({'name': "Backup {0}".format(i)}, date=time.now() - timedelta(days=i)))
+    config.override(Setting.SUPERVISOR_MAX_CONCURRENT_REQUESTS, 4)
+
+    # Information about the supervisor gets requested all at once, except mount info which has to wait for the version
+    supervisor.setLatency(0.1)
+    await ha.init()
+    assert supervisor.max_in_flight == 5
+
+    # One after another, the 12 backups and other requests would take well over a second.
+    supervisor.setLatency(0.1)
+    start = monotonic()
+    backups = await ha.get()
+    assert monotonic() - start < 1
+    assert list(backups.keys()) == slugs
+    assert supervisor.max_in_flight == 4
+
+
+@pytest.mark.asyncio
+async def test_backup_details_failure(ha: HaSource, supervisor: SimulatedSupervisor, interceptor: RequestInterceptor, time: FakeTime):
+    for i in range(5):
+        await supervisor.createBackup({'name': "Backup {0}".format(i)}, date=time.now() - timedelta(days=i))
+    interceptor.setError("^/backups/.*/info$", status=500)
+    with pytest.raises(ClientResponseError):
+        await ha.get()
@@ -0,0 +1,29 @@
+import asyncio
+
+from backup.logger import HistoryHandler, getLogger
+
+logger = getLogger(__name__)
+
+
+def test_listener_on_closed_loop_is_dropped():
+    handler = HistoryHandler()
+    loop = asyncio.new_event_loop()
+    loop.close()
+    woken = []
+
+    def onClosedLoop():
+        loop.call_soon_threadsafe(lambda: None)
+    handler.addListener(onClosedLoop)
+    handler.addListener(lambda: woken.append(True))
+
+    logger.addHandler(handler)
+    try:
+        logger.info("First")
+        logger.info("Second")
+    finally:
+        logger.removeHandler(handler)
+
+    # The broken listener got dropped without getting in the way of the other one
+    assert woken == [True, True]
+    assert onClosedLoop not in handler._listeners
+    assert [line for _, line in handler.getHistory()][-2:] == ["First", "Second"]
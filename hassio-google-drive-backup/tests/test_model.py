@@ -1,3 +1,4 @@
+import asyncio
 from datetime import datetime, timedelta, timezone
 
 import pytest
@@ -6,7 +7,7 @@ from dateutil.tz import gettz
 from backup.config import Config, Setting, CreateOptions
 from backup.exceptions import DeleteMutlipleBackupsError
 from backup.util import GlobalInfo, DataCache
-from backup.model import Model, BackupSource
+from backup.model import Model, BackupSource, Backup, DummyBackupSource
 from .faketime import FakeTime
 from .helpers import HelperTestSource, IntentionalFailure
 
@@ -215,6 +216,103 @@ async def test_removal(model: Model, time, source, dest):
     assert len(model.backups) == 0
 
 
+def test_backup_follows_its_sources(time):
+    in_source = DummyBackupSource("Source Name", time.now(), "Source", "slug")
+    in_dest = DummyBackupSource("Dest Name", time.now() - timedelta(days=1), "Dest", "slug")
+    backup = Backup(in_source)
+    assert backup.name() == "Source Name"
+    assert not backup.isPending()
+
+    # The first source a backup was seen in keeps speaking for it until it goes away
+    backup.addSource(in_dest)
+    assert backup.name() == "Source Name"
+    assert backup.date() == time.now()
+
+    backup.removeSource("Source")
+    assert backup.name() == "Dest Name"
+    assert backup.date() == time.now() - timedelta(days=1)
+    assert backup.version() == "dummy_version"
+
+    backup.removeSource("Dest")
+    assert backup.isDeleted()
+    assert backup.name() == "error"
+    assert backup.slug() == "error"
+    assert backup.version() is None
+    assert backup.details() == {}
+
+
+@pytest.mark.asyncio
+async def test_sync_lists_sources_concurrently(model: Model, time, source: HelperTestSource, dest: HelperTestSource, global_info: GlobalInfo):
+    backup_source = await source.create(CreateOptions(time.now(), "name"))
+    started = {source.name(): asyncio.Event(), dest.name(): asyncio.Event()}
+
+    def waitForOther(listed: HelperTestSource, other: HelperTestSource, seconds: int):
+        get = listed.get
+
+        async def wrapped():
+            started[listed.name()].set()
+            # Only returns if the other source is being listed at the same time
+            await asyncio.wait_for(started[other.name()].wait(), timeout=5)
+            time.advance(seconds=seconds)
+            return await get()
+        return wrapped
+    source.get = waitForOther(source, dest, 2)
+    dest.get = waitForOther(dest, source, 3)
+
+    await model._syncBackups([source, dest], time.now())
+    assert list(model.backups.keys()) == [backup_source.slug()]
+    assert set(global_info.debug["source_list_seconds"].keys()) == {source.name(), dest.name()}
+
+
+@pytest.mark.asyncio
+async def test_sync_records_listing_time(model: Model, time, source: HelperTestSource, dest: HelperTestSource, global_info: GlobalInfo):
+    get = source.get
+
+    async def slowGet():
+        time.advance(seconds=3)
+        return await get()
+    source.get = slowGet
+    await model._syncBackups([source, dest], time.now())
+    assert global_info.debug["source_list_seconds"] == {source.name(): 3, dest.name(): 0}
+
+    # Disabled sources aren't listed, so they aren't timed
+    dest.setEnabled(False)
+    await model._syncBackups([source, dest], time.now())
+    assert global_info.debug["source_list_seconds"] == {source.name(): 3}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("failing", ["Source", "Dest"])
+async def test_sync_listing_failure_cancels_other_sources(model: Model, time, source: HelperTestSource, dest: HelperTestSource, failing: str):
+    await source.create(CreateOptions(time.now(), "name"))
+    await model._syncBackups([source, dest], time.now())
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def failingGet():
+        await started.wait()
+        raise IntentionalFailure()
+
+    async def hangingGet():
+        started.set()
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+    if failing == source.name():
+        source.get = failingGet
+        dest.get = hangingGet
+    else:
+        # The source still being listed mustn't hold up reporting the destination's failure
+        source.get = hangingGet
+        dest.get = failingGet
+    with pytest.raises(IntentionalFailure):
+        await asyncio.wait_for(model._syncBackups([source, dest], time.now()), timeout=5)
+    assert cancelled.is_set()
+    assert len(model.backups) == 1
+
+
 @pytest.mark.asyncio
 async def test_new_backup(model: Model, source, dest, time):
     await model.sync(time.now())
@@ -624,6 +722,29 @@ async def test_delete_after_upload_multiple_deletes(time: FakeTime, model: Model
     dest.assertThat(saved=2, current=2)
 
 
+@pytest.mark.asyncio
+async def test_purge_multiple_in_one_batch(time: FakeTime, model: Model, dest: HelperTestSource, source: HelperTestSource, global_info: GlobalInfo):
+    source.setMax(3)
+    dest.setMax(3)
+    for i in range(3):
+        source.insert("Src {0}".format(i), time.now())
+        time.advance(days=1)
+    await model.sync(time.now())
+    source.reset()
+    dest.reset()
+
+    # Lowering the limit means two backups need to go from each source, which should happen in a single call
+    global_info.allowMultipleDeletes()
+    source.setMax(1)
+    dest.setMax(1)
+    await model.sync(time.now())
+    source.assertThat(deleted=2, current=1)
+    dest.assertThat(deleted=2, current=1)
+    assert source.delete_batches == [2]
+    assert dest.delete_batches == [2]
+    assert len(model.backups) == 1
+
+
 @pytest.mark.asyncio
 async def test_delete_after_upload_simple_sync(time: FakeTime, model: Model, dest: HelperTestSource, source: HelperTestSource, global_info: GlobalInfo):
     model.config.override(Setting.DELETE_AFTER_UPLOAD, True)
@@ -1,10 +1,12 @@
 from datetime import datetime, timedelta
+from random import Random
 
 import pytest
 from dateutil.tz import tzutc
 from pytest import fail
 
-from backup.model import GenConfig, GenerationalScheme, DummyBackup, Backup
+from backup.model import GenConfig, GenerationalScheme, DummyBackup, Backup, OldestScheme
+from backup.model.backupscheme import DeleteAfterUploadScheme, Partition, LocalDays, DayIndex
 from backup.time import Time
 
 
@@ -384,6 +386,137 @@ async def test_ignored_generational_labels(time):
     assert backup3.getStatusDetail() is None
 
 
+def randomBackups(time, random: Random):
+    start = time.local(random.randint(2015, 2022), random.randint(1, 12), random.randint(1, 28), random.randint(0, 23))
+    span_hours = random.choice([12, 24 * 10, 24 * 90, 24 * 365 * 3])
+    backups = []
+    for x in range(random.randint(0, 60)):
+        if len(backups) > 0 and random.random() < 0.1:
+            # Some backups share a date
+            date = random.choice(backups).date()
+        else:
+            date = start + timedelta(minutes=random.randint(0, span_hours * 60))
+        backups.append(makeBackup("test{0}".format(x), date))
+    return backups
+
+
+def randomConfig(random: Random):
+    return GenConfig(
+        days=random.choice([0, 0, 1, 3, 7]),
+        weeks=random.choice([0, 0, 1, 4]),
+        months=random.choice([0, 0, 1, 6, 14]),
+        years=random.choice([0, 0, 1, 3]),
+        day_of_week=random.choice(['mon', 'wed', 'sun']),
+        day_of_month=random.randint(1, 28),
+        day_of_year=random.randint(1, 365),
+        aggressive=random.random() < 0.3)
+
+
+@pytest.mark.parametrize("seed", range(150))
+def test_generational_purge_order_matches_getoldest(time, seed):
+    random = Random(seed)
+    backups = randomBackups(time, random)
+    scheme = GenerationalScheme(time, randomConfig(random), count=random.randint(-1, 20))
+    assertSamePurgeOrder(scheme, backups)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_simple_purge_order_matches_getoldest(time, seed):
+    random = Random(seed)
+    backups = randomBackups(time, random)
+    assertSamePurgeOrder(OldestScheme(count=random.randint(-1, 20)), backups)
+    assertSamePurgeOrder(DeleteAfterUploadScheme("src", []), backups)
+    assertSamePurgeOrder(DeleteAfterUploadScheme("src", ["dest"]), backups)
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_planner_follows_adds_and_removes(time, seed):
+    random = Random(seed)
+    time.setTimeZone(random.choice(["EST", "Europe/Rome"]))
+    pool = randomBackups(time, random)
+    config = randomConfig(random)
+    count = random.randint(0, 10)
+    schemes = [
+        (GenerationalScheme(time, config, count=count), GenerationalScheme(time, config, count=count - 1)),
+        (OldestScheme(count=count), OldestScheme(count=count - 1)),
+    ]
+    for scheme, fewer in schemes:
+        current = pool[:len(pool) // 2]
+        planner = scheme.planner(current)
+        for x in range(len(pool)):
+            if len(current) > 0 and random.random() < 0.4:
+                backup = random.choice(current)
+                current.remove(backup)
+                planner.remove(backup)
+            else:
+                backup = pool[random.randrange(len(pool))]
+                backup = makeBackup("new", backup.date() + timedelta(hours=random.choice([0, 5, 30, 24 * 40])))
+                current.append(backup)
+                planner.add(backup)
+            for check in [scheme, fewer]:
+                expected_reason, expected = check.getOldest(current)
+                reason, oldest = planner.next(check)
+                assert oldest is expected
+                if expected is not None:
+                    assert describeReason(reason) == describeReason(expected_reason)
+
+
+def bruteForceSelect(time, part: Partition, sorted):
+    options = [s for s in sorted if part.start <= s.date() <= part.end - timedelta(milliseconds=1)]
+    preferred = [s for s in options if time.toLocal(s.date()).date() == time.toLocal(part.prefer).date()]
+    if len(preferred) > 0:
+        return max(preferred, key=Backup.date)
+    return min(options, default=None, key=Backup.date)
+
+
+@pytest.mark.parametrize("seed", range(30))
+@pytest.mark.parametrize("tz", ["EST", "America/New_York", "Europe/Paris", "Australia/Lord_Howe"])
+def test_partition_selection_matches_brute_force(time, seed, tz):
+    time.setTimeZone(tz)
+    random = Random(seed)
+    backups = randomBackups(time, random)
+    if len(backups) == 0:
+        return
+    scheme = GenerationalScheme(time, randomConfig(random))
+    sorted = list(backups)
+    sorted.sort(key=Backup.date)
+    for part in scheme._buildPartitions(DayIndex(list(sorted), scheme.days)):
+        assert part.selected is bruteForceSelect(time, part, sorted)
+
+
+def test_day_index_across_backward_clock_change(time):
+    # At 03:01 UTC on 1987-10-25 Goose Bay's clocks went from 00:01 back to 23:01 the day before
+    time.setTimeZone("America/Goose_Bay")
+    utc = tzutc()
+    backups = [
+        makeBackup("a", datetime(1987, 10, 25, 2, 30, tzinfo=utc)),
+        makeBackup("b", datetime(1987, 10, 25, 3, 0, 30, tzinfo=utc)),
+        makeBackup("c", datetime(1987, 10, 25, 3, 30, tzinfo=utc)),
+        makeBackup("d", datetime(1987, 10, 25, 3, 30, tzinfo=utc)),
+        makeBackup("e", datetime(1987, 10, 25, 5, 0, tzinfo=utc)),
+    ]
+    days = LocalDays(time)
+    index = DayIndex(list(backups), days)
+    for ordinal in set(index.ordinals):
+        for first in range(len(backups) + 1):
+            for last in range(first, len(backups) + 1):
+                preferred = [s for s in backups[first:last] if days.ordinal(s.date()) == ordinal]
+                assert index.latestOnDay(ordinal, first, last) is max(preferred, default=None, key=Backup.date)
+    assert index.latestOnDay(min(index.ordinals) - 1, 0, len(backups)) is None
+
+
+def test_local_days_follow_time_zone(time):
+    days = LocalDays(time)
+    date = datetime(2020, 1, 1, 3, tzinfo=tzutc())
+    time.setTimeZone("America/New_York")
+    assert days.ordinal(date) == datetime(2019, 12, 31).toordinal()
+    time.setTimeZone("Europe/Paris")
+    assert days.ordinal(date) == datetime(2020, 1, 1).toordinal()
+
+    days.retain([])
+    assert days.ordinal(date) == datetime(2020, 1, 1).toordinal()
+
+
 def getRemovalOrder(scheme, toCheck):
     backups = list(toCheck)
     removed = []
@@ -414,9 +547,37 @@ def assertRemovalOrder(scheme, toCheck, expected):
         removed.append(oldest.date())
         backups.remove(oldest)
         index += 1
+    assertSamePurgeOrder(scheme, toCheck)
     return removed
 
 
+def referencePurgeOrder(scheme, toCheck):
+    backups = list(toCheck)
+    order = []
+    while True:
+        reason, oldest = scheme.getOldest(backups)
+        if oldest is None:
+            return order
+        order.append((reason, oldest))
+        backups.remove(oldest)
+
+
+def describeReason(reason):
+    if isinstance(reason, Partition):
+        return (reason.details, reason.start, reason.end, reason.selected)
+    return reason
+
+
+def assertSamePurgeOrder(scheme, toCheck):
+    expected = referencePurgeOrder(scheme, toCheck)
+    actual = scheme.getPurgeOrder(list(toCheck))
+    assert [backup for reason, backup in actual] == [backup for reason, backup in expected]
+    assert [describeReason(reason) for reason, backup in actual] == [describeReason(reason) for reason, backup in expected]
+
+    # Every reason is its own object, like they are when getOldest() is called repeatedly
+    assert len(set(reason for reason, backup in actual)) == len(set(reason for reason, backup in expected))
+
+
 def makeBackup(slug, date, name=None, ignore=False) -> Backup:
     if not name:
         name = slug
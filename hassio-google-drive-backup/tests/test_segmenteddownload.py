@@ -0,0 +1,95 @@
+import pytest
+from aiohttp import ClientSession, ClientResponseError
+from aiohttp.web import Response
+from .conftest import Uploader
+from backup.exceptions import LogicError
+from backup.util import SegmentedDownload
+from dev.request_interceptor import RequestInterceptor
+from .conftest import FakeTime
+
+DATA = bytearray(range(100))
+
+
+async def makeDownload(uploader: Uploader, session: ClientSession, time: FakeTime, connections=3, segment_size=7) -> SegmentedDownload:
+    await uploader.upload(DATA)
+    return SegmentedDownload(uploader.host + "/readfile", {}, session, len(DATA), connections=connections, segment_size=segment_size, time=time)
+
+
+@pytest.mark.asyncio
+async def test_basics(uploader: Uploader, server, session: ClientSession, time: FakeTime):
+    download = await makeDownload(uploader, session, time)
+    async with download:
+        assert download.size() == len(DATA)
+        assert (await download.read(1)).read() == DATA[0:1]
+        assert (await download.read(20)).read() == DATA[1:21]
+        assert len(download._segments) <= 3
+
+        download.position(50)
+        assert (await download.read(3)).read() == DATA[50:53]
+        assert (await download.read(1000)).read() == DATA[53:]
+        assert (await download.read(1000)).read() == bytearray()
+
+        download.position(2)
+        assert (await download.read(2)).read() == DATA[2:4]
+    assert len(download._segments) == 0
+
+
+@pytest.mark.asyncio
+async def test_readinto(uploader: Uploader, server, session: ClientSession, time: FakeTime):
+    download = await makeDownload(uploader, session, time)
+    async with download:
+        buffer = bytearray(len(DATA) + 10)
+        assert await download.readinto(memoryview(buffer)) == len(DATA)
+        assert buffer[:len(DATA)] == DATA
+        assert download.progress() == 100
+
+
+@pytest.mark.asyncio
+async def test_no_setup_error(uploader: Uploader, server, session: ClientSession, time: FakeTime):
+    download = await makeDownload(uploader, session, time)
+    with pytest.raises(LogicError):
+        await download.read(1)
+
+
+@pytest.mark.asyncio
+async def test_retries_segments(uploader: Uploader, server, session: ClientSession, time: FakeTime, interceptor: RequestInterceptor):
+    download = await makeDownload(uploader, session, time)
+    interceptor.setError("/readfile", 500, fail_for=2)
+    async with download:
+        assert (await download.read(1000)).read() == DATA
+    assert download.reconnects == 2
+    assert time.sleeps == [2, 2]
+
+
+@pytest.mark.asyncio
+async def test_resumes_dropped_connection(uploader: Uploader, server, session: ClientSession, time: FakeTime, interceptor: RequestInterceptor):
+    download = await makeDownload(uploader, session, time, connections=1, segment_size=50)
+    intercept = interceptor.setError("/readfile")
+    intercept.addResponse(Response(status=206, body=bytes(DATA[0:10])))
+    async with download:
+        assert (await download.read(1000)).read() == DATA
+    assert download.reconnects == 1
+
+    # The cut off response, the one that resumed it, and the second segment
+    assert intercept.callCount() == 3
+
+
+@pytest.mark.asyncio
+async def test_gives_up_after_retries(uploader: Uploader, server, session: ClientSession, time: FakeTime, interceptor: RequestInterceptor):
+    download = await makeDownload(uploader, session, time, connections=1)
+    interceptor.setError("/readfile", 503)
+    async with download:
+        with pytest.raises(ClientResponseError):
+            await download.read(1000)
+    assert time.sleeps == [2, 4, 8, 16]
+
+
+@pytest.mark.asyncio
+async def test_client_errors_arent_retried(uploader: Uploader, server, session: ClientSession, time: FakeTime, interceptor: RequestInterceptor):
+    download = await makeDownload(uploader, session, time)
+    interceptor.setError("/readfile", 404)
+    async with download:
+        with pytest.raises(ClientResponseError):
+            await download.read(1000)
+    assert download.reconnects == 0
+    assert time.sleeps == []
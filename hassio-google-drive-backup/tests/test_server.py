@@ -1,9 +1,17 @@
 
+import asyncio
+import os
 import pytest
+from datetime import timedelta
 from yarl import URL
 from dev.simulationserver import SimulationServer
+from dev.simulated_google import SimulatedGoogle
+from dev.request_interceptor import RequestInterceptor
 from aiohttp import ClientSession, hdrs
-from backup.config import Config
+from backup.config import Config, Setting
+from backup.creds import Creds
+from backup.exceptions import GoogleCredentialsExpired
+from backup.server import RefreshCache
 from .faketime import FakeTime
 import json
 
@@ -57,3 +65,103 @@ async def test_log_to_firestore(time: FakeTime, server: SimulationServer, sessio
         assert r.status == 200
     assert server._authserver.error_store.last_error is not None
     assert server._authserver.error_store.last_error['report'] == data
+
+
+@pytest.mark.asyncio
+async def test_refresh_cached(server: SimulationServer, session: ClientSession, server_url: URL, google: SimulatedGoogle, interceptor: RequestInterceptor, time: FakeTime, config: Config):
+    refresh_token = google.creds().refresh_token
+    async with session.post(server_url.with_path("drive/refresh"), json={"refresh_token": refresh_token}) as r:
+        assert r.status == 200
+        first = await r.json()
+
+    # Asking again right away gets the same token without going to Google
+    async with session.post(server_url.with_path("drive/refresh"), json={"refresh_token": refresh_token}) as r:
+        assert r.status == 200
+        assert await r.json() == first
+    assert server._authserver.refresh_cache.stats()['hits'] == 1
+    assert server._authserver.refresh_cache.stats()['misses'] == 1
+
+    # But not once the cache expires
+    time.advance(seconds=config.get(Setting.AUTH_REFRESH_CACHE_SECONDS))
+    async with session.post(server_url.with_path("drive/refresh"), json={"refresh_token": refresh_token}) as r:
+        assert r.status == 200
+        assert (await r.json())['access_token'] != first['access_token']
+    assert server._authserver.refresh_cache.stats()['misses'] == 2
+
+
+@pytest.mark.asyncio
+async def test_refresh_cache_skips_replaced_token(server: SimulationServer, session: ClientSession, server_url: URL, google: SimulatedGoogle):
+    refresh_token = google.creds().refresh_token
+    async with session.post(server_url.with_path("drive/refresh"), json={"refresh_token": refresh_token}) as r:
+        assert r.status == 200
+        first = await r.json()
+
+    # An add-on replacing the cached token gets a new one from Google
+    async with session.post(server_url.with_path("drive/refresh"), json={"refresh_token": refresh_token, "access_token": first['access_token']}) as r:
+        assert r.status == 200
+        second = await r.json()
+        assert second['access_token'] != first['access_token']
+    assert server._authserver.refresh_cache.stats()['hits'] == 0
+    assert server._authserver.refresh_cache.stats()['misses'] == 2
+
+    # So once Google revokes the refresh token, the add-on finds out instead of getting the cached token forever
+    google.expireCreds()
+    async with session.post(server_url.with_path("drive/refresh"), json={"refresh_token": refresh_token, "access_token": second['access_token']}) as r:
+        assert r.status == 401
+
+
+@pytest.mark.asyncio
+async def test_refresh_coalesced(server: SimulationServer, session: ClientSession, server_url: URL, google: SimulatedGoogle, interceptor: RequestInterceptor):
+    refresh_token = google.creds().refresh_token
+    waiter = interceptor.setWaiter("^/oauth2/v4/token$")
+
+    async def refresh():
+        async with session.post(server_url.with_path("drive/refresh"), json={"refresh_token": refresh_token}) as r:
+            assert r.status == 200
+            return (await r.json())['access_token']
+    requests = [asyncio.create_task(refresh()) for _ in range(3)]
+    await waiter.waitForCall()
+    waiter.clear()
+    tokens = await asyncio.gather(*requests)
+    assert len(set(tokens)) == 1
+    assert waiter.callCount() == 1
+    assert server._authserver.refresh_cache.stats()['coalesced'] == 2
+
+
+@pytest.mark.asyncio
+async def test_refresh_cache_evicts(server: SimulationServer, config: Config, time: FakeTime):
+    config.override(Setting.AUTH_REFRESH_CACHE_MAX_ENTRIES, 2)
+    cache = RefreshCache(config, time)
+    calls = []
+
+    async def refresher(token):
+        calls.append(token)
+        return Creds(time, "id", time.now() + timedelta(hours=1), "access " + token, token)
+    for token in ["a", "b", "c"]:
+        await cache.refresh(token, lambda: refresher(token))
+    assert len(cache) == 2
+    assert cache.stats()['evictions'] == 1
+
+    # "a" was the least recently used, so it's the one that has to be refreshed again
+    await cache.refresh("b", lambda: refresher("b"))
+    await cache.refresh("a", lambda: refresher("a"))
+    assert calls == ["a", "b", "c", "a"]
+
+    # Failures aren't cached
+    async def fail():
+        raise GoogleCredentialsExpired()
+    for _ in range(2):
+        with pytest.raises(GoogleCredentialsExpired):
+            await cache.refresh("d", fail)
+    assert cache.stats()['misses'] == 6
+
+
+@pytest.mark.asyncio
+async def test_health_reports_worker(server: SimulationServer, session: ClientSession, server_url: URL):
+    async with session.get(server_url.with_path("health")) as r:
+        assert r.status == 200
+        health = await r.json()
+        assert health['status'] == 'ok'
+        assert health['worker']['pid'] == os.getpid()
+        assert health['worker']['index'] is None
+        assert health['worker']['refresh_cache']['entries'] == 0
@@ -0,0 +1,217 @@
+import time as clock
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+import pytest
+
+from backup.config import Config, Setting
+from backup.model import Model, RetentionSimulator
+from .faketime import FakeTime
+from .helpers import HelperTestSource
+
+
+@pytest.fixture
+def source():
+    return HelperTestSource("Source")
+
+
+@pytest.fixture
+def dest():
+    return HelperTestSource("Dest", is_destination=True)
+
+
+@pytest.fixture
+def simple_config() -> Config:
+    return Config().override(Setting.BACKUP_STARTUP_DELAY_MINUTES, 0).override(Setting.CONFIRM_MULTIPLE_DELETES, False)
+
+
+@pytest.fixture
+def model(source, dest, time, simple_config, global_info, estimator, data_cache):
+    return Model(simple_config, time, source, dest, global_info, estimator, data_cache)
+
+
+@pytest.fixture
+def simulator(model, time, global_info, estimator, data_cache):
+    return RetentionSimulator(model, time, global_info, estimator, data_cache)
+
+
+CONFIGS: List[Dict[Setting, Any]] = [
+    {},
+    {
+        Setting.MAX_BACKUPS_IN_HA: 2,
+        Setting.MAX_BACKUPS_IN_FILENIO: 6,
+        Setting.DAYS_BETWEEN_BACKUPS: 1,
+        Setting.BACKUP_TIME_OF_DAY: "04:00",
+    },
+    {
+        Setting.MAX_BACKUPS_IN_HA: 2,
+        Setting.MAX_BACKUPS_IN_FILENIO: 8,
+        Setting.DAYS_BETWEEN_BACKUPS: 1,
+        Setting.BACKUP_TIME_OF_DAY: "00:00",
+        Setting.GENERATIONAL_DAYS: 3,
+        Setting.GENERATIONAL_WEEKS: 2,
+        Setting.GENERATIONAL_MONTHS: 2,
+    },
+    {
+        Setting.MAX_BACKUPS_IN_HA: 3,
+        Setting.MAX_BACKUPS_IN_FILENIO: 5,
+        Setting.DAYS_BETWEEN_BACKUPS: 0.5,
+        Setting.GENERATIONAL_DAYS: 2,
+        Setting.GENERATIONAL_WEEKS: 1,
+        Setting.GENERATIONAL_DELETE_EARLY: True,
+    },
+    {
+        Setting.MAX_BACKUPS_IN_HA: 0,
+        Setting.MAX_BACKUPS_IN_FILENIO: 4,
+        Setting.DAYS_BETWEEN_BACKUPS: 2,
+        Setting.DELETE_AFTER_UPLOAD: True,
+    },
+    {
+        Setting.MAX_BACKUPS_IN_HA: 3,
+        Setting.MAX_BACKUPS_IN_FILENIO: 0,
+        Setting.DAYS_BETWEEN_BACKUPS: 1,
+        Setting.DELETE_BEFORE_NEW_BACKUP: True,
+    },
+    {
+        Setting.MAX_BACKUPS_IN_HA: 2,
+        Setting.MAX_BACKUPS_IN_FILENIO: 3,
+        Setting.DAYS_BETWEEN_BACKUPS: 1,
+        Setting.IGNORE_OTHER_BACKUPS: True,
+        Setting.DELETE_IGNORED_AFTER_DAYS: 10,
+    },
+]
+
+
+def configure(model: Model, config: Config, source: HelperTestSource, dest: HelperTestSource, overrides: Dict[Setting, Any]):
+    for setting, value in overrides.items():
+        config.override(setting, value)
+    model.reinitialize()
+    source.setMax(config.get(Setting.MAX_BACKUPS_IN_HA))
+    dest.setMax(config.get(Setting.MAX_BACKUPS_IN_FILENIO))
+
+
+def insertHistory(time: FakeTime, source: HelperTestSource, dest: HelperTestSource):
+    for days in [40, 20, 9, 5, 2]:
+        source.insert("Old {0}".format(days), time.now() - timedelta(days=days), "old{0}".format(days))
+    for days in [60, 40, 20]:
+        dest.insert("Old {0}".format(days), time.now() - timedelta(days=days), "old{0}".format(days))
+    source.insert("Ignored", time.now() - timedelta(days=3), "ignored").setIgnore(True)
+
+
+async def runModel(time: FakeTime, model: Model, end: datetime):
+    while True:
+        next = model.nextBackup(time.now())
+        if next is None or next > end:
+            return
+        assert next > time.now()
+        time.setNow(next)
+        await model.sync(time.now())
+
+
+def keptIn(results: Dict[str, Any], name: str) -> List[datetime]:
+    return [datetime.fromisoformat(backup['date']).astimezone(timezone.utc) for backup in results['backups']
+            if name in backup['sources'] and backup['sources'][name]['deleted'] is None]
+
+
+def actual(source: HelperTestSource) -> List[datetime]:
+    return sorted(backup.date().astimezone(timezone.utc) for backup in source.current.values())
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("overrides", CONFIGS)
+async def test_simulation_matches_model(time: FakeTime, model: Model, simulator: RetentionSimulator, source: HelperTestSource,
+                                        dest: HelperTestSource, simple_config: Config, overrides):
+    time.setTimeZone("Europe/Rome")
+    time.setNow(time.local(2022, 3, 1, 10))
+    configure(model, simple_config, source, dest, overrides)
+    insertHistory(time, source, dest)
+    await model.sync(time.now())
+    source.reset()
+    dest.reset()
+
+    results = await simulator.simulate(simple_config, 3)
+    end = datetime.fromisoformat(results['end'])
+    await runModel(time, model, end)
+
+    assert not results['stalled']
+    assert not results['truncated']
+    assert keptIn(results, "Source") == actual(source)
+    assert keptIn(results, "Dest") == actual(dest)
+    assert results['created'] == len(source.created)
+    assert results['sources']['Source']['deleted'] == len(source.deleted)
+    assert results['sources']['Dest']['deleted'] == len(dest.deleted)
+
+
+@pytest.mark.asyncio
+async def test_simulation_leaves_backups_alone(time: FakeTime, model: Model, simulator: RetentionSimulator, source: HelperTestSource,
+                                               dest: HelperTestSource, simple_config: Config):
+    configure(model, simple_config, source, dest, {Setting.MAX_BACKUPS_IN_HA: 1, Setting.MAX_BACKUPS_IN_FILENIO: 1})
+    insertHistory(time, source, dest)
+    await model.sync(time.now())
+    before = {slug: sorted(backup.sources.keys()) for slug, backup in model.backups.items()}
+    source.reset()
+    dest.reset()
+
+    keep_everything = Config().override(Setting.BACKUP_STARTUP_DELAY_MINUTES, 0).override(Setting.MAX_BACKUPS_IN_HA, 0).override(Setting.MAX_BACKUPS_IN_FILENIO, 0)
+    results = await simulator.simulate(keep_everything, 6)
+    assert results['created'] > 0
+    assert {slug: sorted(backup.sources.keys()) for slug, backup in model.backups.items()} == before
+    source.assertUnchanged()
+    dest.assertUnchanged()
+
+
+@pytest.mark.asyncio
+async def test_simulation_explains_deletes(time: FakeTime, model: Model, simulator: RetentionSimulator, source: HelperTestSource,
+                                           dest: HelperTestSource, simple_config: Config):
+    time.setNow(time.local(2022, 3, 1, 10))
+    configure(model, simple_config, source, dest, {
+        Setting.MAX_BACKUPS_IN_FILENIO: 4,
+        Setting.DAYS_BETWEEN_BACKUPS: 1,
+        Setting.GENERATIONAL_DAYS: 2,
+        Setting.GENERATIONAL_WEEKS: 2,
+        Setting.GENERATIONAL_DELETE_EARLY: True,
+    })
+    await model.sync(time.now())
+
+    results = await simulator.simulate(simple_config, 1)
+    assert results['sources']['Dest']['kept'] == 4
+    assert results['sources']['Dest']['deleted'] > 0
+
+    # Only the simulated backups still around at the end get listed, and every one of them is
+    simulated = [backup for backup in results['backups'] if backup['simulated']]
+    assert len(simulated) == len(set(keptIn(results, "Source") + keptIn(results, "Dest")))
+    assert all(backup['name'].startswith("Full Backup") for backup in simulated)
+
+
+@pytest.mark.asyncio
+async def test_simulation_stops_at_the_step_limit(time: FakeTime, model: Model, simulator: RetentionSimulator, source: HelperTestSource,
+                                                  dest: HelperTestSource, simple_config: Config, monkeypatch):
+    monkeypatch.setattr("backup.model.simulation.MAX_STEPS", 10)
+    configure(model, simple_config, source, dest, {Setting.DAYS_BETWEEN_BACKUPS: 1})
+    results = await simulator.simulate(simple_config, 1)
+    assert results['truncated']
+    assert results['created'] == 10
+
+
+@pytest.mark.asyncio
+async def test_simulation_runtime(time: FakeTime, model: Model, simulator: RetentionSimulator, source: HelperTestSource, dest: HelperTestSource,
+                                  simple_config: Config):
+    configure(model, simple_config, source, dest, {
+        Setting.MAX_BACKUPS_IN_HA: 10,
+        Setting.MAX_BACKUPS_IN_FILENIO: 60,
+        Setting.DAYS_BETWEEN_BACKUPS: 0.1,
+        Setting.GENERATIONAL_DAYS: 7,
+        Setting.GENERATIONAL_WEEKS: 4,
+        Setting.GENERATIONAL_MONTHS: 12,
+        Setting.GENERATIONAL_YEARS: 2,
+    })
+    start = clock.perf_counter()
+    results = await simulator.simulate(simple_config, 6)
+    elapsed = clock.perf_counter() - start
+
+    assert results['created'] > 1800
+    assert not results['truncated']
+    assert results['sources']['Dest']['kept'] == 60
+
+    # Takes about half a second on a typical machine, which leaves lots of room for a slow CI runner
+    assert elapsed < 20
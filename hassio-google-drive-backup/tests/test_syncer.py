@@ -0,0 +1,116 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+from backup.model import Coordinator
+from backup.model.syncer import Scyncer, MIN_WAIT_SECONDS, MAX_WAIT_SECONDS
+from backup.worker import Trigger
+from .faketime import FakeTime
+
+
+class DeadlineTrigger(Trigger):
+    def __init__(self, deadline=None):
+        super().__init__()
+        self.deadline = deadline
+
+    def nextCheck(self):
+        return self.deadline
+
+
+@pytest.mark.asyncio
+async def test_trigger_wakes_listeners():
+    trigger = Trigger()
+    listener = asyncio.Event()
+    trigger.addListener(listener)
+    assert not listener.is_set()
+
+    trigger.trigger()
+    assert listener.is_set()
+    assert await trigger.check()
+    assert not await trigger.check()
+
+    # Rescheduling wakes listeners without asking for a sync
+    listener.clear()
+    trigger.reschedule()
+    assert listener.is_set()
+    assert not await trigger.check()
+
+
+@pytest.mark.asyncio
+async def test_sleeps_until_next_deadline(time: FakeTime, coord: Coordinator):
+    first = DeadlineTrigger()
+    second = DeadlineTrigger()
+    syncer = Scyncer(time, coord, [first, second])
+    assert syncer.secondsUntilNextCheck() == MAX_WAIT_SECONDS
+
+    first.deadline = time.now() + timedelta(seconds=30)
+    assert syncer.secondsUntilNextCheck() == 30
+
+    second.deadline = time.now() + timedelta(seconds=10)
+    assert syncer.secondsUntilNextCheck() == 10
+
+    # Deadlines further out than the maximum or already passed are clamped
+    first.deadline = time.now() + timedelta(hours=1)
+    second.deadline = None
+    assert syncer.secondsUntilNextCheck() == MAX_WAIT_SECONDS
+    first.deadline = time.now() - timedelta(seconds=10)
+    assert syncer.secondsUntilNextCheck() == MIN_WAIT_SECONDS
+
+
+@pytest.mark.asyncio
+async def test_trigger_wakes_syncer(time: FakeTime, coord: Coordinator):
+    trigger = DeadlineTrigger()
+    syncer = Scyncer(time, coord, [trigger])
+    assert not syncer._wait_event.is_set()
+    trigger.trigger()
+    assert syncer._wait_event.is_set()
+
+
+@pytest.mark.asyncio
+async def test_checked_deadlines_dont_keep_waking(time: FakeTime, coord: Coordinator):
+    trigger = DeadlineTrigger(time.now() - timedelta(seconds=10))
+    syncer = Scyncer(time, coord, [trigger])
+    await syncer.checkforSync()
+
+    # The deadline was already due when the triggers got checked, so wait for a trigger instead of checking it again
+    assert syncer.secondsUntilNextCheck() == MAX_WAIT_SECONDS
+
+    # But one that passes after the check still gets looked at soon
+    trigger.deadline = time.now() + timedelta(seconds=1)
+    time.advance(seconds=2)
+    assert syncer.secondsUntilNextCheck() == MIN_WAIT_SECONDS
+
+
+@pytest.mark.asyncio
+async def test_coordinator_deadline(time: FakeTime, coord: Coordinator):
+    assert coord.nextCheck() == coord.nextSyncAttempt()
+    await coord.sync()
+    assert coord.nextCheck() == coord.nextSyncAttempt()
+    assert coord.nextCheck() > time.now()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_deadline_cached(time: FakeTime, coord: Coordinator):
+    await coord.sync()
+    deadline = coord.nextCheck()
+
+    builds = []
+    build = coord._buildModel
+
+    def countBuilds():
+        builds.append(True)
+        return build()
+    coord._buildModel = countBuilds
+    time.advance(minutes=1)
+    assert coord.nextCheck() == deadline
+    assert len(builds) == 0
+
+    # Triggering or syncing works it out again
+    coord.trigger()
+    assert coord.nextCheck() == coord.nextSyncAttempt()
+    assert len(builds) == 2
+    await coord.sync()
+    builds.clear()
+    coord.nextCheck()
+    assert len(builds) == 1
@@ -13,6 +13,7 @@ from aiohttp import BasicAuth
 from aiohttp.client import ClientSession
 
 from backup.file import File
+from backup.logger import getLogger
 from backup.util import AsyncHttpGetter, GlobalInfo, DataCache, UpgradeFlags
 from backup.ui import UiServer, Restarter
 from backup.config import Config, Setting, CreateOptions
@@ -29,8 +30,9 @@ from .faketime import FakeTime
 from .helpers import compareStreams
 from yarl import URL
 from dev.ports import Ports
-from dev.simulated_supervisor import SimulatedSupervisor
+from dev.simulated_supervisor import SimulatedSupervisor, URL_MATCH_BACKUP_DOWNLOAD
 from dev.simulationserver import SimulationServer
+from dev.request_interceptor import RequestInterceptor
 from dev.simulated_google import SimulatedGoogle
 from bs4 import BeautifulSoup
 from .conftest import ReaderHelper
@@ -287,6 +289,101 @@ async def test_retain(reader: ReaderHelper, config: Config, backup: Backup, coor
     assert status['sources'][SOURCE_FILENIO]['backups'] == 1
 
 
+@pytest.mark.asyncio
+async def test_getstatus_etag(reader: ReaderHelper, ui_server: UiServer, backup: Backup, coord: Coordinator, time: FakeTime, global_info: GlobalInfo, monkeypatch):
+    async with reader.session.get(reader.getUrl() + "getstatus") as resp:
+        assert resp.status == 200
+        etag = resp.headers['ETag']
+        first = await resp.json()
+
+    # Polling again with nothing changed lets the browser use what it already has, without building the status
+    async def buildStatusInfo():
+        raise AssertionError("The status shouldn't be built")
+    with monkeypatch.context() as m:
+        m.setattr(ui_server, "buildStatusInfo", buildStatusInfo)
+        async with reader.session.get(reader.getUrl() + "getstatus", headers={'If-None-Match': etag}) as resp:
+            assert resp.status == 304
+            assert resp.headers['ETag'] == etag
+
+    # Time passing changes how long ago the backup was made
+    time.advance(minutes=5)
+    async with reader.session.get(reader.getUrl() + "getstatus", headers={'If-None-Match': etag}) as resp:
+        assert resp.status == 200
+        assert resp.headers['ETag'] != etag
+        etag = resp.headers['ETag']
+        assert (await resp.json())['backups'][0]['createdAt'] != first['backups'][0]['createdAt']
+
+    # So does changing the backup
+    await coord.note("Changed", backup.slug())
+    async with reader.session.get(reader.getUrl() + "getstatus", headers={'If-None-Match': etag}) as resp:
+        assert resp.status == 200
+        etag = resp.headers['ETag']
+        assert (await resp.json())['backups'][0]['note'] == "Changed"
+
+    # And an error showing up
+    global_info.failed(Exception("Oh no"))
+    async with reader.session.get(reader.getUrl() + "getstatus", headers={'If-None-Match': etag}) as resp:
+        assert resp.status == 200
+        assert (await resp.json())['last_error_count'] == 1
+
+
+async def readEvent(resp):
+    event = None
+    data = ""
+    while True:
+        line = (await asyncio.wait_for(resp.content.readline(), 10)).decode()
+        if len(line) == 0:
+            return None, None
+        line = line.rstrip("\n")
+        if line.startswith(":"):
+            continue
+        if len(line) == 0:
+            return event, json.loads(data)
+        key, value = line.split(": ", 1)
+        if key == "event":
+            event = value
+        elif key == "data":
+            data += value
+
+
+@pytest.mark.asyncio
+async def test_events_status(reader: ReaderHelper, ui_server: UiServer, backup: Backup, coord: Coordinator):
+    async with reader.session.get(reader.getUrl() + "events") as resp:
+        assert resp.status == 200
+        assert resp.content_type == "text/event-stream"
+
+        # The first event has the whole status
+        event, data = await readEvent(resp)
+        assert event == "status"
+        assert data == json.loads(json.dumps(await ui_server.buildStatusInfo()))
+
+        # After that only what changed gets sent
+        await coord.note("Changed", backup.slug())
+        ui_server.trigger()
+        event, data = await readEvent(resp)
+        assert event == "status"
+        assert list(data.keys()) == ['backups']
+        assert data['backups'][0]['note'] == "Changed"
+
+        # Stopping the server ends the stream
+        await ui_server.stop()
+        assert await readEvent(resp) == (None, None)
+
+
+@pytest.mark.asyncio
+async def test_events_log(reader: ReaderHelper, ui_server: UiServer):
+    async with reader.session.get(reader.getUrl() + "events?status=false&log=true") as resp:
+        assert resp.status == 200
+        getLogger("test_events_log").info("Pushed to the log page")
+
+        # Anything logged before the page loaded the log comes first
+        pushed = ""
+        while "Pushed to the log page" not in pushed:
+            event, data = await readEvent(resp)
+            assert event == "log"
+            pushed += data
+
+
 @pytest.mark.asyncio
 async def test_note(reader: ReaderHelper, config: Config, backup: Backup, coord: Coordinator, time: FakeTime):
     slug = backup.slug()
@@ -402,6 +499,34 @@ async def test_config(reader, ui_server, config: Config, supervisor: SimulatedSu
     assert ui_server._starts == 1
 
 
+@pytest.mark.asyncio
+async def test_simulate_retention(reader, ui_server, config: Config, coord: Coordinator, time: FakeTime):
+    # A backup still pending when the sync gives up waiting would stick around in the preview, so wait for it
+    config.override(Setting.NEW_BACKUP_TIMEOUT_SECONDS, 100)
+    await coord.sync()
+    backup = coord.backups()[0]
+    update = {
+        "config": {
+            "days_between_backups": 1,
+            "max_backups_in_ha": 2,
+            "max_backups_in_filenio": 3
+        },
+        "months": 2
+    }
+    results = await reader.postjson("simulateretention", json=update)
+    assert results['months'] == 2
+    assert results['created'] >= 59
+    assert results['sources'][SOURCE_HA]['kept'] == 2
+    assert results['sources'][SOURCE_FILENIO]['kept'] == 3
+    assert results['backups'][0]['slug'] == backup.slug()
+    assert not results['backups'][0]['simulated']
+    assert results['backups'][0]['sources'][SOURCE_HA]['deleted'] is not None
+
+    # Previewing doesn't change the settings or the backups
+    assert config.get(Setting.DAYS_BETWEEN_BACKUPS) == 3
+    assert backup.getSource(SOURCE_HA) is not None
+
+
 @pytest.mark.asyncio
 async def test_auth_and_restart(reader, ui_server, config: Config, restarter, coord: Coordinator, supervisor: SimulatedSupervisor):
     update = {"config": {"require_login": True,
@@ -679,6 +804,118 @@ async def test_download_home_assistant(reader: ReaderHelper, ui_server, backup,
     await compareStreams(from_ha, from_server)
 
 
+@pytest.mark.asyncio
+async def test_download_range(reader: ReaderHelper, ui_server, backup, drive: DriveSource, ha: HaSource):
+    await ha.delete(backup)
+    url = reader.getUrl() + "download?slug=" + backup.slug()
+    async with reader.session.get(url) as resp:
+        assert resp.status == 200
+        assert resp.headers['Accept-Ranges'] == 'bytes'
+        etag = resp.headers['ETag']
+        data = await resp.read()
+    size = len(data)
+    assert etag == '"{0}-{1}"'.format(backup.slug(), size)
+
+    async with reader.session.get(url, headers={'Range': 'bytes=10-19'}) as resp:
+        assert resp.status == 206
+        assert resp.headers['Content-Range'] == "bytes 10-19/{0}".format(size)
+        assert await resp.read() == data[10:20]
+
+    # Resuming from the middle with a matching If-Range
+    async with reader.session.get(url, headers={'Range': 'bytes=100-', 'If-Range': etag}) as resp:
+        assert resp.status == 206
+        assert await resp.read() == data[100:]
+
+    # A backup that changed since the client started downloading it gets sent in full
+    async with reader.session.get(url, headers={'Range': 'bytes=100-', 'If-Range': '"different"'}) as resp:
+        assert resp.status == 200
+        assert await resp.read() == data
+
+    async with reader.session.get(url, headers={'If-None-Match': etag}) as resp:
+        assert resp.status == 304
+
+    async with reader.session.get(url, headers={'Range': 'bytes={0}-'.format(size)}) as resp:
+        assert resp.status == 416
+        assert resp.headers['Content-Range'] == "bytes */{0}".format(size)
+
+
+@pytest.mark.asyncio
+async def test_download_conditional_without_opening(reader: ReaderHelper, ui_server, backup, drive: DriveSource, ha: HaSource, coord: Coordinator, monkeypatch):
+    await ha.delete(backup)
+    url = reader.getUrl() + "download?slug=" + backup.slug()
+    async with reader.session.get(url) as resp:
+        etag = resp.headers['ETag']
+        await resp.read()
+
+    # Checking whether a copy is still good doesn't start downloading the backup
+    async def download(slug):
+        raise AssertionError("The backup shouldn't be opened")
+    monkeypatch.setattr(coord, "download", download)
+    async with reader.session.get(url, headers={'If-None-Match': etag}) as resp:
+        assert resp.status == 304
+        assert resp.headers['ETag'] == etag
+
+    async with reader.session.get(reader.getUrl() + "download?slug=missing") as resp:
+        assert resp.status == 404
+
+
+@pytest.mark.asyncio
+async def test_download_multiple_ranges(reader: ReaderHelper, ui_server, backup, drive: DriveSource, ha: HaSource):
+    await ha.delete(backup)
+    url = reader.getUrl() + "download?slug=" + backup.slug()
+    async with reader.session.get(url) as resp:
+        data = await resp.read()
+
+    async with reader.session.get(url, headers={'Range': 'bytes=0-9, 50-59, -5'}) as resp:
+        assert resp.status == 206
+        assert resp.content_type == "multipart/byteranges"
+        parts = []
+        async for part in aiohttp.MultipartReader.from_response(resp):
+            parts.append((part.headers['Content-Range'], await part.read()))
+    assert parts == [
+        ("bytes 0-9/{0}".format(len(data)), data[0:10]),
+        ("bytes 50-59/{0}".format(len(data)), data[50:60]),
+        ("bytes {0}-{1}/{2}".format(len(data) - 5, len(data) - 1, len(data)), data[-5:]),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_download_local_file(reader: ReaderHelper, ui_server, backup, drive: DriveSource, ha: HaSource, supervisor: SimulatedSupervisor, config: Config,
+                                   interceptor: RequestInterceptor, coord: Coordinator):
+    await drive.delete(backup)
+    data = supervisor._backup_data[backup.slug()]
+    os.makedirs(config.get(Setting.BACKUP_DIRECTORY_PATH), exist_ok=True)
+    with open(os.path.join(config.get(Setting.BACKUP_DIRECTORY_PATH), backup.slug() + ".tar"), "wb") as f:
+        f.write(data)
+    interceptor.clear()
+
+    # Home Assistant only reports sizes in MB, so the ETag uses the size it reported
+    etag = '"{0}-{1}"'.format(backup.slug(), coord.getBackup(backup.slug()).sizeInt())
+    url = reader.getUrl() + "download?slug=" + backup.slug()
+    async with reader.session.get(url) as resp:
+        assert resp.status == 200
+        assert resp.headers['ETag'] == etag
+        assert resp.headers['Content-Disposition'] == 'attachment; filename="{0}.tar"'.format(backup.name())
+        assert await resp.read() == data
+
+    async with reader.session.get(url, headers={'Range': 'bytes=-10'}) as resp:
+        assert resp.status == 206
+        assert resp.headers['ETag'] == etag
+        assert resp.headers['Content-Range'] == "bytes {0}-{1}/{2}".format(len(data) - 10, len(data) - 1, len(data))
+        assert await resp.read() == data[-10:]
+
+    # sendfile() doesn't honor a range the If-Range says is stale
+    async with reader.session.get(url, headers={'Range': 'bytes=-10', 'If-Range': '"stale"'}) as resp:
+        assert resp.status == 200
+        assert await resp.read() == data
+
+    async with reader.session.get(url, headers={'Range': 'bytes=0-1,5-6'}) as resp:
+        assert resp.status == 206
+        assert resp.content_type == "multipart/byteranges"
+        await resp.read()
+    assert not interceptor.urlWasCalled(URL_MATCH_BACKUP_DOWNLOAD)
+
+
 @pytest.mark.asyncio
 async def test_cancel_and_startsync(reader: ReaderHelper, coord: Coordinator):
     coord._sync_wait.set()
@@ -730,6 +967,8 @@ async def test_token_extra_server(reader: ReaderHelper, coord: Coordinator, ha,
     }
     assert await reader.postjson("saveconfig", json=update) == {'message': 'Settings saved', "reload_page": False}
     await restarter.waitForRestart()
+    # The creds below are already expired, so a sync still running from saving the settings would refresh them
+    await coord.waitForSyncToFinish()
     creds = Creds(time, "id", time.now(), "token", "refresh")
     serialized = str(base64.b64encode(json.dumps(creds.serialize()).encode("utf-8")), "utf-8")
     await reader.get("token?creds={0}&host={1}".format(quote(serialized), quote(reader.getUrl(False))), ingress=False)
@@ -0,0 +1,67 @@
+import os
+import signal
+import time
+
+from backup.server import WorkerPool
+
+
+def serve(index):
+    time.sleep(60)
+
+
+def crash(index):
+    os._exit(3)
+
+
+def ignoreStop(index):
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    time.sleep(60)
+
+
+def waitUntil(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+
+def test_start_and_stop():
+    pool = WorkerPool(2, serve, grace=5)
+    pool.start()
+    try:
+        health = pool.health()
+        assert [worker['index'] for worker in health] == [0, 1]
+        assert all(worker['alive'] for worker in health)
+        assert len(set(worker['pid'] for worker in health)) == 2
+    finally:
+        pool.stop()
+    assert not any(worker['alive'] for worker in pool.health())
+    assert [worker['restarts'] for worker in pool.health()] == [0, 0]
+
+
+def test_restarts_exited_workers():
+    pool = WorkerPool(1, crash, grace=5)
+    pool.start()
+    try:
+        waitUntil(lambda: not pool.health()[0]['alive'])
+        first_pid = pool.health()[0]['pid']
+        pool.check()
+        assert pool.health()[0]['last_exit_code'] == 3
+
+        # Skip the restart backoff
+        pool._workers[0].restart_at = 0
+        pool.check()
+        assert pool.health()[0]['restarts'] == 1
+        assert pool.health()[0]['pid'] != first_pid
+    finally:
+        pool.stop()
+
+
+def test_kills_workers_that_dont_stop():
+    pool = WorkerPool(1, ignoreStop, grace=0.5)
+    pool.start()
+    # Give the worker a moment to start ignoring SIGTERM
+    time.sleep(0.5)
+    pool.stop()
+    assert not pool.health()[0]['alive']
+    assert pool._workers[0].process.exitcode == -signal.SIGKILL
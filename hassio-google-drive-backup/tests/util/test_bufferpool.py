@@ -0,0 +1,110 @@
+import tracemalloc
+
+import pytest
+from backup.config import Config, Setting
+from backup.drive import DriveRequests
+from backup.drive.driverequests import BASE_CHUNK_SIZE
+from backup.util import BufferPool, ReadAheadStream
+from backup.util.bufferpool import MAX_IDLE_BUFFERS
+from dev.simulated_google import SimulatedGoogle
+from ..conftest import Uploader
+from ..faketime import FakeTime
+from ..helpers import createBackupTar
+
+
+def test_reuse():
+    pool = BufferPool()
+    buffer = pool.acquire(10)
+    assert len(buffer) == 10
+    pool.release(buffer)
+    assert pool.idle() == 1
+
+    # A smaller request can use the larger free buffer
+    assert pool.acquire(5) is buffer
+    assert pool.idle() == 0
+    assert pool.allocations == 1
+
+
+def test_too_small_buffer_not_reused():
+    pool = BufferPool()
+    small = pool.acquire(5)
+    pool.release(small)
+    assert pool.acquire(10) is not small
+    assert pool.allocations == 2
+    assert pool.idle() == 1
+
+
+def test_keeps_largest_idle_buffers():
+    pool = BufferPool()
+    buffers = [pool.acquire(size) for size in range(1, MAX_IDLE_BUFFERS + 3)]
+    for buffer in buffers:
+        pool.release(buffer)
+    assert pool.idle() == MAX_IDLE_BUFFERS
+    kept = [pool.acquire(1) for _ in range(MAX_IDLE_BUFFERS)]
+    assert all(any(buffer is large for large in buffers[-MAX_IDLE_BUFFERS:]) for buffer in kept)
+
+
+@pytest.mark.asyncio
+async def test_reader_returns_buffers(uploader: Uploader, server):
+    pool = BufferPool()
+    getter = await uploader.upload(bytearray(range(100)))
+    await getter.setup()
+    reader = ReadAheadStream(getter, pool, 10)
+    for chunk in range(5):
+        assert bytes(await reader.read(10)) == bytearray(range(chunk * 10, chunk * 10 + 10))
+        reader.prefetch(10)
+    await reader.close()
+
+    # The reader only ever needs two buffers, one handed out and one being read ahead into
+    assert pool.allocations == 2
+    assert pool.idle() == 2
+
+
+@pytest.mark.asyncio
+async def test_pool_shared_between_readers(uploader: Uploader, server):
+    pool = BufferPool()
+    getter = await uploader.upload(bytearray(range(100)))
+    await getter.setup()
+    for _ in range(3):
+        getter.position(0)
+        reader = ReadAheadStream(getter, pool, 10)
+        assert bytes(await reader.read(10)) == bytearray(range(10))
+        reader.prefetch(10)
+        assert bytes(await reader.read(10)) == bytearray(range(10, 20))
+        await reader.close()
+
+    # Later readers use the buffers earlier ones gave back instead of allocating more
+    assert pool.allocations == 2
+
+
+@pytest.mark.asyncio
+async def test_upload_memory_doesnt_grow_with_chunks(drive_requests: DriveRequests, uploader: Uploader, server, time: FakeTime, config: Config, google: SimulatedGoogle):
+    chunk = 4 * BASE_CHUNK_SIZE
+    config.override(Setting.MAXIMUM_UPLOAD_CHUNK_BYTES, chunk)
+    config.override(Setting.UPLOAD_LIMIT_BYTES_PER_SECOND, chunk)
+    google.keep_bytes = False
+
+    async def peakForUpload(chunks):
+        data = await uploader.upload(createBackupTar("slug", "name", time.now(), chunk * chunks))
+        drive_requests.buffer_pool = BufferPool()
+        tracemalloc.start()
+        try:
+            async with data:
+                async for progress in drive_requests.create(data, {}, "unused"):
+                    pass
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    small = await peakForUpload(4)
+    large = await peakForUpload(32)
+
+    # Chunks get read into the pool's two buffers and sent straight from them, and the simulated Google reads each one it
+    # receives into memory.  Past that there's only aiohttp's buffering (on both ends, since the simulated servers run in
+    # this process) and a little bookkeeping for each request, so copying a chunk anywhere on the way would show up here.
+    overhead = 4 * BASE_CHUNK_SIZE
+    assert small < 3 * chunk + overhead
+    assert large < 3 * chunk + overhead
+
+    # Streaming eight times as many chunks takes about the same memory
+    assert large - small < chunk
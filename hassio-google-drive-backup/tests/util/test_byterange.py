@@ -0,0 +1,37 @@
+from backup.util import parseByteRanges
+
+
+def test_no_header():
+    assert parseByteRanges(None, 100) is None
+
+
+def test_single_ranges():
+    assert parseByteRanges("bytes=0-9", 100) == [(0, 9)]
+    assert parseByteRanges("bytes=90-", 100) == [(90, 99)]
+    assert parseByteRanges("bytes=-10", 100) == [(90, 99)]
+
+    # Ranges past the end get cut off
+    assert parseByteRanges("bytes=50-1000", 100) == [(50, 99)]
+    assert parseByteRanges("bytes=-1000", 100) == [(0, 99)]
+
+
+def test_multiple_ranges():
+    assert parseByteRanges("bytes=0-9, 20-29,-5", 100) == [(0, 9), (20, 29), (95, 99)]
+
+    # Only the ranges that overlap the file are kept
+    assert parseByteRanges("bytes=0-9,200-300", 100) == [(0, 9)]
+
+
+def test_unsatisfiable():
+    assert parseByteRanges("bytes=100-", 100) == []
+    assert parseByteRanges("bytes=-0", 100) == []
+    assert parseByteRanges("bytes=0-", 0) == []
+
+
+def test_invalid_headers_are_ignored():
+    assert parseByteRanges("items=0-9", 100) is None
+    assert parseByteRanges("bytes=9-0", 100) is None
+    assert parseByteRanges("bytes=a-b", 100) is None
+    assert parseByteRanges("bytes=-", 100) is None
+    assert parseByteRanges("bytes=", 100) is None
+    assert parseByteRanges("bytes=0-9,garbage", 100) is None
@@ -0,0 +1,112 @@
+import asyncio
+import pytest
+from dev.request_interceptor import RequestInterceptor
+from backup.util import ReadAheadStream
+from backup.exceptions import SupervisorUnexpectedError
+from ..conftest import Uploader
+
+
+@pytest.mark.asyncio
+async def test_read_without_prefetch(uploader: Uploader, server):
+    getter = await uploader.upload(bytearray(range(10)))
+    await getter.setup()
+    reader = ReadAheadStream(getter)
+    assert reader.size() == 10
+    assert bytes(await reader.read(3)) == bytearray([0, 1, 2])
+    assert bytes(await reader.read(3)) == bytearray([3, 4, 5])
+    assert bytes(await reader.read(10)) == bytearray([6, 7, 8, 9])
+    assert bytes(await reader.read(10)) == bytearray([])
+    assert reader.position() == 10
+
+
+@pytest.mark.asyncio
+async def test_prefetch(uploader: Uploader, server, interceptor: RequestInterceptor):
+    getter = await uploader.upload(bytearray(range(10)))
+    await getter.setup()
+    reader = ReadAheadStream(getter)
+    assert bytes(await reader.read(3)) == bytearray([0, 1, 2])
+    reader.prefetch(3)
+    await asyncio.sleep(0.1)
+    assert reader.buffered() == 3
+
+    # Reading less than what was prefetched keeps the rest around
+    assert bytes(await reader.read(2)) == bytearray([3, 4])
+    assert reader.buffered() == 1
+
+    # Reading more than what was prefetched gets the rest from the stream
+    assert bytes(await reader.read(3)) == bytearray([5, 6, 7])
+    assert reader.buffered() == 0
+    assert reader.position() == 8
+
+
+@pytest.mark.asyncio
+async def test_prefetch_limited_by_size(uploader: Uploader, server):
+    getter = await uploader.upload(bytearray(range(10)))
+    await getter.setup()
+    reader = ReadAheadStream(getter)
+    assert bytes(await reader.read(8)) == bytearray(range(8))
+    reader.prefetch(100)
+    assert bytes(await reader.read(100)) == bytearray([8, 9])
+
+    # Nothing left to prefetch
+    reader.prefetch(100)
+    assert bytes(await reader.read(100)) == bytearray([])
+
+
+@pytest.mark.asyncio
+async def test_seek_drops_prefetched_data(uploader: Uploader, server):
+    getter = await uploader.upload(bytearray(range(10)))
+    await getter.setup()
+    reader = ReadAheadStream(getter)
+    assert bytes(await reader.read(4)) == bytearray([0, 1, 2, 3])
+    reader.prefetch(4)
+
+    # Seek backward, like a 308 response from Drive asking for bytes again
+    reader.position(2)
+    assert bytes(await reader.read(4)) == bytearray([2, 3, 4, 5])
+
+    # Seek forward past what was read ahead
+    reader.prefetch(2)
+    reader.position(9)
+    assert bytes(await reader.read(4)) == bytearray([9])
+
+
+@pytest.mark.asyncio
+async def test_seek_within_prefetched_data(uploader: Uploader, server):
+    getter = await uploader.upload(bytearray(range(10)))
+    await getter.setup()
+    reader = ReadAheadStream(getter)
+    assert bytes(await reader.read(2)) == bytearray([0, 1])
+    reader.prefetch(6)
+    await asyncio.sleep(0.1)
+    reader.position(5)
+    assert reader.buffered() == 3
+    assert bytes(await reader.read(2)) == bytearray([5, 6])
+
+
+@pytest.mark.asyncio
+async def test_prefetch_error_raised_on_read(uploader: Uploader, server, interceptor: RequestInterceptor):
+    getter = await uploader.upload(bytearray(range(10)))
+    getter.otherErrorFactory = SupervisorUnexpectedError.factory
+    await getter.setup()
+    reader = ReadAheadStream(getter)
+    assert bytes(await reader.read(2)) == bytearray([0, 1])
+
+    # Break the stream so the read ahead has to reconnect and fails
+    interceptor.setError("/readfile", status=500)
+    reader.position(5)
+    reader.prefetch(2)
+    with pytest.raises(Exception):
+        await reader.read(2)
+
+
+@pytest.mark.asyncio
+async def test_close_restores_position(uploader: Uploader, server):
+    getter = await uploader.upload(bytearray(range(10)))
+    await getter.setup()
+    reader = ReadAheadStream(getter)
+    assert bytes(await reader.read(3)) == bytearray([0, 1, 2])
+    reader.prefetch(5)
+    await reader.close()
+    assert getter.position() == 3
+    assert (await getter.read(2)).read() == bytearray([3, 4])